@@ -0,0 +1,53 @@
+import argparse
+import json
+import logging
+from driver_initializer import DriverInitializer, PROFILES, measure_page_load
+from layout_manager import setup_layout
+from main import load_config
+
+
+def benchmark_profile(config, name, urls, layout_cfg):
+    initializer = DriverInitializer({**config, "BROWSER_PROFILE": name})
+    driver = initializer.init_driver()
+    result = {"profile": name, "cold_start_s": round(initializer.cold_start_s, 3), "pages": []}
+    try:
+        for url in urls:
+            try:
+                result["pages"].append(measure_page_load(driver, url))
+            except Exception as e:
+                result["pages"].append({"url": url, "error": str(e)})
+        try:
+            setup_layout(driver, layout_cfg)
+            result["layout_ok"] = True
+        except Exception as e:
+            logging.warning("setup_layout failed with profile '%s': %s", name, e)
+            result["layout_ok"] = False
+    finally:
+        driver.quit()
+    return result
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Cold start and page load time per browser profile.")
+    parser.add_argument("--config", default="config.json")
+    parser.add_argument("--profiles", nargs="+", default=list(PROFILES))
+    parser.add_argument("--url", action="append", default=[],
+                        help="Extra page to load (repeatable); CRM_URL and SHOP_URL are always loaded.")
+    parser.add_argument("--output", help="Write the results as JSON to this file.")
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+    urls = [u for u in (config.get("CRM_URL"), config.get("SHOP_URL")) if u] + args.url
+    results = [benchmark_profile(config, name, urls, config.get("LAYOUT", {})) for name in args.profiles]
+
+    print(f"{'profile':<12}{'cold start':>12}{'avg load':>12}{'avg DOM ready':>15}  layout")
+    for r in results:
+        loaded = [p for p in r["pages"] if "error" not in p]
+        avg_wall = sum(p["wall_s"] for p in loaded) / len(loaded) if loaded else float("nan")
+        avg_dom = sum(p["dom_content_loaded_s"] for p in loaded) / len(loaded) if loaded else float("nan")
+        print(f"{r['profile']:<12}{r['cold_start_s']:>11.2f}s{avg_wall:>11.2f}s{avg_dom:>14.2f}s  "
+              f"{'ok' if r['layout_ok'] else 'FAILED'}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
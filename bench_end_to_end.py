@@ -0,0 +1,208 @@
+import argparse
+import json
+import logging
+import os
+import subprocess
+import tempfile
+import time
+from driver_initializer import DriverInitializer
+from facade import ProcessFacade
+from metrics import metrics
+from mock_deepl import MockDeepLServer
+from mock_sites import MockSitesServer
+from tricoma_snapshot import count_webdriver_commands
+
+# Flags a step whose mean latency got this much worse than in the previous comparable run.
+REGRESSION_THRESHOLD = 0.10
+
+
+def git_revision():
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        )
+        return result.stdout.strip() or None
+    except Exception:
+        return None
+
+
+def parse_overrides(pairs):
+    overrides = {}
+    for pair in pairs:
+        key, _, value = pair.partition("=")
+        try:
+            overrides[key] = json.loads(value)
+        except ValueError:
+            overrides[key] = value
+    return overrides
+
+
+def step_stats():
+    stats = {}
+    for step, h in sorted(metrics.steps.items()):
+        stats[step] = {
+            "count": h.count,
+            "total_s": round(h.total, 3),
+            "mean_s": round(h.total / h.count, 4),
+            "p50_s": round(h.percentile(50), 4),
+            "p95_s": round(h.percentile(95), 4),
+            "failures": h.failures,
+        }
+    return stats
+
+
+def run_benchmark(args, extra=None):
+    parameters = {
+        "products": args.products,
+        "latency_s": args.latency,
+        "deepl_latency_s": args.deepl_latency,
+        "browser_profile": args.browser_profile,
+        "pipeline": args.pipeline,
+        "overrides": {**parse_overrides(args.set), **(extra or {})},
+    }
+    with MockSitesServer(product_count=args.products, latency_s=args.latency) as sites, \
+            MockDeepLServer(latency_s=args.deepl_latency) as deepl_server, \
+            tempfile.TemporaryDirectory() as workdir:
+        config = {
+            "GECKODRIVER_PATH": args.geckodriver,
+            "FIREFOX_BINARY": args.firefox,
+            "FIREFOX_PROFILE": None,
+            "BROWSER_PROFILE": args.browser_profile,
+            "CRM_URL": sites.crm_url,
+            "SHOP_URL": sites.shop_url,
+            "DEEPL_AUTH_KEY": "bench",
+            "DEEPL_SERVER_URL": deepl_server.url,
+            "TRANSLATION_CACHE": {"path": os.path.join(workdir, "translation_cache.sqlite3")},
+            "METRICS": {
+                "events_file": os.path.join(workdir, "metrics_events.jsonl"),
+                "prometheus_file": os.path.join(workdir, "metrics.prom"),
+            },
+            "BATCH_PIPELINE": args.pipeline,
+            **parameters["overrides"],
+        }
+        names = sites.product_names
+        cwd = os.getcwd()
+        # run_batch_process keeps its files (product_data.json, counters) in the working directory.
+        os.chdir(workdir)
+        driver = None
+        metrics.configure(config["METRICS"])
+        try:
+            driver = DriverInitializer(config).init_driver()
+            facade = ProcessFacade(driver, config)
+            facade.crm_downloader.wait_for_login(sites.crm_url, sites.shop_url)
+            with open("products.txt", "w", encoding="utf-8") as f:
+                f.write("\n".join(names) + "\n")
+            metrics.reset()
+            with count_webdriver_commands(driver) as counter:
+                start = time.perf_counter()
+                facade.run_batch_process("products.txt", "product_counter.txt", "pause.txt")
+                wall = time.perf_counter() - start
+            extraction = facade.crm_downloader.extraction_commands
+            with open("products.txt", "r", encoding="utf-8") as f:
+                left = {line.strip() for line in f if line.strip()}
+        finally:
+            if driver is not None:
+                driver.quit()
+            os.chdir(cwd)
+
+        processed = [name for name in names if name not in left]
+        mismatches = {name: problems for name in processed if (problems := sites.verify(name))}
+        return {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "revision": git_revision(),
+            "parameters": parameters,
+            "processed": len(processed),
+            "verification_failures": mismatches,
+            "wall_s": round(wall, 2),
+            "products_per_min": round(len(processed) * 60 / wall, 2) if wall else 0.0,
+            "webdriver_commands": counter.total,
+            "webdriver_commands_per_product": round(counter.total / len(processed), 1) if processed else None,
+            "webdriver_commands_by_type": dict(counter.by_command.most_common()),
+            "extraction_commands": extraction.total,
+            "extraction_commands_per_product": round(extraction.total / len(processed), 1) if processed else None,
+            "deepl_requests": deepl_server.request_count,
+            "steps": step_stats(),
+        }
+
+
+def previous_result(results_file, parameters):
+    if not os.path.exists(results_file):
+        return None
+    previous = None
+    with open(results_file, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if entry.get("parameters") == parameters:
+                previous = entry
+    return previous
+
+
+def compare(result, previous):
+    print(f"\nCompared with {previous.get('revision') or 'previous run'} ({previous['timestamp']}):")
+    before, after = previous["products_per_min"], result["products_per_min"]
+    change = (after - before) / before * 100 if before else 0.0
+    print(f"  products/min: {before:.2f} -> {after:.2f} ({change:+.1f}%)")
+    print(f"  WebDriver commands/product: {previous.get('webdriver_commands_per_product')} -> "
+          f"{result.get('webdriver_commands_per_product')}")
+    for step, stats in result["steps"].items():
+        old = previous["steps"].get(step)
+        if old and old["mean_s"] and (stats["mean_s"] - old["mean_s"]) / old["mean_s"] > REGRESSION_THRESHOLD:
+            print(f"  REGRESSION {step}: mean {old['mean_s']:.3f} s -> {stats['mean_s']:.3f} s")
+
+
+def compare_extraction(before, after):
+    mode = after["parameters"]["overrides"].get("CRM_EXTRACTION", "snapshot")
+    print(f"\nField extraction, WebDriver commands/product: elements {before['extraction_commands_per_product']}"
+          f" -> {mode} {after['extraction_commands_per_product']}"
+          f" (whole product: {before['webdriver_commands_per_product']} -> {after['webdriver_commands_per_product']})")
+
+
+def report(result):
+    print(f"\n{result['processed']} products in {result['wall_s']:.1f} s: "
+          f"{result['products_per_min']:.1f} products/min, "
+          f"{result['webdriver_commands']} WebDriver commands "
+          f"({result['webdriver_commands_per_product']} per product), "
+          f"{result['deepl_requests']} DeepL requests; "
+          f"{result['extraction_commands_per_product']} commands per product reading Tricoma fields")
+    if result["verification_failures"]:
+        print(f"Products with wrong Shopware state: {result['verification_failures']}")
+    print(f"\n{'step':<48}{'count':>7}{'mean s':>9}{'p50 s':>8}{'p95 s':>8}{'total s':>10}")
+    for step, stats in sorted(result["steps"].items(), key=lambda item: item[1]["total_s"], reverse=True):
+        print(f"{step:<48}{stats['count']:>7}{stats['mean_s']:>9.3f}{stats['p50_s']:>8.3f}"
+              f"{stats['p95_s']:>8.3f}{stats['total_s']:>10.2f}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(
+        description="Offline end-to-end benchmark: run_batch_process against local Tricoma, Shopware and DeepL replicas."
+    )
+    parser.add_argument("--products", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.0, help="Added delay per page request (s).")
+    parser.add_argument("--deepl-latency", type=float, default=0.05)
+    parser.add_argument("--browser-profile", default="headless")
+    parser.add_argument("--pipeline", action="store_true", help="Use BATCH_PIPELINE.")
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=JSON",
+                        help="Extra config.json key for the run (repeatable), e.g. --set UPLOAD_MODE='\"selenium\"'.")
+    parser.add_argument("--geckodriver", default=os.environ.get("GECKODRIVER_PATH", "geckodriver"))
+    parser.add_argument("--firefox", default=os.environ.get("FIREFOX_BINARY", "/usr/bin/firefox"))
+    parser.add_argument("--compare-extraction", action="store_true",
+                        help="Run once more with CRM_EXTRACTION 'elements' (one command per field) "
+                             "and print the command counts before/after.")
+    parser.add_argument("--results", default="bench_results.jsonl",
+                        help="Results are appended here and compared with the previous run of the same parameters.")
+    args = parser.parse_args()
+
+    result = run_benchmark(args)
+    report(result)
+    previous = previous_result(args.results, result["parameters"])
+    if previous:
+        compare(result, previous)
+    if args.compare_extraction:
+        compare_extraction(run_benchmark(args, {"CRM_EXTRACTION": "elements"}), result)
+    with open(args.results, "a", encoding="utf-8") as f:
+        f.write(json.dumps(result, ensure_ascii=False) + "\n")
@@ -0,0 +1,57 @@
+import argparse
+import os
+import tempfile
+import time
+import page_parser
+from tricoma_pages import write_corpus
+
+FRAMES = ("product", "editor", "language", "prices")
+
+
+def load_corpus(directory):
+    """Reads <directory>/<artikelnummer>/<frame>.html as captured by PageSourceExtractor."""
+    corpus = []
+    for name in sorted(os.listdir(directory)):
+        product_dir = os.path.join(directory, name)
+        if not all(os.path.exists(os.path.join(product_dir, f"{frame}.html")) for frame in FRAMES):
+            continue
+        pages = {}
+        for frame in FRAMES:
+            with open(os.path.join(product_dir, f"{frame}.html"), "r", encoding="utf-8") as f:
+                pages[frame] = f.read()
+        corpus.append(pages)
+    return corpus
+
+
+def benchmark(corpus, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for pages in corpus:
+            page_parser.parse_captured_product(pages)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parsing throughput over saved Tricoma frame sources.")
+    parser.add_argument("--corpus", help="Directory captured with CRM_CAPTURE_DIR.")
+    parser.add_argument("--synthetic", type=int, default=200,
+                        help="Number of sample products to generate when no corpus is given.")
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.corpus:
+        corpus = load_corpus(args.corpus)
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            write_corpus(tmp, args.synthetic)
+            corpus = load_corpus(tmp)
+    if not corpus:
+        raise SystemExit("No complete product captures found.")
+
+    elapsed = benchmark(corpus, args.rounds)
+    products = len(corpus) * args.rounds
+    pages = products * len(FRAMES)
+    size_mb = sum(len(s) for p in corpus for s in p.values()) * args.rounds / 1e6
+    print(f"{products} products / {pages} pages in {elapsed:.3f} s: "
+          f"{products / elapsed:.0f} products/s, {pages / elapsed:.0f} pages/s, "
+          f"{size_mb / elapsed:.1f} MB/s")
@@ -0,0 +1,63 @@
+import argparse
+import logging
+import time
+from mock_shopware import MockShopwareServer
+from shopware_api import ApiShopUploader, BulkShopUploader
+
+
+def make_products(count):
+    return [{
+        "artikelnummer": f"BENCH{i:05d}",
+        "verpackungseinheit": "6",
+        "beschreibung_en": f"<p>Description {i}</p>",
+        "beschreibung_fr": f"<p>Description FR {i}</p>",
+        "titel_GBR": f"Title {i}",
+        "titel_FRA": f"Titre {i}",
+        "handler_preis": "4.20",
+        "endkunde_preis": "8.40",
+    } for i in range(count)]
+
+
+def run_single(products, latency_s):
+    numbers = [p["artikelnummer"] for p in products]
+    with MockShopwareServer(product_numbers=numbers, latency_s=latency_s) as server:
+        uploader = ApiShopUploader({"SHOPWARE_API": {"url": server.url}})
+        uploader.load_lookups()
+        start = time.perf_counter()
+        for product_data in products:
+            uploader.go_to_shop(product_data)
+            uploader.run_sequence(product_data)
+        return time.perf_counter() - start, server.request_count
+
+
+def run_bulk(products, latency_s, batch_size):
+    numbers = [p["artikelnummer"] for p in products]
+    with MockShopwareServer(product_numbers=numbers, latency_s=latency_s) as server:
+        uploader = BulkShopUploader({"SHOPWARE_API": {
+            "url": server.url, "bulk_batch_size": batch_size, "bulk_flush_interval_s": 3600
+        }})
+        uploader.load_lookups()
+        start = time.perf_counter()
+        for product_data in products:
+            uploader.add(product_data)
+        uploader.flush()
+        return time.perf_counter() - start, server.request_count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-product vs. bulk sync upload against a local mock.")
+    parser.add_argument("--products", type=int, default=500)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--latency-ms", type=float, default=5.0,
+                        help="Simulated server latency per request.")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    products = make_products(args.products)
+    latency_s = args.latency_ms / 1000
+    for label, (elapsed, requests_sent) in (
+        ("per-product API", run_single(products, latency_s)),
+        (f"bulk sync (batch {args.batch_size})", run_bulk(products, latency_s, args.batch_size)),
+    ):
+        print(f"{label:28s} {elapsed:8.2f} s  {len(products) / elapsed:8.1f} products/s  "
+              f"{requests_sent} requests")
@@ -1,14 +1,30 @@
 import logging
-import time
 import json
 from bs4 import BeautifulSoup
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait, Select
 from selenium.webdriver.support import expected_conditions as EC
+from page_waits import PageWaits
+from metrics import timed
+from tricoma_snapshot import (
+    ElementExtractor, PageSourceExtractor, TricomaSnapshot, WebDriverCommandCounter, count_webdriver_commands,
+)
 
 class CRMDownloader:
-    def __init__(self, driver):
+    def __init__(self, driver, extraction_mode="snapshot", capture_dir=None, index=None):
         self.driver = driver
+        self.index = index
+        self.waits = PageWaits(driver)
+        if extraction_mode == "source":
+            logging.info("Tricoma extraction: offline page_source parsing.")
+            self.snapshot = PageSourceExtractor(driver, capture_dir)
+        elif extraction_mode == "elements":
+            logging.info("Tricoma extraction: per-element reads.")
+            self.snapshot = ElementExtractor(driver)
+        else:
+            self.snapshot = TricomaSnapshot(driver)
+        # Commands spent reading product, language and price fields, for bench_end_to_end.
+        self.extraction_commands = WebDriverCommandCounter()
 
     def load_product_data(self, filename="product_data.json"):
         try:
@@ -41,6 +57,7 @@ class CRMDownloader:
         tabs = self.driver.window_handles
         logging.info("Open tabs: %s", tabs)
 
+    @timed()
     def switch_to_crm(self):
         tabs = self.driver.window_handles
         if len(tabs) >= 1:
@@ -50,6 +67,7 @@ class CRMDownloader:
         else:
             logging.error("No open tabs to switch to (CRM).")
 
+    @timed()
     def switch_to_product_iframe(self):
         self.driver.switch_to.default_content()
         logging.info("Switching to iframe with id 'contentframeprodukte'.")
@@ -59,6 +77,7 @@ class CRMDownloader:
         self.driver.switch_to.frame(product_iframe)
         logging.info("Switched to product iframe.")
 
+    @timed()
     def wait_for_product_page(self):
         logging.info("Waiting for product page to load (element with id 'feld44').")
         try:
@@ -70,6 +89,7 @@ class CRMDownloader:
             logging.error("Failed to find element 'feld44': %s", e)
             raise
 
+    @timed()
     def fill_product_data(self):
         try:
             logging.info("Filling 'feld93' with value 'Stck'.")
@@ -102,6 +122,7 @@ class CRMDownloader:
         except Exception as e:
             logging.error("Error setting select 'feld99': %s", e)
 
+    @timed()
     def click_save(self):
         try:
             logging.info("Clicking save button.")
@@ -113,7 +134,8 @@ class CRMDownloader:
         except Exception as e:
             logging.error("Error clicking save button: %s", e)
 
-    def remove_inline_styles(self, html):
+    @staticmethod
+    def remove_inline_styles(html):
         soup = BeautifulSoup(html, "html.parser")
         for tag in soup.find_all(True):
             for attr in ["style", "data-mce-style"]:
@@ -121,44 +143,35 @@ class CRMDownloader:
                     del tag[attr]
         return str(soup)
 
+    @timed()
     def get_product_details(self):
         product_data = {}
         try:
-            logging.info("Retrieving product number from 'feld44'.")
-            new_field = WebDriverWait(self.driver, 10).until(
-                EC.presence_of_element_located((By.XPATH, "//*[@id='feld44']"))
-            )
-            artikelnummer = new_field.get_attribute("value")
-            product_data["artikelnummer"] = artikelnummer
-            logging.info("Product number: %s", artikelnummer)
-        except Exception as e:
-            logging.error("Error retrieving product number: %s", e)
-        try:
-            logging.info("Retrieving packaging unit from 'feld82_vorne'.")
-            verpackungseinheit = self.driver.find_element(By.ID, "feld82_vorne").get_attribute("value")
-            product_data["verpackungseinheit"] = verpackungseinheit
-            logging.info("Packaging unit: %s", verpackungseinheit)
+            logging.info("Retrieving product fields (feld44, feld82_vorne, description) in one snapshot.")
+            with count_webdriver_commands(self.driver, self.extraction_commands, log=False):
+                fields = self.snapshot.product_fields()
         except Exception as e:
-            logging.error("Error retrieving packaging unit: %s", e)
-        try:
-            logging.info("Retrieving product description from editor iframe.")
-            desc_iframe = WebDriverWait(self.driver, 10).until(
-                EC.presence_of_element_located((By.ID, "tri_editor_feld42_ifr"))
-            )
-            self.driver.switch_to.frame(desc_iframe)
-            body_elem = WebDriverWait(self.driver, 10).until(
-                EC.presence_of_element_located((By.TAG_NAME, "body"))
-            )
-            beschreibung = body_elem.get_attribute("innerHTML")
-            beschreibung = self.remove_inline_styles(beschreibung)
-            product_data["beschreibung"] = beschreibung
+            logging.error("Error retrieving product details: %s", e)
+            fields = {}
+        if fields.get("artikelnummer") is not None:
+            product_data["artikelnummer"] = fields["artikelnummer"]
+            logging.info("Product number: %s", fields["artikelnummer"])
+        else:
+            logging.error("Error retrieving product number.")
+        if fields.get("verpackungseinheit") is not None:
+            product_data["verpackungseinheit"] = fields["verpackungseinheit"]
+            logging.info("Packaging unit: %s", fields["verpackungseinheit"])
+        else:
+            logging.error("Error retrieving packaging unit.")
+        if fields.get("beschreibung") is not None:
+            product_data["beschreibung"] = self.remove_inline_styles(fields["beschreibung"])
             logging.info("Product description retrieved.")
-            self.driver.switch_to.parent_frame()
-        except Exception as e:
-            logging.error("Error retrieving product description: %s", e)
+        else:
+            logging.error("Error retrieving product description.")
             product_data["beschreibung"] = ""
         return product_data
 
+    @timed()
     def handle_language_popup(self, product_data):
         try:
             logging.info("Clicking language selection button (alt='Sprachwahl').")
@@ -172,41 +185,25 @@ class CRMDownloader:
         logging.info("Returning to main context.")
         self.driver.switch_to.default_content()
         try:
-            logging.info("Waiting for language popup iframe (id='contentframeSprache').")
-            lang_iframe = WebDriverWait(self.driver, 10).until(
-                EC.presence_of_element_located((By.ID, "contentframeSprache"))
-            )
-            self.driver.switch_to.frame(lang_iframe)
-            logging.info("Switched to language popup iframe.")
+            logging.info("Retrieving title fields from popup 'contentframeSprache'.")
+            with count_webdriver_commands(self.driver, self.extraction_commands, log=False):
+                fields = self.snapshot.language_fields()
         except Exception as e:
+            # Without the popup frame the flow cannot go on, as before snapshots.
             logging.error("Error switching to language popup iframe: %s", e)
             raise
-        try:
-            logging.info("Retrieving title fields from popup.")
-            titel_fr_elem = WebDriverWait(self.driver, 10).until(
-                EC.presence_of_element_located((By.NAME, "titel_FRA"))
-            )
-            product_data["titel_FRA"] = titel_fr_elem.get_attribute("value")
-            logging.info("Retrieved 'titel_FRA': %s", product_data["titel_FRA"])
-            titel_eng_elem = WebDriverWait(self.driver, 10).until(
-                EC.presence_of_element_located((By.NAME, "titel_GBR"))
-            )
-            product_data["titel_GBR"] = titel_eng_elem.get_attribute("value")
-            logging.info("Retrieved 'titel_GBR': %s", product_data["titel_GBR"])
-        except Exception as e:
-            logging.error("Error retrieving data from popup: %s", e)
-        logging.info("Returning to main context.")
-        self.driver.switch_to.default_content()
-        try:
-            close_button = WebDriverWait(self.driver, 10).until(
-                EC.element_to_be_clickable((By.CSS_SELECTOR, "div#window_Sprache img.window_close"))
-            )
-            self.driver.execute_script("arguments[0].click();", close_button)
+        for key in ("titel_FRA", "titel_GBR"):
+            if fields.get(key) is None:
+                logging.error("Error retrieving '%s' from popup.", key)
+                continue
+            product_data[key] = fields[key]
+            logging.info("Retrieved '%s': %s", key, product_data[key])
+        if fields["closed"]:
             logging.info("Popup closed.")
-        except Exception as e:
-            logging.error("Error closing popup: %s", e)
-        self.driver.switch_to.default_content()
+        else:
+            logging.error("Error closing popup: close button not found.")
 
+    @timed()
     def click_sonstige_preise(self):
         logging.info("Switching to iframe 'contentframeprodukte' before clicking 'Sonstige Preise'.")
         self.driver.switch_to.frame("contentframeprodukte")
@@ -223,6 +220,7 @@ class CRMDownloader:
             logging.error("Error clicking 'Sonstige Preise': %s", e)
             raise
 
+    @timed()
     def switch_to_frameunten(self):
         try:
             logging.info("Waiting for iframe 'frameunten'.")
@@ -235,6 +233,7 @@ class CRMDownloader:
             logging.error("Error switching to iframe 'frameunten': %s", e)
             raise
 
+    @timed()
     def click_advanced_price_settings(self):
         try:
             logging.info("Waiting for 'Erweiterte Preiseinstellungen' link.")
@@ -251,30 +250,22 @@ class CRMDownloader:
             logging.error("Error clicking link: %s", e)
             raise
 
+    @timed()
     def get_prices(self, product_data):
         try:
             logging.info("Retrieving prices from 'Weitere Verkaufspreise (€)' section.")
-            container = WebDriverWait(self.driver, 10).until(
-                EC.presence_of_element_located((By.XPATH, "//div[@class='tri_box'][p[contains(., 'Weitere Verkaufspreise (€)')]]"))
-            )
-            table = container.find_element(By.XPATH, ".//div[@class='content']//table[contains(@class, 'table_listing')]")
-            handler_row = table.find_element(By.XPATH, ".//tr[td[contains(., 'Händler (H)')]]")
-            handler_int = handler_row.find_element(By.XPATH, ".//input[contains(@class, 'zahlenfeld_vorkomma')]").get_attribute("value")
-            handler_dec = handler_row.find_element(By.XPATH, ".//input[contains(@class, 'zahlenfeld_nachkomma')]").get_attribute("value")
-            handler_preis = f"{handler_int}.{handler_dec}"
-            product_data["handler_preis"] = handler_preis
-            logging.info("Handler preis: %s", handler_preis)
-            endkunde_row = table.find_element(By.XPATH, ".//tr[td[contains(., 'Endkunden (EK)')]]")
-            endkunde_int = endkunde_row.find_element(By.XPATH, ".//input[contains(@class, 'zahlenfeld_vorkomma')]").get_attribute("value")
-            endkunde_dec = endkunde_row.find_element(By.XPATH, ".//input[contains(@class, 'zahlenfeld_nachkomma')]").get_attribute("value")
-            endkunde_preis = f"{endkunde_int}.{endkunde_dec}"
-            product_data["endkunde_preis"] = endkunde_preis
-            logging.info("Endkunde preis: %s", endkunde_preis)
+            with count_webdriver_commands(self.driver, self.extraction_commands, log=False):
+                fields = self.snapshot.price_fields()
+            product_data["handler_preis"] = fields["handler_preis"]
+            logging.info("Handler preis: %s", fields["handler_preis"])
+            product_data["endkunde_preis"] = fields["endkunde_preis"]
+            logging.info("Endkunde preis: %s", fields["endkunde_preis"])
             self.driver.switch_to.default_content()
         except Exception as e:
             logging.error("Error retrieving prices: %s", e)
             raise
 
+    @timed()
     def click_shopware6(self):
         logging.info("Switching to iframe 'contentframeprodukte' before clicking 'Shopware 6'.")
         self.driver.switch_to.frame("contentframeprodukte")
@@ -293,6 +284,7 @@ class CRMDownloader:
             logging.error("Error clicking 'Shopware 6': %s", e)
             raise
 
+    @timed()
     def switch_to_shopware_frame(self):
         try:
             logging.info("Waiting for iframe 'frameunten' for Shopware 6.")
@@ -306,6 +298,7 @@ class CRMDownloader:
             logging.error("Error switching to iframe 'frameunten': %s", e)
             raise
 
+    @timed()
     def check_and_import_product(self):
         logging.info("Checking if product has already been importiert.")
         try:
@@ -346,6 +339,7 @@ class CRMDownloader:
             raise
         self.driver.switch_to.default_content()
 
+    @timed()
     def click_produktdaten(self):
         try:
             logging.info("Switching to default content and iframe 'contentframeprodukte' before clicking 'Produktdaten'.")
@@ -374,7 +368,44 @@ class CRMDownloader:
             self.driver.switch_to.default_content()
             raise
 
+    @timed()
+    def open_product_by_url(self, product_name):
+        """Loads the product frame from the URL cached by an earlier search; False when there is none or it failed."""
+        url = self.index.get(product_name) if self.index is not None else None
+        if not url:
+            return False
+        logging.info("open_product: loading cached URL for '%s'", product_name)
+        try:
+            self.switch_to_crm()
+            self.waits.mark_frame("contentframeprodukte")
+            self.driver.execute_script("document.getElementById('contentframeprodukte').src = arguments[0];", url)
+            if not self.waits.frame_loaded("product frame loaded", "contentframeprodukte", timeout_s=30):
+                raise TimeoutError(f"product frame did not load {url}")
+            self.switch_to_product_iframe()
+            self.wait_for_product_page()
+        except Exception as e:
+            logging.warning("open_product: cached URL for '%s' failed, searching instead: %s", product_name, e)
+            self.index.forget(product_name)
+            self.driver.switch_to.default_content()
+            return False
+        logging.info("open_product: product page loaded")
+        return True
+
+    def remember_product_url(self, product_name):
+        """Caches the URL of the product page; called from inside the product iframe."""
+        if self.index is None:
+            return
+        try:
+            url = self.driver.execute_script("return window.location.href;")
+            if url and url != "about:blank":
+                self.index.put(product_name, url)
+        except Exception as e:
+            logging.warning("Could not cache the product URL of '%s': %s", product_name, e)
+
+    @timed()
     def open_product(self, product_name):
+        if self.open_product_by_url(product_name):
+            return
         logging.info("open_product: searching for '%s'", product_name)
         self.switch_to_crm()
         self.driver.switch_to.default_content()
@@ -389,7 +420,7 @@ class CRMDownloader:
             logging.warning("open_product: JS click failed, trying normal click()")
             inp.click()
 
-        time.sleep(0.5)
+        self.waits.dom_settled("search box opened", quiet_ms=100, timeout_s=2)
 
         inp = WebDriverWait(self.driver, 5).until(
             EC.element_to_be_clickable((By.ID, "tricoma_maneta_search"))
@@ -403,32 +434,55 @@ class CRMDownloader:
         )
 
         first_link = result_box.find_element(By.CSS_SELECTOR, "a.tricoma_list_element_link")
+        self.waits.mark_frame("contentframeprodukte")
         self.driver.execute_script("arguments[0].click();", first_link)
         logging.info("open_product: clicked first result")
 
-        time.sleep(3)
+        self.waits.frame_loaded("product frame loaded", "contentframeprodukte", timeout_s=30)
 
         self.switch_to_product_iframe()
         self.wait_for_product_page()
+        self.remember_product_url(product_name)
         logging.info("open_product: product page loaded")
 
-    def run_sequence(self):
+    def open_product_page(self):
         self.switch_to_crm()
         self.switch_to_product_iframe()
         self.click_produktdaten()
         self.switch_to_product_iframe()
         self.wait_for_product_page()
+
+    @timed()
+    def save_fixed_fields(self):
+        """Writes to Tricoma; the only part of the sequence a retry must not repeat blindly."""
         self.fill_product_data()
         self.click_save()
+
+    @timed()
+    def read_product(self):
         product_data = self.get_product_details()
         self.handle_language_popup(product_data)
         self.click_sonstige_preise()
         self.switch_to_frameunten()
         self.click_advanced_price_settings()
         self.get_prices(product_data)
+        return product_data
+
+    @timed()
+    def import_to_shopware(self):
+        """Triggers the Shopware 6 sync; check_and_import_product skips products already importiert."""
         self.click_shopware6()
         self.switch_to_shopware_frame()
         self.check_and_import_product()
         self.click_produktdaten()
 
+    @timed()
+    def run_sequence(self):
+        with count_webdriver_commands(self.driver):
+            self.open_product_page()
+            self.save_fixed_fields()
+            product_data = self.read_product()
+            self.import_to_shopware()
+        self.snapshot.save_captured_pages(product_data.get("artikelnummer"))
+
         return product_data
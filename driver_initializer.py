@@ -1,17 +1,230 @@
+import atexit
+import json
 import logging
+import os
+import re
+import tempfile
+import time
+from pathlib import Path
 from selenium import webdriver
 from selenium.webdriver.firefox.service import Service
 from selenium.webdriver.firefox.options import Options
 
+# Named performance profiles; config["BROWSER_PROFILE"] picks one by name or gives the
+# settings directly (a dict, optionally with "base": "<profile name>").
+PROFILES = {
+    "default": {
+        "headless":             False,
+        "page_load_strategy":   "normal",
+        "block_images":         False,
+        "block_fonts":          False,
+        "disable_animations":   False,
+        "blocked_urls":         [],
+    },
+    "fast": {
+        "headless":             False,
+        "page_load_strategy":   "eager",
+        "block_images":         True,
+        "block_fonts":          True,
+        "disable_animations":   True,
+        "blocked_urls":         "third_party",
+    },
+    "headless": {
+        "headless":             True,
+        "page_load_strategy":   "eager",
+        "block_images":         True,
+        "block_fonts":          True,
+        "disable_animations":   True,
+        "blocked_urls":         "third_party",
+    },
+}
+
+# Analytics, tracking and other third-party assets seen on the Tricoma / Shopware pages.
+THIRD_PARTY_URLS = [
+    "*google-analytics.com*",
+    "*googletagmanager.com*",
+    "*doubleclick.net*",
+    "*facebook.net*",
+    "*hotjar.com*",
+    "*matomo*",
+    "*piwik*",
+    "*fonts.googleapis.com*",
+    "*fonts.gstatic.com*",
+    "*gravatar.com*",
+]
+
+# Blocked requests go to a closed local port, so they fail immediately; everything else
+# goes where it went without the blocklist (directly, or through the profile's proxy).
+PAC_TEMPLATE = """function FindProxyForURL(url, host) {
+    var blocked = %s;
+    for (var i = 0; i < blocked.length; i++) {
+        if (shExpMatch(url, blocked[i])) {
+            return "PROXY 127.0.0.1:9";
+        }
+    }
+    return "%s";
+}
+"""
+
+PROXY_ENV = ("HTTPS_PROXY", "https_proxy", "HTTP_PROXY", "http_proxy", "ALL_PROXY", "all_proxy")
+
+PREF_LINE = re.compile(r'user_pref\("([^"]+)",\s*(.+)\);')
+
+
+def resolve_profile(setting):
+    if isinstance(setting, dict):
+        base = PROFILES.get(setting.get("base", "default"), PROFILES["default"])
+        profile = {**base, **{k: v for k, v in setting.items() if k != "base"}}
+    else:
+        name = setting or "default"
+        if name not in PROFILES:
+            logging.warning("Unknown browser profile '%s' — using default.", name)
+            name = "default"
+        profile = dict(PROFILES[name])
+    if profile["blocked_urls"] == "third_party":
+        profile["blocked_urls"] = list(THIRD_PARTY_URLS)
+    return profile
+
+
+def write_pac_file(patterns, directory=None, fallback="DIRECT"):
+    """Writes the blocklist PAC file; returns its path."""
+    quoted = ", ".join('"%s"' % p.replace("\\", "\\\\").replace('"', '\\"') for p in patterns)
+    fd, path = tempfile.mkstemp(prefix="blocklist_", suffix=".pac", dir=directory)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(PAC_TEMPLATE % ("[" + quoted + "]", fallback))
+    return path
+
+
+def profile_prefs(profile_dir):
+    """user_pref values from the Firefox profile's prefs.js and user.js (user.js wins)."""
+    prefs = {}
+    for name in ("prefs.js", "user.js"):
+        path = os.path.join(profile_dir, name)
+        if not os.path.exists(path):
+            continue
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            for line in f:
+                match = PREF_LINE.match(line.strip())
+                if match:
+                    try:
+                        prefs[match.group(1)] = json.loads(match.group(2))
+                    except ValueError:
+                        pass
+    return prefs
+
+
+def pac_fallback(profile_dir):
+    """
+    What the blocklist PAC returns for allowed URLs: "DIRECT", or "PROXY host:port" for a
+    manual proxy set in the profile. None when a proxy is configured that a PAC file cannot
+    chain to (the profile's own PAC file or auto-detection, or a system proxy from the environment).
+    """
+    prefs = profile_prefs(profile_dir) if profile_dir and os.path.isdir(profile_dir) else {}
+    proxy_type = prefs.get("network.proxy.type", 5)
+    if proxy_type == 1:
+        host, port = prefs.get("network.proxy.http"), prefs.get("network.proxy.http_port")
+        return f"PROXY {host}:{port}" if host and port else "DIRECT"
+    if proxy_type in (2, 4):
+        return None
+    if proxy_type == 5 and any(os.environ.get(name) for name in PROXY_ENV):
+        return None
+    return "DIRECT"
+
+
 class DriverInitializer:
     def __init__(self, config):
         self.config = config
+        self.profile = resolve_profile(config.get("BROWSER_PROFILE", "default"))
+        self.cold_start_s = None
+        self.pac_file = None
 
-    def init_driver(self):
-        logging.info("Initializing Firefox with geckodriver and dedicated profile.")
-        service = Service(self.config["GECKODRIVER_PATH"])
+    def build_options(self):
+        profile = self.profile
         options = Options()
         options.binary_location = self.config["FIREFOX_BINARY"]
         options.profile = self.config["FIREFOX_PROFILE"]
-        driver = webdriver.Firefox(service=service, options=options)
+        options.page_load_strategy = profile["page_load_strategy"]
+        if profile["headless"]:
+            options.add_argument("-headless")
+        if profile["block_images"]:
+            options.set_preference("permissions.default.image", 2)
+            options.set_preference("image.animation_mode", "none")
+        if profile["block_fonts"]:
+            options.set_preference("browser.display.use_document_fonts", 0)
+            options.set_preference("gfx.downloadable_fonts.enabled", False)
+        if profile["disable_animations"]:
+            options.set_preference("ui.prefersReducedMotion", 1)
+            options.set_preference("toolkit.cosmeticAnimations.enabled", False)
+            options.set_preference("layout.css.scroll-behavior.enabled", False)
+        if profile["blocked_urls"]:
+            fallback = pac_fallback(self.config.get("FIREFOX_PROFILE"))
+            if fallback is None:
+                logging.warning("A proxy is configured for the browser — URL blocking left off so it stays in use.")
+            else:
+                self.remove_pac_file()
+                self.pac_file = write_pac_file(profile["blocked_urls"], fallback=fallback)
+                atexit.register(self.remove_pac_file)
+                options.set_preference("network.proxy.type", 2)
+                options.set_preference("network.proxy.autoconfig_url", Path(self.pac_file).resolve().as_uri())
+        return options
+
+    def remove_pac_file(self):
+        if self.pac_file is None:
+            return
+        try:
+            os.remove(self.pac_file)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logging.warning("Could not remove %s: %s", self.pac_file, e)
+        self.pac_file = None
+
+    def init_driver(self):
+        logging.info("Initializing Firefox with geckodriver and dedicated profile.")
+        logging.info(
+            "Browser profile: headless=%s, page load=%s, images=%s, fonts=%s, animations=%s, %d blocked URL patterns.",
+            self.profile["headless"], self.profile["page_load_strategy"],
+            "off" if self.profile["block_images"] else "on",
+            "off" if self.profile["block_fonts"] else "on",
+            "off" if self.profile["disable_animations"] else "on",
+            len(self.profile["blocked_urls"]),
+        )
+        service = Service(self.config["GECKODRIVER_PATH"])
+        options = self.build_options()
+        start = time.perf_counter()
+        try:
+            driver = webdriver.Firefox(service=service, options=options)
+        except Exception:
+            self.remove_pac_file()
+            raise
+        self.cold_start_s = time.perf_counter() - start
+        logging.info("Firefox started in %.1f s.", self.cold_start_s)
+        if self.pac_file is not None:
+            # Firefox reads the PAC file while it runs; it goes with the browser.
+            quit_driver = driver.quit
+
+            def quit():
+                try:
+                    quit_driver()
+                finally:
+                    self.remove_pac_file()
+
+            driver.quit = quit
         return driver
+
+
+def measure_page_load(driver, url):
+    """Loads url and returns wall time plus the browser's navigation timings (seconds)."""
+    start = time.perf_counter()
+    driver.get(url)
+    wall = time.perf_counter() - start
+    timing = driver.execute_script(
+        "var t = performance.getEntriesByType('navigation')[0];"
+        "return t ? {dom: t.domContentLoadedEventEnd, load: t.loadEventEnd} : null;"
+    ) or {}
+    return {
+        "url": url,
+        "wall_s": round(wall, 3),
+        "dom_content_loaded_s": round((timing.get("dom") or 0) / 1000, 3),
+        "load_s": round((timing.get("load") or 0) / 1000, 3),
+    }
@@ -1,24 +1,131 @@
 import time
 import logging
 import os
+import threading
+from collections import deque
+from itertools import islice
 from crm_downloader import CRMDownloader
-from shop_uploader import ShopUploader
-from translator import Translator
+from http_scraper import TricomaHttpScraper
+from job_queue import JobQueue, worker_id
+from metrics import metrics
+from pipeline import BatchPipeline
+from pricing import DEFAULT_RULES, PriceError, PricingEngine
+from retry_policy import RetryPolicies, classify
+from product_index import ShopwareProductIndex, TricomaProductIndex
+from product_store import ProductStore
+from shop_uploader import ShopUploader, UploadStepError
+from shopware_api import ApiShopUploader, BulkShopUploader
+from translator import TARGET_LANGUAGES, Translator
+from tricoma_export import TricomaExport
+from tricoma_snapshot import count_webdriver_commands
+
+# Scraped fields written by each ShopUploader sub-step; a step whose fields are all
+# unchanged since the last upload is skipped.
+UPLOAD_STEP_FIELDS = {
+    "upload.base":      ("handler_preis", "endkunde_preis", "verpackungseinheit", "pricing"),
+    "upload.text_en":   ("titel_GBR", "beschreibung"),
+    "upload.text_fr":   ("titel_FRA", "beschreibung"),
+}
 
 class ProcessFacade:
     def __init__(self, driver, config):
         self.driver = driver
         self.config = config
-        self.crm_downloader = CRMDownloader(driver)
-        self.shop_uploader = ShopUploader(driver)
+        self.tricoma_index = TricomaProductIndex(config.get("TRICOMA_INDEX", {}))
+        self.crm_downloader = CRMDownloader(
+            driver,
+            extraction_mode=config.get("CRM_EXTRACTION", "snapshot"),
+            capture_dir=config.get("CRM_CAPTURE_DIR"),
+            index=self.tricoma_index,
+        )
+        self.product_index = ShopwareProductIndex(config.get("PRODUCT_INDEX", {}))
+        self.pricing = PricingEngine.from_config(config)
+        self.shop_uploader = self.create_shop_uploader()
         self.translator = Translator(config)
+        self.products = ProductStore(config.get("PRODUCT_STORE", {}))
+        # Retry and circuit-breaker policies; the worker pool replaces them with one shared instance.
+        self.policies = RetryPolicies(config.get("RETRY_POLICIES", {}))
+        self.price_rules = tuple(config.get("SHOPWARE_API", {}).get("rules", DEFAULT_RULES))
+        # Job queue of the running batch; also holds the per-product step checkpoints.
+        self.jobs = None
+        self.skip_unchanged = config.get("SKIP_UNCHANGED", True)
+        # Products whose descriptions go to DeepL together (export import and pipeline).
+        self.translate_batch_size = max(int(config.get("TRANSLATE_BATCH_SIZE", 50)), 1)
+        self.stats_lock = threading.Lock()
+        self.batch_stats = {"skipped": 0, "processed": 0, "processed_s": 0.0}
+        # Bulk uploads are confirmed at flush: artikelnummer -> [(name, product_data)] until then.
+        self.pending_uploads = {}
+        # on_flushed(name, product_data, error) settles a bulk upload once its flush succeeded (error None) or failed.
+        self.on_flushed = None
+
+    def create_shop_uploader(self):
+        mode = self.config.get("UPLOAD_MODE", "selenium")
+        if mode == "api":
+            logging.info("Upload mode: Shopware Admin API.")
+            return ApiShopUploader(self.config, self.product_index)
+        if mode == "bulk":
+            logging.info("Upload mode: batched Shopware sync.")
+            return BulkShopUploader(self.config, self.product_index)
+        if mode != "selenium":
+            logging.warning("Unknown UPLOAD_MODE '%s' — falling back to selenium.", mode)
+        api = self.config.get("SHOPWARE_API", {})
+        return ShopUploader(
+            self.driver, self.product_index, self.pricing,
+            channels=api.get("sales_channels"), channel_count=api.get("sales_channel_count", 4),
+        )
+
+    @property
+    def defers_uploads(self):
+        """True when uploads are only buffered by upload_product and confirmed by a later flush."""
+        return hasattr(self.shop_uploader, "flush")
+
+    def refresh_product_index(self):
+        """Picks up products created or changed in Shopware since the last refresh (API upload modes only)."""
+        client = getattr(self.shop_uploader, "client", None)
+        if client is None or not self.product_index.cfg["refresh_on_batch"]:
+            return
+        try:
+            self.product_index.refresh(client)
+        except Exception as e:
+            logging.warning("Refreshing the Shopware product index failed: %s", e)
+
+    def preresolve_products(self, jobs):
+        """
+        Resolves every open product name over HTTP before the batch starts, so names
+        Tricoma does not know are reported (and not claimed) before any browser time is spent.
+        """
+        if not self.tricoma_index.enabled or not self.tricoma_index.cfg["preresolve"]:
+            return
+        names = jobs.open_names()
+        start = time.perf_counter()
+        try:
+            scraper = TricomaHttpScraper.from_driver(self.driver, self.config, self.tricoma_index)
+            unresolved = scraper.resolve_many(names)
+        except Exception as e:
+            logging.warning("Pre-resolving the product list failed, products are searched one by one: %s", e)
+            return
+        if names and len(unresolved) == len(names):
+            # Nothing resolved at all points at the session (logged out) rather than the names.
+            logging.warning("No product name could be pre-resolved — is the Tricoma session still logged in?")
+            return
+        for name, error in unresolved.items():
+            logging.error("Product '%s' not found in Tricoma — skipped this run: %s", name, error)
+            jobs.give_up(name, error)
+        logging.info(
+            "Pre-resolved %d product names in %.1f s (%d requests); %d not found.",
+            len(names), time.perf_counter() - start, scraper.request_count, len(unresolved),
+        )
+        # The batch summary counts the opens of the batch itself.
+        self.tricoma_index.hits = self.tricoma_index.misses = 0
 
     def run_full_process(self):
         # Download data from CRM
         product_data = self.crm_downloader.run_sequence()
+        self.products.append("scraped", product_data)
         self.crm_downloader.save_product_data(product_data)
         # Translate description
         product_data = self.translator.translate_product(product_data)
+        self.products.append("translated", product_data)
         self.crm_downloader.display_final_info(product_data)
         self.crm_downloader.save_product_data(product_data)
         # Upload to shop
@@ -29,14 +136,259 @@ class ProcessFacade:
         self.shop_uploader.run_sequence(product_data)
         return product_data
 
-    def run_download_process(self):
+    def run_download_process(self, save=True):
+        """Downloads the open product. product_data.json is only kept for the single-product menu options."""
         product_data = self.crm_downloader.run_sequence()
-        self.crm_downloader.save_product_data(product_data)
+        self.products.append("scraped", product_data)
+        if save:
+            self.crm_downloader.save_product_data(product_data)
+        return product_data
+
+    def completed_steps(self, name):
+        return self.jobs.checkpoints(name) if self.jobs is not None else {}
+
+    def checkpoint(self, name, step, data=None):
+        if self.jobs is not None:
+            self.jobs.checkpoint(name, step, data)
+
+    def resumed_data(self, name):
+        """Product data of an earlier, interrupted attempt (translated if that step finished), or None."""
+        done = self.completed_steps(name)
+        product_data = done.get("translate") or done.get("download")
+        if product_data is not None:
+            logging.info("Resuming %s from checkpoint (done: %s).", name, ", ".join(sorted(done)))
         return product_data
 
-    def run_translate_process(self):
-        product_data = self.crm_downloader.load_product_data()
+    def changed_fields(self, product_data):
+        """Scraped fields changed since the last upload; None when unknown (new product or SKIP_UNCHANGED off)."""
+        if not self.skip_unchanged or not product_data:
+            return None
+        # Compared with the pricing column of the last upload, computed with the current configuration.
+        try:
+            pricing = self.pricing.price(product_data, self.price_rules)
+        except PriceError:
+            return None
+        return self.products.changed_fields({**product_data, "pricing": pricing})
+
+    def unchanged_steps(self, product_data):
+        changed = self.changed_fields(product_data)
+        if changed is None:
+            return set()
+        return {step for step, fields in UPLOAD_STEP_FIELDS.items() if not set(fields) & set(changed)}
+
+    def count_time(self, elapsed):
+        with self.stats_lock:
+            self.batch_stats["processed_s"] += elapsed
+
+    def download_products(self, names, on_unchanged=None):
+        """
+        Yields (name, product_data) for each product name, with the data already
+        added to the product store. With CRM_SOURCE "http" the products are
+        fetched concurrently without the browser; product_data is None on failure.
+        Products with a download checkpoint are not fetched again. With on_unchanged
+        set, products identical to their last upload are passed to on_unchanged(name, product_data)
+        instead of being yielded.
+        """
+        for name, product_data in self._download_products(names):
+            if on_unchanged is not None and product_data is not None and self.changed_fields(product_data) == []:
+                logging.info("Product %s unchanged since its last upload — skipped.", name)
+                with self.stats_lock:
+                    self.batch_stats["skipped"] += 1
+                on_unchanged(name, product_data)
+                continue
+            yield name, product_data
+
+    def _download_products(self, names):
+        if isinstance(names, TricomaExport):
+            # Export rows arrive with their data; nothing to fetch.
+            for name, product_data in names:
+                self.products.append("scraped", product_data, name)
+                yield name, product_data
+            return
+        if self.config.get("CRM_SOURCE", "selenium") == "http":
+            scraper = TricomaHttpScraper.from_driver(self.driver, self.config, self.tricoma_index, self.policies)
+            resumed = deque()
+
+            def to_scrape():
+                for name in names:
+                    product_data = self.resumed_data(name)
+                    if product_data is None:
+                        yield name
+                    else:
+                        resumed.append((name, product_data))
+
+            for name, product_data in scraper.scrape_many(to_scrape()):
+                while resumed:
+                    yield resumed.popleft()
+                if product_data is not None:
+                    self.products.append("scraped", product_data, name)
+                    self.checkpoint(name, "download", product_data)
+                yield name, product_data
+            while resumed:
+                yield resumed.popleft()
+            return
+        for name in names:
+            product_data = self.resumed_data(name)
+            if product_data is None:
+                try:
+                    with metrics.product(name):
+                        product_data = self.download_product(name)
+                except Exception as e:
+                    if classify(e) == "session_lost":
+                        raise
+                    logging.error("Download of '%s' failed: %s", name, e)
+                if product_data is not None:
+                    self.products.append("scraped", product_data, name)
+                    self.checkpoint(name, "download", product_data)
+            yield name, product_data
+
+    def download_product(self, name):
+        """
+        Opens and scrapes one product in the browser under the 'download' retry policy. The fixed
+        fields are saved once; a failed attempt reopens the product and repeats only the reading,
+        or the Shopware import, which checks for 'importiert' first.
+        """
+        downloader = self.crm_downloader
+        page_open = False
+
+        def on_page(action):
+            def attempt():
+                nonlocal page_open
+                if not page_open:
+                    downloader.open_product(name)
+                    downloader.open_product_page()
+                # A failing action leaves the frames anywhere; the retry starts from a fresh page.
+                page_open = False
+                result = action()
+                page_open = True
+                return result
+            return self.policies.call("download", "tricoma", attempt)
+
+        with count_webdriver_commands(self.driver):
+            on_page(lambda: None)
+            downloader.save_fixed_fields()
+            product_data = on_page(downloader.read_product)
+            on_page(downloader.import_to_shopware)
+        downloader.snapshot.save_captured_pages(product_data.get("artikelnummer"))
+        return product_data
+
+    def stored_translations(self, name, product_data):
+        """Copies the translations of the last version into product_data when its description did not change."""
+        changed = self.changed_fields(product_data)
+        if changed is None or "beschreibung" in changed:
+            return False
+        previous = self.products.latest(product_data["artikelnummer"], "translated")
+        if previous is None or previous.get("beschreibung") != product_data.get("beschreibung"):
+            return False
+        keys = list(TARGET_LANGUAGES.values())
+        if not all(previous.get(key) for key in keys):
+            logging.info("Stored translations of %s are incomplete — translating again.", name)
+            return False
+        logging.info("Description of %s unchanged — reusing the stored translations.", name)
+        for key in keys:
+            product_data[key] = previous[key]
+        return True
+
+    def translate_product(self, name, product_data):
+        if "translate" in self.completed_steps(name):
+            logging.info("Translation of %s already done — skipped.", name)
+            return product_data
+        start = time.perf_counter()
+        if not self.stored_translations(name, product_data):
+            # strict: a failed translation fails the product instead of uploading empty texts.
+            product_data = self.policies.call(
+                "translate", "deepl", self.translator.translate_product, product_data, strict=True
+            )
+        self.products.append("translated", product_data, name)
+        self.checkpoint(name, "translate", product_data)
+        self.count_time(time.perf_counter() - start)
+        return product_data
+
+    def translate_products(self, items):
+        """
+        translate_product for a list of (name, product_data): the descriptions still to translate
+        go to DeepL together, in as few requests as its limits allow. Returns (name, product_data,
+        error) in input order; error is set for the products whose translation failed (strict,
+        so they are not uploaded with empty texts).
+        """
+        start = time.perf_counter()
+        results = []
+        to_store = []
+        to_translate = []
+        for name, product_data in items:
+            if "translate" in self.completed_steps(name):
+                logging.info("Translation of %s already done — skipped.", name)
+            else:
+                to_store.append(len(results))
+                if not self.stored_translations(name, product_data):
+                    to_translate.append(len(results))
+            results.append((name, product_data, None))
+        if to_translate:
+            failed = self.translator.translate_batch([results[i][1] for i in to_translate], strict=True)
+            for position, error in failed.items():
+                name, product_data, _ = results[to_translate[position]]
+                results[to_translate[position]] = (name, product_data, error)
+        for i in to_store:
+            name, product_data, error = results[i]
+            if error is None:
+                self.products.append("translated", product_data, name)
+                self.checkpoint(name, "translate", product_data)
+        self.count_time(time.perf_counter() - start)
+        return results
+
+    def price_product(self, product_data):
+        """Adds the 'pricing' column the uploaders write; a product without valid prices fails its upload."""
+        try:
+            return self.pricing.apply(product_data, self.price_rules)
+        except PriceError as e:
+            raise UploadStepError(f"pricing {product_data.get('artikelnummer')}: {e}")
+
+    def upload_product(self, name, product_data):
+        """
+        Opens the product in the shop and uploads it, resuming after the upload steps already
+        saved and leaving out the steps whose fields did not change since the last upload.
+        """
+        start = time.perf_counter()
+        self.price_product(product_data)
+
+        def failed(what):
+            # The API uploaders keep the exception behind a False; otherwise the step itself is the error.
+            return getattr(self.shop_uploader, "last_error", None) or UploadStepError(
+                f"{what} {product_data.get('artikelnummer')} failed"
+            )
+
+        def attempt():
+            if self.shop_uploader.go_to_shop(product_data) is False:
+                raise failed("opening")
+            if isinstance(self.shop_uploader, ShopUploader):
+                # Read per attempt, so a retry resumes after the sub-steps the failed one saved.
+                completed = set(self.completed_steps(name)) | self.unchanged_steps(product_data)
+                return self.shop_uploader.run_sequence(
+                    product_data,
+                    completed=completed,
+                    on_step=lambda step: self.checkpoint(name, step),
+                )
+            if self.shop_uploader.run_sequence(product_data) is False:
+                raise failed("uploading")
+            return True
+
+        # Raises when the product could not be opened or written, so callers fail its job.
+        result = self.policies.call("upload", "shopware", attempt)
+        if self.defers_uploads:
+            self.pending_uploads.setdefault(product_data.get("artikelnummer"), []).append((name, product_data))
+            self.record_flushed()
+        else:
+            self.products.record_upload(product_data)
+        with self.stats_lock:
+            self.batch_stats["processed"] += 1
+        self.count_time(time.perf_counter() - start)
+        return result
+
+    def run_translate_process(self, product_data=None):
+        if product_data is None:
+            product_data = self.crm_downloader.load_product_data()
         product_data = self.translator.translate_product(product_data)
+        self.products.append("translated", product_data)
         self.crm_downloader.display_final_info(product_data)
         self.crm_downloader.save_product_data(product_data)
         return product_data
@@ -44,27 +396,195 @@ class ProcessFacade:
     def get_data(self):
         return self.crm_downloader.load_product_data()
 
-    def go_to_shop(self):
-        product_data = self.get_data()
+    def go_to_shop(self, product_data=None):
+        if product_data is None:
+            product_data = self.get_data()
         self.shop_uploader.go_to_shop(product_data)
         return product_data
 
-    def run_upload_process(self):
-        product_data = self.get_data()
+    def run_upload_process(self, flush=True, product_data=None):
+        if product_data is None:
+            product_data = self.get_data()
+        self.price_product(product_data)
         self.shop_uploader.run_sequence(product_data)
+        if flush:
+            self.flush_uploads()
         return product_data
 
+    def reupload_from_store(self, artikelnummern=None):
+        """Uploads the newest translated record of each stored product (or of the given article numbers) again."""
+        uploaded = 0
+        for product_data in self.products.iter_latest("translated", artikelnummern):
+            artikelnummer = product_data.get("artikelnummer")
+            logging.info("=== Re-uploading product: %s ===", artikelnummer)
+            try:
+                with metrics.product(artikelnummer):
+                    self.price_product(product_data)
+                    self.shop_uploader.go_to_shop(product_data)
+                    self.shop_uploader.run_sequence(product_data)
+                uploaded += 1
+            except Exception as e:
+                logging.error("Re-upload of %s failed: %s", artikelnummer, e)
+        self.flush_uploads()
+        metrics.export()
+        logging.info("Re-uploaded %d products from the product store.", uploaded)
+        return uploaded
+
+    def preview_export_prices(self, export_file=None):
+        """Price preview report (PRICING preview_file) of an export, compared with the stored records. Uploads nothing."""
+        export = TricomaExport(export_file, self.config.get("TRICOMA_EXPORT", {}))
+        return self.pricing.preview(
+            (product_data for _, product_data in export),
+            previous=lambda number: self.products.latest(number, "translated"),
+            rules=self.price_rules,
+        )
+
+    def preview_store_prices(self, artikelnummern=None):
+        """Price preview report of the stored products (or of the given article numbers). Uploads nothing."""
+        return self.pricing.preview(self.products.iter_latest("translated", artikelnummern), rules=self.price_rules)
+
+    def pause_requested(self, pause_file):
+        try:
+            with open(pause_file, "r", encoding="utf-8") as pf:
+                return pf.read().strip() == "-"
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            logging.warning("Failed to read %s (%s) — import continues.", pause_file, e)
+            return False
+
+    def run_export_process(self, export_file=None, pause_file="pause.txt"):
+        """
+        Copies every article of a Tricoma export (CSV or XML, TRICOMA_EXPORT) to the shop.
+        The rows are streamed straight into translation and upload without opening Tricoma;
+        products unchanged since their last upload are skipped. Returns False when pause.txt stopped it.
+        """
+        export = TricomaExport(export_file, self.config.get("TRICOMA_EXPORT", {}))
+        if not os.path.exists(export.path):
+            logging.error("File %s does not exist.", export.path)
+            return False
+        self.jobs = None
+        self.batch_stats = {"skipped": 0, "processed": 0, "processed_s": 0.0}
+        metrics.reset()
+        failed = 0
+        uploaded = 0
+        start = time.perf_counter()
+
+        def finish_product(name, product_data):
+            nonlocal uploaded
+            uploaded += 1
+            if self.pause_requested(pause_file):
+                logging.info("Found '-' in %s — stopping the export import.", pause_file)
+                return False
+            return True
+
+        def fail_product(name, error):
+            nonlocal failed
+            failed += 1
+            logging.error("Product %s from the export failed: %s", name, error)
+
+        def settle_upload(name, product_data, error):
+            # Counted as uploaded when it was buffered; the flush rejected it.
+            nonlocal uploaded
+            if error is not None:
+                uploaded -= 1
+                fail_product(name, error)
+
+        self.on_flushed = settle_upload
+        try:
+            if self.config.get("BATCH_PIPELINE", False):
+                pipeline = BatchPipeline(
+                    self, self.config.get("PIPELINE_QUEUE_SIZE", 2), download_uses_driver=False,
+                    translate_batch=self.translate_batch_size,
+                )
+                completed = pipeline.run(export, finish_product, fail_product, on_unchanged=lambda name, data: None)
+            else:
+                completed = True
+                products = self.download_products(export, on_unchanged=lambda name, data: None)
+                # Rows are translated a chunk at a time, so DeepL gets full requests instead of one per product.
+                while completed:
+                    chunk = list(islice(products, self.translate_batch_size))
+                    if not chunk:
+                        break
+                    for name, product_data, error in self.translate_products(chunk):
+                        if error is None:
+                            logging.info("=== Processing product: %s ===", name)
+                            try:
+                                with metrics.product(name):
+                                    self.upload_product(name, product_data)
+                            except Exception as e:
+                                if classify(e) == "session_lost":
+                                    raise
+                                error = e
+                        if error is not None:
+                            fail_product(name, error)
+                            continue
+                        if not finish_product(name, product_data):
+                            completed = False
+                            break
+        finally:
+            self.flush_uploads()
+            self.on_flushed = None
+            self.log_change_detection()
+            logging.info(
+                "Export import: %d rows, %d uploaded, %d unchanged, %d failed, %d invalid rows in %.1f s.",
+                export.rows, uploaded, self.batch_stats["skipped"], failed, export.skipped,
+                time.perf_counter() - start,
+            )
+        self.translator.log_cache_stats()
+        metrics.export()
+        return completed
+
+    def log_change_detection(self):
+        stats = self.batch_stats
+        if not stats["skipped"]:
+            return
+        if stats["processed"]:
+            per_product = stats["processed_s"] / stats["processed"]
+            logging.info(
+                "Change detection: %d unchanged products skipped, about %.0f s saved "
+                "(%.1f s translate + upload per changed product).",
+                stats["skipped"], stats["skipped"] * per_product, per_product,
+            )
+        else:
+            logging.info("Change detection: %d unchanged products skipped.", stats["skipped"])
+
+    def record_flushed(self):
+        """
+        Settles the bulk-buffered products the flushes since the last call confirmed or rejected:
+        records the fingerprints of the uploaded ones and passes each to on_flushed.
+        Returns {artikelnummer: error} of the rejected ones.
+        """
+        failed = {}
+        for number, error in self.shop_uploader.take_settled():
+            if error is not None:
+                failed[number] = error
+            for name, product_data in self.pending_uploads.pop(number, []):
+                if error is None:
+                    self.products.record_upload(product_data)
+                if self.on_flushed is not None:
+                    self.on_flushed(name, product_data, error)
+        return failed
+
+    def flush_uploads(self):
+        # Only the bulk uploader buffers products between calls.
+        if self.defers_uploads:
+            self.shop_uploader.flush()
+            failed = self.record_flushed()
+            if failed:
+                logging.error("Products failed to upload: %s", failed)
+
     def run_batch_process(self,
                           filename="products.txt",
                           counter_file="product_counter.txt",
                           pause_file="pause.txt"):
         """
-        For each product from the file (one name per line):
-          - call open_product(name)
-          - execute the full copy process
-          - remove the line from the file
-          - update counter and run time
+        Processes the product list (one name per line) through the durable job queue:
+          - sync the file into the queue (new names become jobs, removed ones are cancelled)
+          - claim each job, call open_product(name) and execute the full copy process
+          - mark the job done or failed and update counter and run time
           - check pause.txt and possibly break
+        The file is rewritten once at the end with the products still open.
         """
 
         # --- Initialize counter and start time ---
@@ -90,36 +610,50 @@ class ProcessFacade:
                 processed_count = 0
                 start_time = time.time()
 
-        # --- Load list of products ---
-        try:
-            with open(filename, "r", encoding="utf-8") as f:
-                all_lines = [line.strip() for line in f if line.strip()]
-        except FileNotFoundError:
+        # --- Load list of products into the job queue ---
+        if not os.path.exists(filename):
             logging.error("File %s does not exist.", filename)
             return
+        jobs = self.jobs = JobQueue(self.config.get("JOB_QUEUE", {}))
+        if not jobs.sync_file(filename):
+            logging.info("No open products in %s.", filename)
+            return
 
-        remaining = all_lines.copy()
+        self.preresolve_products(jobs)
+        self.refresh_product_index()
+        worker = worker_id()
+        claimed = {}
+        claimed_lock = threading.Lock()
 
-        # --- Main batch loop ---
-        for name in all_lines:
-            logging.info("=== Processing product: %s ===", name)
-
-            # 1) Open/search
-            self.crm_downloader.open_product(name)
-            # 2) Download, translate, upload
-            self.run_download_process()
-            self.run_translate_process()
-            self.go_to_shop()
-            self.run_upload_process()
-
-            # --- After successful upload ---
-            processed_count += 1
+        def claim_names():
+            for job_id, name in jobs.jobs(worker):
+                with claimed_lock:
+                    claimed.setdefault(name, deque()).append(job_id)
+                yield name
+
+        def take_job(name):
+            with claimed_lock:
+                return claimed[name].popleft()
 
-            # Remove from remaining and overwrite products.txt
-            remaining.remove(name)
-            with open(filename, "w", encoding="utf-8") as f:
-                for r in remaining:
-                    f.write(r + "\n")
+        def skip_product(name, product_data):
+            # Unchanged since its last upload: nothing to translate or write.
+            jobs.complete(take_job(name))
+
+        def settle_upload(name, product_data, error):
+            # Bulk mode: the job ends once the flush confirmed or rejected the buffered upload.
+            job_id = take_job(name)
+            if error is None:
+                jobs.complete(job_id)
+            else:
+                logging.error("Upload of '%s' failed: %s — left in %s.", name, error, filename)
+                jobs.fail(job_id, error)
+
+        def finish_product(name, product_data):
+            """Bookkeeping after a successful upload; returns False when pause.txt asks to stop."""
+            nonlocal processed_count
+            processed_count += 1
+            if not self.defers_uploads:
+                jobs.complete(take_job(name))
 
             # Calculate and save counter + elapsed time
             elapsed = int(time.time() - start_time)
@@ -145,7 +679,7 @@ class ProcessFacade:
                         "Found '-' in %s — aborting batch and returning to menu.",
                         pause_file
                     )
-                    return
+                    return False
             except FileNotFoundError:
                 # file does not exist → continue batch
                 pass
@@ -154,5 +688,79 @@ class ProcessFacade:
                     "Failed to read %s (%s) — batch continues.",
                     pause_file, e
                 )
+            return True
+
+        # --- Main batch loop ---
+        self.batch_stats = {"skipped": 0, "processed": 0, "processed_s": 0.0}
+        # Step timings and the exported summary cover this batch only.
+        metrics.reset()
+        self.on_flushed = settle_upload
+        try:
+            if self.config.get("BATCH_PIPELINE", False):
+                # Browser downloads stay one queue length ahead of the uploads; HTTP ones are fetched ahead anyway.
+                http = self.config.get("CRM_SOURCE", "selenium") == "http"
+                pipeline = BatchPipeline(
+                    self, self.config.get("PIPELINE_QUEUE_SIZE", 2),
+                    translate_batch=self.translate_batch_size if http else 1,
+                )
+                completed = pipeline.run(
+                    claim_names(), finish_product, lambda name, error: jobs.fail(take_job(name), error),
+                    on_unchanged=skip_product,
+                )
+            else:
+                completed = True
+                for name, product_data in self.download_products(claim_names(), on_unchanged=skip_product):
+                    logging.info("=== Processing product: %s ===", name)
+                    if product_data is None:
+                        logging.error("Download of '%s' failed — left in %s.", name, filename)
+                        jobs.fail(take_job(name), "download failed")
+                        continue
+
+                    # Translate, upload (each resumes from its checkpoints after a failed attempt)
+                    try:
+                        with metrics.product(name):
+                            product_data = self.translate_product(name, product_data)
+                            self.crm_downloader.display_final_info(product_data)
+                            self.upload_product(name, product_data)
+                    except Exception as e:
+                        # Saved sub-steps are checkpointed; the next attempt resumes after them.
+                        jobs.fail(take_job(name), e)
+                        if classify(e) == "session_lost":
+                            raise
+                        logging.error("Product '%s' failed: %s — left in %s.", name, e, filename)
+                        continue
+
+                    if not finish_product(name, product_data):
+                        completed = False
+                        break
+        finally:
+            # Buffered bulk uploads settle their jobs first; then jobs claimed ahead
+            # (pipeline, HTTP prefetch) but not finished go back to the queue.
+            self.flush_uploads()
+            self.on_flushed = None
+            with claimed_lock:
+                for job_ids in claimed.values():
+                    for job_id in job_ids:
+                        jobs.release(job_id)
+                claimed.clear()
+            left = jobs.export_file(filename)
+            for name, attempts, error in jobs.failures():
+                logging.error("Product %s failed after %d attempt(s): %s", name, attempts, error)
+            logging.info("%d products left in %s.", left, filename)
+            self.log_change_detection()
+
+        if not completed:
+            metrics.export()
+            return
 
+        self.translator.log_cache_stats()
+        logging.info(
+            "Shopware product index: %d direct opens, %d searches.",
+            self.product_index.hits, self.product_index.misses,
+        )
+        logging.info(
+            "Tricoma product index: %d direct opens, %d searches.",
+            self.tricoma_index.hits, self.tricoma_index.misses,
+        )
+        metrics.export()
         logging.info("Processing from file %s completed.", filename)
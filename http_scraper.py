@@ -0,0 +1,213 @@
+import logging
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote, urljoin
+import requests
+from requests.adapters import HTTPAdapter
+import page_parser
+from crm_downloader import CRMDownloader
+from metrics import metrics, timed
+
+DEFAULTS = {
+    "base_url":             "",
+    "search_path":          "/search?suche={query}",
+    "product_path":         "/produkt?id={product_id}",
+    "language_path":        "/sprache?id={product_id}",
+    "prices_path":          "/produkt?id={product_id}&auswahl=preise",
+    "shopware6_path":       "/shopwaresechs?id={product_id}",
+    "product_id_pattern":   r"[?&]id=(\w+)",
+    "concurrency":          4,
+    "timeout_s":            30,
+    "import_timeout_s":     60,
+    "import_poll_s":        1.0,
+    "form_overrides":       {"feld93": "Stck", "feld94_vorne": "1", "feld99": "124"},
+}
+
+
+class TricomaHttpScraper:
+    """
+    Browserless replacement for CRMDownloader.open_product + run_sequence.
+    Reuses the session cookies of the logged-in driver and fetches the
+    server-rendered Tricoma pages directly, so many products can be
+    scraped concurrently.
+    """
+
+    def __init__(self, config, cookies=(), index=None, policies=None):
+        self.index = index
+        self.policies = policies
+        self.cfg = {**DEFAULTS, **config.get("TRICOMA_HTTP", {})}
+        if not self.cfg["base_url"]:
+            self.cfg["base_url"] = config.get("CRM_URL", "")
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=int(self.cfg["concurrency"]))
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        for cookie in cookies:
+            self.session.cookies.set(
+                cookie["name"], cookie["value"],
+                domain=cookie.get("domain", ""), path=cookie.get("path", "/"),
+            )
+        self.stats_lock = threading.Lock()
+        self.request_count = 0
+
+    @classmethod
+    def from_driver(cls, driver, config, index=None, policies=None):
+        """Exports the cookies of the Tricoma tab (the first window) into a pooled HTTP session."""
+        driver.switch_to.window(driver.window_handles[0])
+        driver.switch_to.default_content()
+        cookies = driver.get_cookies()
+        logging.info("Exported %d Tricoma cookies from the browser session.", len(cookies))
+        return cls(config, cookies, index, policies)
+
+    def url(self, key, **params):
+        return urljoin(self.cfg["base_url"], self.cfg[key].format(**params))
+
+    def fetch(self, method, url, **kwargs):
+        response = self.session.request(method, url, timeout=self.cfg["timeout_s"], **kwargs)
+        with self.stats_lock:
+            self.request_count += 1
+        response.raise_for_status()
+        response.encoding = response.encoding or "utf-8"
+        return response
+
+    def resolve_product_id(self, product_name):
+        """Product id from the URL cached by an earlier search, otherwise from the first search hit."""
+        cached = self.index.get(product_name) if self.index is not None else None
+        if cached:
+            match = re.search(self.cfg["product_id_pattern"], cached)
+            if match is not None:
+                return match.group(1)
+        search_url = self.url("search_path", query=quote(product_name))
+        hrefs = page_parser.parse_search_results(self.fetch("GET", search_url).text)
+        if not hrefs:
+            raise LookupError(f"No Tricoma search result for '{product_name}'")
+        match = re.search(self.cfg["product_id_pattern"], hrefs[0])
+        if match is None:
+            raise LookupError(f"No product id in search result link '{hrefs[0]}'")
+        if self.index is not None:
+            self.index.put(product_name, urljoin(search_url, hrefs[0]))
+        return match.group(1)
+
+    def _resolve_safely(self, product_name):
+        try:
+            self.resolve_product_id(product_name)
+        except LookupError as e:
+            return product_name, str(e)
+        return product_name, None
+
+    def resolve_many(self, product_names, concurrency=None):
+        """
+        Resolves every name up front (cached names cost nothing) and returns
+        {name: error} for the ones Tricoma has no product for. Any other error
+        (network, login) is raised, since it says nothing about the names.
+        """
+        workers = int(concurrency or self.cfg["concurrency"])
+        unresolved = {}
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tricoma-resolve") as pool:
+            for name, error in pool.map(self._resolve_safely, product_names):
+                if error is not None:
+                    unresolved[name] = error
+        return unresolved
+
+    def save_product_form(self, product_id, product_source):
+        """Same as fill_product_data + click_save: submit the product form with the fixed fields."""
+        action, values = page_parser.parse_product_form(product_source)
+        overrides = self.cfg["form_overrides"]
+        data = [(name, overrides.get(name, value)) for name, value in values]
+        data.append(("feldspeichern", "Speichern"))
+        product_url = self.url("product_path", product_id=product_id)
+        self.fetch("POST", urljoin(product_url, action) if action else product_url, data=data)
+
+    def ensure_imported(self, product_id):
+        """Same as check_and_import_product: trigger the Shopware 6 sync unless already importiert."""
+        shopware6_url = self.url("shopware6_path", product_id=product_id)
+        if page_parser.is_imported(self.fetch("GET", shopware6_url).text):
+            logging.info("Product %s already importiert.", product_id)
+            return
+        self.fetch("POST", shopware6_url, data={"produktabgleich_vormerken": "1"})
+        self.fetch("POST", shopware6_url, data={"produktabgleich_durchfuehren": "1"})
+        deadline = time.monotonic() + self.cfg["import_timeout_s"]
+        while time.monotonic() < deadline:
+            if page_parser.is_imported(self.fetch("GET", shopware6_url).text):
+                logging.info("Product %s successfully importiert.", product_id)
+                return
+            time.sleep(self.cfg["import_poll_s"])
+        raise TimeoutError(f"Product {product_id} not importiert after {self.cfg['import_timeout_s']} s")
+
+    def open_product(self, product_name):
+        """(product id, product page source); a cached id whose page no longer loads is searched again."""
+        product_id = self.resolve_product_id(product_name)
+        try:
+            return product_id, self.fetch("GET", self.url("product_path", product_id=product_id)).text
+        except requests.HTTPError as e:
+            if self.index is None or self.index.get(product_name) is None:
+                raise
+            # The cached id no longer loads: drop it and search the name again.
+            logging.warning("Cached product page of '%s' failed (%s) — searching again.", product_name, e)
+            self.index.forget(product_name)
+            product_id = self.resolve_product_id(product_name)
+            return product_id, self.fetch("GET", self.url("product_path", product_id=product_id)).text
+
+    def read_product(self, product_id, product_source):
+        """Same as CRMDownloader.read_product: parse the product page, then the language and price pages."""
+        product_data = page_parser.parse_product_page(product_source)
+        product_data["beschreibung"] = CRMDownloader.remove_inline_styles(product_data["beschreibung"])
+        language_source = self.fetch("GET", self.url("language_path", product_id=product_id)).text
+        product_data.update(page_parser.parse_language_page(language_source))
+        prices_source = self.fetch("GET", self.url("prices_path", product_id=product_id)).text
+        product_data.update(page_parser.parse_prices_page(prices_source))
+        return product_data
+
+    def retried(self, fn, *args):
+        if self.policies is None:
+            return fn(*args)
+        return self.policies.call("download", "tricoma", fn, *args)
+
+    @timed()
+    def scrape(self, product_name):
+        """
+        Only the read-only requests run under the 'download' retry policy; the form is saved
+        and the Shopware import triggered once, so a retry never posts them again.
+        """
+        product_id, product_source = self.retried(self.open_product, product_name)
+        self.save_product_form(product_id, product_source)
+        product_data = self.retried(self.read_product, product_id, product_source)
+        self.ensure_imported(product_id)
+        return product_data
+
+    def _scrape_safely(self, product_name):
+        start = time.perf_counter()
+        try:
+            with metrics.product(product_name):
+                product_data = self.scrape(product_name)
+        except Exception as e:
+            logging.error("Error scraping '%s' over HTTP: %s", product_name, e)
+            return product_name, None
+        logging.info("Scraped '%s' in %.3f s.", product_name, time.perf_counter() - start)
+        return product_name, product_data
+
+    def scrape_many(self, product_names, concurrency=None):
+        """
+        Yields (name, product_data) in input order while up to `concurrency`
+        products are fetched in parallel. product_data is None when a product failed.
+        """
+        workers = int(concurrency or self.cfg["concurrency"])
+        pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tricoma-http")
+        pending = deque()
+        names = iter(product_names)
+        try:
+            # Keep a bounded window in flight so an early stop (pause.txt) does not
+            # leave the whole list queued behind it.
+            for name in names:
+                pending.append(pool.submit(self._scrape_safely, name))
+                if len(pending) >= workers * 2:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+            pool.shutdown(wait=True)
@@ -1,16 +1,27 @@
 import logging
+from worker_pool import WorkerPool
 
 class UserInterface:
     def __init__(self, facade):
         self.facade = facade
 
+    def confirm_prices(self, summary):
+        """Shows the price preview summary and asks before anything is uploaded."""
+        print(f"\nPrice preview: {summary['products']} products, {summary['changed']} changed, "
+              f"{summary['new']} new, {summary['errors']} with invalid prices "
+              f"(gross {summary['min_gross']} – {summary['max_gross']}). Details in {summary['file']}.")
+        return input("Upload these prices? (y/n): ").strip().lower() == "y"
+
     def show_menu(self):
         print("Choose an operation:")
         print("1 - Full process (Download, Translate, Upload)")
         print("2 - Download and Translate only")
         print("3 - Upload only")
         print("4 - Process product list from file")
-        choice = input("Enter your choice (1/2/3/4): ")
+        print("5 - Process product list with a pool of browser workers")
+        print("6 - Re-upload stored products")
+        print("7 - Import a Tricoma article export (CSV/XML)")
+        choice = input("Enter your choice (1/2/3/4/5/6/7): ")
         return choice
 
     def execute_choice(self):
@@ -18,14 +29,14 @@ class UserInterface:
         # if choice == "1":
         #     self.facade.run_full_process()
         if choice == "1" or choice == "":
-            self.facade.run_download_process()
-            self.facade.run_translate_process()
-            self.facade.go_to_shop()
-            self.facade.run_upload_process()
+            product_data = self.facade.run_download_process(save=False)
+            product_data = self.facade.run_translate_process(product_data)
+            self.facade.go_to_shop(product_data)
+            self.facade.run_upload_process(product_data=product_data)
         elif choice == "2":
-            self.facade.run_download_process()
-            self.facade.run_translate_process()
-            self.facade.go_to_shop()
+            product_data = self.facade.run_download_process(save=False)
+            product_data = self.facade.run_translate_process(product_data)
+            self.facade.go_to_shop(product_data)
         elif choice == "3":
             self.facade.run_upload_process()
         elif choice == "4":
@@ -34,5 +45,26 @@ class UserInterface:
                 self.facade.run_batch_process(filename)
             except Exception:
                 logging.error("Failed to process file %s", filename)
+        elif choice == "5":
+            filename = "products.txt"
+            try:
+                WorkerPool(self.facade.config).run(filename)
+            except Exception:
+                logging.error("Failed to process file %s with worker pool", filename)
+        elif choice == "6":
+            numbers = input("Article numbers (comma-separated, empty for all): ")
+            artikelnummern = [n.strip() for n in numbers.split(",") if n.strip()]
+            try:
+                if self.confirm_prices(self.facade.preview_store_prices(artikelnummern or None)):
+                    self.facade.reupload_from_store(artikelnummern or None)
+            except Exception:
+                logging.error("Failed to re-upload stored products")
+        elif choice == "7":
+            export_file = input("Export file (empty for TRICOMA_EXPORT path): ").strip()
+            try:
+                if self.confirm_prices(self.facade.preview_export_prices(export_file or None)):
+                    self.facade.run_export_process(export_file or None)
+            except Exception:
+                logging.error("Failed to import export %s", export_file)
         else:
             logging.error("Invalid choice.")
@@ -0,0 +1,307 @@
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+DEFAULTS = {
+    "path":             "jobs.sqlite3",
+    "max_attempts":     3,
+    "stale_after_s":    3600,
+    "checkpoint_max_age_s": 86400,
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    name        TEXT NOT NULL,
+    status      TEXT NOT NULL DEFAULT 'pending',
+    attempts    INTEGER NOT NULL DEFAULT 0,
+    worker      TEXT,
+    last_error  TEXT,
+    created_at  REAL NOT NULL,
+    updated_at  REAL NOT NULL,
+    started_at  REAL,
+    finished_at REAL,
+    exported    INTEGER NOT NULL DEFAULT 1
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id);
+CREATE TABLE IF NOT EXISTS checkpoints (
+    name        TEXT NOT NULL,
+    step        TEXT NOT NULL,
+    data        TEXT,
+    created_at  REAL NOT NULL,
+    PRIMARY KEY (name, step)
+);
+"""
+
+# pending -> running -> done | failed (retried while attempts < max_attempts);
+# cancelled when the name was removed from the product list before it ran.
+OPEN_STATUSES = ("pending", "running", "failed")
+
+# Queues created before the exported column: their done jobs were exported already.
+MIGRATIONS = {"exported": "ALTER TABLE jobs ADD COLUMN exported INTEGER NOT NULL DEFAULT 1"}
+
+
+def worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.current_thread().name}"
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except Exception:
+        return True
+    return True
+
+
+class JobQueue:
+    """
+    Durable product queue in SQLite (WAL, one connection per thread). Jobs are claimed
+    atomically, so several threads or processes can work off the same file; a job whose
+    worker process died is handed out again. products.txt is only the import/export format.
+    """
+
+    def __init__(self, cfg=None):
+        self.cfg = {**DEFAULTS, **(cfg or {})}
+        self.path = self.cfg["path"]
+        self.local = threading.local()
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        with self.connection() as conn:
+            conn.executescript(SCHEMA)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+            for column, statement in MIGRATIONS.items():
+                if column not in columns:
+                    conn.execute(statement)
+
+    def connection(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.local.conn = conn
+        return conn
+
+    def recover(self):
+        """Puts running jobs of dead local processes, or with an expired lease, back to pending."""
+        host = socket.gethostname()
+        cutoff = time.time() - self.cfg["stale_after_s"]
+        conn = self.connection()
+        stale = []
+        for job_id, worker, started_at in conn.execute(
+            "SELECT id, worker, started_at FROM jobs WHERE status = 'running'"
+        ).fetchall():
+            worker_host, _, rest = (worker or "").partition(":")
+            pid = rest.partition(":")[0]
+            dead = worker_host == host and pid.isdigit() and not _pid_alive(int(pid))
+            if dead or (started_at or 0) < cutoff:
+                stale.append(job_id)
+        if stale:
+            with conn:
+                conn.executemany(
+                    "UPDATE jobs SET status = 'pending', worker = NULL, updated_at = ? "
+                    "WHERE id = ? AND status = 'running'",
+                    [(time.time(), job_id) for job_id in stale],
+                )
+            logging.info("Job queue: %d interrupted jobs returned to pending.", len(stale))
+        return len(stale)
+
+    def sync_file(self, filename):
+        """
+        Makes the open jobs match the product list: names added to the file become new
+        jobs, names removed from it are cancelled (unless running). Jobs finished since the
+        last export_file still count as listed, so a run killed before its export does not
+        queue them again. Returns the open job count.
+        """
+        self.recover()
+        try:
+            with open(filename, "r", encoding="utf-8") as f:
+                names = [line.strip() for line in f if line.strip()]
+        except FileNotFoundError:
+            logging.error("File %s does not exist.", filename)
+            names = []
+        wanted = Counter(names)
+        conn = self.connection()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            open_jobs = conn.execute(
+                "SELECT id, name, status FROM jobs WHERE status IN (?, ?, ?) ORDER BY id", OPEN_STATUSES
+            ).fetchall()
+            unexported = conn.execute("SELECT name FROM jobs WHERE status = 'done' AND exported = 0").fetchall()
+            have = Counter(name for _, name, _ in open_jobs) + Counter(name for (name,) in unexported)
+            cancel = []
+            for job_id, name, status in reversed(open_jobs):
+                if have[name] > wanted[name] and status != "running":
+                    cancel.append(job_id)
+                    have[name] -= 1
+            conn.executemany(
+                "UPDATE jobs SET status = 'cancelled', updated_at = ? WHERE id = ?",
+                [(now, job_id) for job_id in cancel],
+            )
+            added = []
+            seen = Counter()
+            for name in names:
+                seen[name] += 1
+                if seen[name] > have[name]:
+                    added.append(name)
+            # Products that used up their attempts in an earlier run get a fresh set.
+            conn.execute(
+                "UPDATE jobs SET attempts = 0, updated_at = ? WHERE status = 'failed' AND attempts >= ?",
+                (now, self.cfg["max_attempts"]),
+            )
+            conn.executemany(
+                "INSERT INTO jobs (name, created_at, updated_at) VALUES (?, ?, ?)",
+                [(name, now, now) for name in added],
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        counts = self.counts()
+        logging.info(
+            "Job queue: %d new, %d cancelled; %d pending, %d failed, %d running.",
+            len(added), len(cancel), counts["pending"], counts["failed"], counts["running"],
+        )
+        return counts["pending"] + counts["failed"] + counts["running"]
+
+    def claim(self, worker=None):
+        """Atomically takes the next runnable job; returns (job_id, name) or None."""
+        worker = worker or worker_id()
+        conn = self.connection()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT id, name FROM jobs WHERE status IN ('pending', 'failed') AND attempts < ? "
+                "ORDER BY status = 'failed', id LIMIT 1",
+                (self.cfg["max_attempts"],),
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE jobs SET status = 'running', attempts = attempts + 1, worker = ?, "
+                    "started_at = ?, updated_at = ? WHERE id = ?",
+                    (worker, now, now, row[0]),
+                )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        return tuple(row) if row is not None else None
+
+    def jobs(self, worker=None):
+        """Yields (job_id, name), claiming each job only when the consumer asks for it."""
+        while True:
+            job = self.claim(worker)
+            if job is None:
+                return
+            yield job
+
+    def _finish(self, job_id, status, error=None):
+        now = time.time()
+        conn = self.connection()
+        with conn:
+            # A done job stays in products.txt until the next export_file drops it.
+            conn.execute(
+                "UPDATE jobs SET status = ?, last_error = ?, worker = NULL, updated_at = ?, "
+                "finished_at = ?, exported = ? WHERE id = ?",
+                (status, error, now, now if status == "done" else None, 0 if status == "done" else 1, job_id),
+            )
+
+    def complete(self, job_id):
+        self._finish(job_id, "done")
+        name = self.connection().execute("SELECT name FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if name is not None:
+            self.clear_checkpoints(name[0])
+
+    def fail(self, job_id, error):
+        self._finish(job_id, "failed", str(error))
+
+    def give_up(self, name, error):
+        """
+        Fails the waiting jobs of name with their attempts used up, so this run does not
+        claim them; the next sync_file gives them a fresh set of attempts.
+        """
+        conn = self.connection()
+        with conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', attempts = ?, last_error = ?, updated_at = ? "
+                "WHERE name = ? AND status IN ('pending', 'failed')",
+                (self.cfg["max_attempts"], str(error), time.time(), name),
+            )
+
+    def release(self, job_id):
+        """Returns a claimed job that was not worked on (pause, shutdown) without using up an attempt."""
+        conn = self.connection()
+        with conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'pending', attempts = MAX(attempts - 1, 0), worker = NULL, "
+                "updated_at = ? WHERE id = ? AND status = 'running'",
+                (time.time(), job_id),
+            )
+
+    def checkpoint(self, name, step, data=None):
+        """Records that step finished for product name, with the intermediate data needed to resume."""
+        conn = self.connection()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO checkpoints (name, step, data, created_at) VALUES (?, ?, ?, ?)",
+                (name, step, json.dumps(data, ensure_ascii=False) if data is not None else None, time.time()),
+            )
+
+    def checkpoints(self, name):
+        """Steps finished for name within checkpoint_max_age_s, as {step: data}."""
+        cutoff = time.time() - self.cfg["checkpoint_max_age_s"]
+        rows = self.connection().execute(
+            "SELECT step, data FROM checkpoints WHERE name = ? AND created_at >= ?", (name, cutoff)
+        ).fetchall()
+        return {step: json.loads(data) if data is not None else None for step, data in rows}
+
+    def clear_checkpoints(self, name):
+        conn = self.connection()
+        with conn:
+            conn.execute("DELETE FROM checkpoints WHERE name = ?", (name,))
+
+    def counts(self):
+        counts = dict.fromkeys(("pending", "running", "done", "failed", "cancelled"), 0)
+        for status, count in self.connection().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status"):
+            counts[status] = count
+        return counts
+
+    def open_names(self):
+        """Distinct names of the jobs that can still be claimed, in queue order."""
+        rows = self.connection().execute(
+            "SELECT name FROM jobs WHERE status IN ('pending', 'failed') AND attempts < ? ORDER BY id",
+            (self.cfg["max_attempts"],),
+        ).fetchall()
+        return list(dict.fromkeys(name for (name,) in rows))
+
+    def failures(self):
+        return self.connection().execute(
+            "SELECT name, attempts, last_error FROM jobs WHERE status = 'failed' ORDER BY id"
+        ).fetchall()
+
+    def export_file(self, filename):
+        """Writes the names of all open jobs, in queue order, as the new product list."""
+        conn = self.connection()
+        # Read first: a job finishing during the write is still listed and stays unexported.
+        done = conn.execute("SELECT id FROM jobs WHERE status = 'done' AND exported = 0").fetchall()
+        rows = conn.execute(
+            "SELECT name FROM jobs WHERE status IN (?, ?, ?) ORDER BY id", OPEN_STATUSES
+        ).fetchall()
+        tmp_file = filename + ".tmp"
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            for (name,) in rows:
+                f.write(name + "\n")
+        os.replace(tmp_file, filename)
+        with conn:
+            conn.executemany("UPDATE jobs SET exported = 1 WHERE id = ?", done)
+        return len(rows)
+
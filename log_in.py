@@ -114,6 +114,19 @@ class LogIn:
         except Exception as e:
             logging.error("Error clicking submit button: %s", e)
 
+    def credentials(self, users, key):
+        credentials = users[key]
+        return credentials.get("USERNAME"), credentials.get("PASSWORD")
+
+    def log_in_as(self, tricoma_user, shopware_user):
+        """Non-interactive login with the given keys of TRICOMA_LOGINS / SHOPWARE_LOGINS."""
+        try:
+            self.log_in_shopware(self.credentials(self.shopware, shopware_user))
+            self.log_in_tricoma(self.credentials(self.tricoma, tricoma_user))
+        except Exception as e:
+            logging.error("Login error: %s", e)
+            raise
+
     def log_in(self):
         try:
             shopware_credentials = self.select_shopware_login()
@@ -5,6 +5,7 @@ from facade import ProcessFacade
 from interface import UserInterface
 from log_in import LogIn
 from layout_manager import setup_layout
+from metrics import metrics
 
 def load_config(filename="config.json"):
     try:
@@ -18,6 +19,7 @@ def load_config(filename="config.json"):
 def main():
     logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
     config = load_config()
+    metrics.configure(config.get("METRICS", {}))
     driver_init = DriverInitializer(config)
     driver = driver_init.init_driver()
     setup_layout(driver, config.get("LAYOUT", {}))
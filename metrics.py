@@ -0,0 +1,290 @@
+import functools
+import json
+import logging
+import os
+import random
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from contextlib import contextmanager
+
+DEFAULTS = {
+    "enabled":          True,
+    "events_file":      None,           # JSON line per step and product, e.g. "metrics_events.jsonl"; off unless set
+    "prometheus_file":  "metrics.prom",
+    "buckets":          [0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120],
+    "slowest_products": 5,
+    "reservoir_size":   1024,           # samples kept per step for percentiles
+    "max_products":     1000,           # products with per-step totals; the least recently timed go first
+}
+
+PROMETHEUS_PREFIX = "tricoma_copier"
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram (Prometheus layout). Percentiles come from a uniform
+    reservoir sample of at most reservoir_size values, so memory stays flat on long runs.
+    """
+
+    def __init__(self, buckets, reservoir_size=1024):
+        self.buckets = sorted(buckets)
+        self.bucket_counts = [0] * len(self.buckets)
+        self.reservoir_size = max(int(reservoir_size), 1)
+        self.samples = []
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.failures = 0
+
+    def observe(self, value, ok=True):
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+        if len(self.samples) < self.reservoir_size:
+            self.samples.append(value)
+        else:
+            slot = random.randrange(self.count)
+            if slot < self.reservoir_size:
+                self.samples[slot] = value
+        if not ok:
+            self.failures += 1
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.bucket_counts[i] += 1
+
+    def percentile(self, pct):
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+
+class Metrics:
+    """
+    Step timings for the copy flow. Steps are timed with @timed() or `with timed("name")`;
+    the product being worked on comes from metrics.product(name) on the current thread.
+    Every observation is appended to a JSONL event stream; histograms per step and totals
+    per product are exported as a Prometheus textfile and printed as a summary table.
+    """
+
+    def __init__(self):
+        self.cfg = dict(DEFAULTS)
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.events = None
+        self.reset()
+
+    def configure(self, cfg=None):
+        """Once per process (main, worker pool, benchmark); the events file is only reopened when it changes."""
+        with self.lock:
+            previous_file = self.cfg["events_file"]
+            self.cfg = {**DEFAULTS, **(cfg or {})}
+            if self.events is not None and self.cfg["events_file"] != previous_file:
+                self.events.close()
+                self.events = None
+
+    def reset(self):
+        with self.lock:
+            self.steps = {}
+            self.products = defaultdict(lambda: defaultdict(float))
+            self.product_nested = defaultdict(lambda: defaultdict(float))
+            # Products in the order they were last timed, for evicting the oldest ones.
+            self.recent_products = OrderedDict()
+            self.products_timed = 0
+            self.started = time.time()
+
+    def current_product(self):
+        return getattr(self.local, "product", None)
+
+    @contextmanager
+    def product(self, name):
+        previous = self.current_product()
+        self.local.product = name
+        try:
+            yield
+        finally:
+            self.local.product = previous
+
+    def depth(self):
+        return getattr(self.local, "depth", 0)
+
+    def enter(self):
+        self.local.depth = self.depth() + 1
+
+    def leave(self):
+        self.local.depth = self.depth() - 1
+
+    def observe(self, step, duration, ok=True, product=None):
+        if not self.cfg["enabled"]:
+            return
+        product = product if product is not None else self.current_product()
+        with self.lock:
+            histogram = self.steps.get(step)
+            if histogram is None:
+                histogram = self.steps[step] = Histogram(self.cfg["buckets"], self.cfg["reservoir_size"])
+            histogram.observe(duration, ok)
+            if product is not None:
+                # Only outermost steps add up to the product total; nested ones are kept apart.
+                target = self.products if self.depth() == 0 else self.product_nested
+                target[product][step] += duration
+                self.track_product(product)
+            self.write_event({
+                "ts": round(time.time(), 3),
+                "step": step,
+                "product": product,
+                "duration_s": round(duration, 4),
+                "ok": ok,
+            })
+
+    def track_product(self, product):
+        """Marks the product as just timed; past max_products, drops the least recently timed ones but the slowest."""
+        if product in self.recent_products:
+            self.recent_products.move_to_end(product)
+            return
+        self.recent_products[product] = None
+        self.products_timed += 1
+        limit = max(int(self.cfg["max_products"]), 1)
+        if len(self.recent_products) <= limit:
+            return
+        # Evicts down to half the limit at once, so the ranking is not recomputed on every new product.
+        totals = {name: sum(steps.values()) for name, steps in self.products.items()}
+        keep = set(sorted(totals, key=totals.get, reverse=True)[:self.cfg["slowest_products"]])
+        for name in list(self.recent_products):
+            if len(self.recent_products) <= limit // 2:
+                break
+            if name in keep or name == product:
+                continue
+            del self.recent_products[name]
+            self.products.pop(name, None)
+            self.product_nested.pop(name, None)
+
+    def write_event(self, event):
+        if not self.cfg["events_file"]:
+            return
+        try:
+            if self.events is None:
+                self.events = open(self.cfg["events_file"], "a", encoding="utf-8", buffering=1)
+            self.events.write(json.dumps(event, ensure_ascii=False) + "\n")
+        except Exception as e:
+            logging.warning("Failed to write metrics event: %s", e)
+
+    def timed(self, step=None):
+        """
+        Decorator (step defaults to the function's qualified name) or context manager.
+        A step counts as failed when it raises or returns False.
+        """
+        return _Timer(self, step)
+
+    def product_totals(self):
+        """Per product: (total of its outermost steps, its slowest nested step, that step's duration)."""
+        with self.lock:
+            totals = {}
+            for name, steps in self.products.items():
+                nested = self.product_nested.get(name) or steps
+                slowest = max(nested, key=nested.get)
+                totals[name] = (sum(steps.values()), slowest, nested[slowest])
+            return totals
+
+    def write_prometheus(self, path=None):
+        path = path or self.cfg["prometheus_file"]
+        if not path or not self.steps:
+            return
+        name = f"{PROMETHEUS_PREFIX}_step_duration_seconds"
+        lines = [
+            f"# HELP {name} Duration of one step of the Tricoma to Shopware copy flow.",
+            f"# TYPE {name} histogram",
+        ]
+        with self.lock:
+            for step in sorted(self.steps):
+                h = self.steps[step]
+                for bound, count in zip(h.buckets, h.bucket_counts):
+                    lines.append(f'{name}_bucket{{step="{step}",le="{bound}"}} {count}')
+                lines.append(f'{name}_bucket{{step="{step}",le="+Inf"}} {h.count}')
+                lines.append(f'{name}_sum{{step="{step}"}} {h.total:.6f}')
+                lines.append(f'{name}_count{{step="{step}"}} {h.count}')
+            failures = f"{PROMETHEUS_PREFIX}_step_failures_total"
+            lines += [f"# HELP {failures} Steps that raised or reported failure.", f"# TYPE {failures} counter"]
+            for step in sorted(self.steps):
+                lines.append(f'{failures}{{step="{step}"}} {self.steps[step].failures}')
+            products = f"{PROMETHEUS_PREFIX}_products_timed_total"
+            lines += [f"# HELP {products} Products with at least one timed step.", f"# TYPE {products} gauge",
+                      f"{products} {self.products_timed}"]
+        tmp_path = path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+            os.replace(tmp_path, path)
+            logging.info("Metrics written to %s.", path)
+        except Exception as e:
+            logging.error("Failed to write metrics to %s: %s", path, e)
+
+    def summary_table(self):
+        with self.lock:
+            steps = sorted(self.steps.items(), key=lambda item: item[1].total, reverse=True)
+            rows = [
+                f"{'step':<48}{'count':>7}{'total s':>10}{'mean s':>9}{'p50 s':>8}{'p95 s':>8}{'max s':>8}{'fail':>6}"
+            ]
+            for step, h in steps:
+                rows.append(
+                    f"{step:<48}{h.count:>7}{h.total:>10.2f}{h.total / h.count:>9.2f}"
+                    f"{h.percentile(50):>8.2f}{h.percentile(95):>8.2f}{h.max:>8.2f}{h.failures:>6}"
+                )
+        products = self.product_totals()
+        if products:
+            rows.append("")
+            rows.append(f"Slowest products (sum of their outermost steps, {self.products_timed} products):")
+            slowest = sorted(products.items(), key=lambda item: item[1][0], reverse=True)
+            for name, (total, step, duration) in slowest[:self.cfg["slowest_products"]]:
+                rows.append(f"  {name:<30}{total:>9.2f} s  (slowest step {step}: {duration:.2f} s)")
+        return "\n".join(rows)
+
+    def print_summary(self):
+        if not self.steps:
+            return
+        print("\n--- Step timings ---")
+        print(self.summary_table())
+
+    def export(self):
+        """Writes the Prometheus textfile and prints the summary table."""
+        self.write_prometheus()
+        self.print_summary()
+
+
+class _Timer:
+    def __init__(self, registry, step):
+        self.registry = registry
+        self.step = step
+        self.local = threading.local()
+
+    def __call__(self, func):
+        step = self.step or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            ok = False
+            self.registry.enter()
+            try:
+                result = func(*args, **kwargs)
+                ok = result is not False
+                return result
+            finally:
+                self.registry.leave()
+                self.registry.observe(step, time.perf_counter() - start, ok)
+        return wrapper
+
+    def __enter__(self):
+        self.local.start = time.perf_counter()
+        self.registry.enter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.registry.leave()
+        self.registry.observe(self.step, time.perf_counter() - self.local.start, exc_type is None)
+        return False
+
+
+metrics = Metrics()
+timed = metrics.timed
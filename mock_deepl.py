@@ -0,0 +1,113 @@
+import json
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+MAX_TEXTS_PER_REQUEST = 50
+MAX_REQUEST_BYTES = 128 * 1024
+
+
+def fake_translation(text, target_lang):
+    return f"[{target_lang}] {text}"
+
+
+class MockDeepLHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        logging.debug("mock deepl: " + format, *args)
+
+    def _send(self, status, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _params(self, raw):
+        if "json" in (self.headers.get("Content-Type") or ""):
+            return json.loads(raw or b"{}")
+        params = parse_qs(raw.decode("utf-8"))
+        return {"text": params.get("text", []), "target_lang": params.get("target_lang", [""])[0]}
+
+    def do_POST(self):
+        server = self.server
+        raw = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        with server.lock:
+            server.request_count += 1
+            throttled = server.throttle_every and server.request_count % server.throttle_every == 0
+        if server.latency_s:
+            time.sleep(server.latency_s)
+        if not (self.headers.get("Authorization") or "").startswith("DeepL-Auth-Key"):
+            return self._send(403, {"message": "Authorization failure"})
+        if throttled:
+            return self._send(429, {"message": "Too many requests"})
+        if self.path.split("?")[0] != "/v2/translate":
+            return self._send(404, {"message": "Not found"})
+        if len(raw) > MAX_REQUEST_BYTES:
+            return self._send(413, {"message": "Request Entity Too Large"})
+        params = self._params(raw)
+        texts = params.get("text") or []
+        if isinstance(texts, str):
+            texts = [texts]
+        if len(texts) > MAX_TEXTS_PER_REQUEST:
+            return self._send(400, {"message": "Too many texts"})
+        target_lang = params.get("target_lang", "")
+        with server.lock:
+            server.characters += sum(len(t) for t in texts)
+            server.texts += len(texts)
+        self._send(200, {"translations": [
+            {"detected_source_language": "DE", "text": fake_translation(t, target_lang),
+             "billed_characters": len(t)} for t in texts
+        ]})
+
+
+class MockDeepLServer:
+    """
+    Local stand-in for the DeepL /v2/translate endpoint. Point the Translator at it with
+    config["DEEPL_SERVER_URL"] = server.url. throttle_every=N answers every Nth request with 429.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, latency_s=0.0, throttle_every=0):
+        self.httpd = ThreadingHTTPServer((host, port), MockDeepLHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.lock = threading.Lock()
+        self.httpd.latency_s = latency_s
+        self.httpd.throttle_every = throttle_every
+        self.httpd.request_count = 0
+        self.httpd.characters = 0
+        self.httpd.texts = 0
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def request_count(self):
+        return self.httpd.request_count
+
+    @property
+    def characters(self):
+        return self.httpd.characters
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        logging.info("Mock DeepL listening on %s", self.url)
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
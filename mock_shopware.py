@@ -0,0 +1,345 @@
+import copy
+import json
+import logging
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def new_id():
+    return uuid.uuid4().hex
+
+
+def now_iso():
+    return time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime())
+
+
+class ShopwareStore:
+    """
+    In-memory stand-in for the Shopware 6 entities touched by ApiShopUploader.
+    Entity names use the URL form (product-price, sales-channel, ...).
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entities = {
+            "product": {},
+            "product-price": {},
+            "product-visibility": {},
+            "product-manufacturer": {},
+            "rule": {},
+            "currency": {},
+            "sales-channel": {},
+            "language": {},
+        }
+
+    def add(self, entity, **fields):
+        row = {"id": fields.pop("id", None) or new_id(), **fields}
+        self.entities[entity][row["id"]] = row
+        return row
+
+    def seed_defaults(self, product_numbers=()):
+        self.add("product-manufacturer", name="Scherer Voigt GbR")
+        self.add("currency", isoCode="EUR")
+        self.add("rule", name="Händler")
+        self.add("rule", name="Händler Ausland")
+        for name in ("Storefront", "Headless", "B2B", "Marketplace"):
+            self.add("sales-channel", name=name)
+        for name, code in (("Deutsch", "de-DE"), ("English", "en-GB"), ("Français", "fr-FR")):
+            self.add("language", name=name, locale={"code": code})
+        for number in product_numbers:
+            self.add_product(number)
+
+    def add_product(self, product_number):
+        return self.add("product", productNumber=product_number, translations={},
+                        createdAt=now_iso(), updatedAt=None)
+
+    def _matches(self, row, flt):
+        if flt["type"] == "multi":
+            results = [self._matches(row, query) for query in flt["queries"]]
+            return any(results) if flt.get("operator", "and").lower() == "or" else all(results)
+        value = row.get(flt["field"])
+        if flt["type"] == "equals":
+            return value == flt["value"]
+        if flt["type"] == "equalsAny":
+            return value in flt["value"]
+        if flt["type"] == "range":
+            bounds = flt["parameters"]
+            if value is None:
+                return False
+            return all((
+                "gte" not in bounds or value >= bounds["gte"],
+                "gt" not in bounds or value > bounds["gt"],
+                "lte" not in bounds or value <= bounds["lte"],
+                "lt" not in bounds or value < bounds["lt"],
+            ))
+        raise ValueError(f"Unsupported filter type {flt['type']}")
+
+    def _with_associations(self, entity, row, associations):
+        row = dict(row)
+        if entity == "product":
+            if "prices" in associations:
+                row["prices"] = [
+                    p for p in self.entities["product-price"].values() if p["productId"] == row["id"]
+                ]
+            if "visibilities" in associations:
+                row["visibilities"] = [
+                    v for v in self.entities["product-visibility"].values() if v["productId"] == row["id"]
+                ]
+            if "translations" in associations:
+                # Stored by whatever key was written (locale code or language id); returned per language id.
+                by_locale = {lang["locale"]["code"]: lang["id"] for lang in self.entities["language"].values()}
+                row["translations"] = [
+                    {"languageId": by_locale.get(key, key), **fields}
+                    for key, fields in (row.get("translations") or {}).items()
+                ]
+        return row
+
+    def search(self, entity, body):
+        with self.lock:
+            rows = [
+                row for row in self.entities[entity].values()
+                if all(self._matches(row, f) for f in body.get("filter", []))
+            ]
+            for order in reversed(body.get("sort") or []):
+                rows.sort(
+                    key=lambda row: (row.get(order["field"]) is not None, row.get(order["field"]) or ""),
+                    reverse=order.get("order", "ASC").upper() == "DESC",
+                )
+            limit = body.get("limit")
+            if limit:
+                offset = (int(body.get("page") or 1) - 1) * limit
+                rows = rows[offset:offset + limit]
+            associations = body.get("associations") or {}
+            return [self._with_associations(entity, row, associations) for row in rows]
+
+    def _write_price(self, product_id, price):
+        if "ruleId" not in price or "price" not in price:
+            raise ValueError("product-price requires ruleId and price")
+        row = {**price, "id": price.get("id") or new_id(), "productId": product_id}
+        self.entities["product-price"][row["id"]] = row
+
+    def _write_visibility(self, product_id, visibility):
+        vid = visibility.get("id") or new_id()
+        for other in self.entities["product-visibility"].values():
+            if (other["productId"] == product_id and other["id"] != vid
+                    and other["salesChannelId"] == visibility["salesChannelId"]):
+                raise ValueError("Duplicate visibility for sales channel "
+                                 f"{visibility['salesChannelId']}")
+        self.entities["product-visibility"][vid] = {
+            **visibility, "id": vid, "productId": product_id
+        }
+
+    def upsert_product(self, product_id, payload):
+        product = self.entities["product"].get(product_id)
+        if product is None:
+            if "productNumber" not in payload:
+                raise KeyError(f"Product {product_id} not found")
+            product = {"id": product_id, "translations": {}, "createdAt": now_iso()}
+            self.entities["product"][product_id] = product
+        else:
+            product["updatedAt"] = now_iso()
+        for key, value in payload.items():
+            if key == "prices":
+                for price in value:
+                    self._write_price(product_id, price)
+            elif key == "visibilities":
+                for visibility in value:
+                    self._write_visibility(product_id, visibility)
+            elif key == "translations":
+                for language, fields in value.items():
+                    product["translations"].setdefault(language, {}).update(fields)
+            elif key != "id":
+                product[key] = value
+
+    def update(self, entity, entity_id, payload):
+        with self.lock:
+            if entity == "product":
+                self.upsert_product(entity_id, payload)
+            elif entity_id in self.entities[entity]:
+                self.entities[entity][entity_id].update(payload)
+            else:
+                raise KeyError(f"{entity} {entity_id} not found")
+
+    def delete(self, entity, entity_id):
+        with self.lock:
+            if self.entities[entity].pop(entity_id, None) is None:
+                raise KeyError(f"{entity} {entity_id} not found")
+
+    def _sync_row(self, entity, action, row):
+        if action == "delete":
+            if self.entities[entity].pop(row["id"], None) is None:
+                raise KeyError(f"{entity} {row['id']} not found")
+        elif entity == "product":
+            self.upsert_product(row["id"], row)
+        elif entity == "product-price":
+            self._write_price(row["productId"], row)
+        elif entity == "product-visibility":
+            self._write_visibility(row["productId"], row)
+        else:
+            raise ValueError(f"Sync of {entity} not supported")
+
+    def sync(self, operations):
+        """
+        Applies all operations atomically like Shopware's _action/sync:
+        any failing row rolls back the whole request.
+        """
+        with self.lock:
+            snapshot = copy.deepcopy(self.entities)
+            try:
+                for operation in operations:
+                    entity = operation["entity"].replace("_", "-")
+                    for index, row in enumerate(operation["payload"]):
+                        try:
+                            self._sync_row(entity, operation["action"], row)
+                        except (KeyError, ValueError) as e:
+                            raise ValueError(f"/{operation.get('key')}/{index}: {e}") from e
+            except Exception:
+                self.entities = snapshot
+                raise
+
+
+class MockShopwareHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        logging.debug("mock shopware: " + format, *args)
+
+    def _send(self, status, body=None):
+        data = json.dumps(body).encode("utf-8") if body is not None else b""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _error(self, status, detail):
+        self._send(status, {"errors": [{"status": str(status), "detail": detail}]})
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _authorized(self):
+        return self.headers.get("Authorization") == f"Bearer {self.server.token}"
+
+    def _dispatch(self, method):
+        server = self.server
+        server.request_count += 1
+        if server.latency_s:
+            time.sleep(server.latency_s)
+        path = self.path.split("?")[0]
+        body = self._body() if method in ("POST", "PATCH") else None
+
+        if method == "POST" and path == "/api/oauth/token":
+            return self._send(200, {
+                "token_type": "Bearer", "expires_in": 600, "access_token": server.token
+            })
+        if not self._authorized():
+            return self._error(401, "Unauthorized")
+
+        try:
+            if method == "POST" and path == "/api/_action/sync":
+                server.store.sync(body)
+                return self._send(200, {"success": True})
+            match = re.fullmatch(r"/api/search/([\w-]+)", path)
+            if method == "POST" and match:
+                data = server.store.search(match.group(1), body)
+                return self._send(200, {"total": len(data), "data": data})
+            match = re.fullmatch(r"/api/([\w-]+)/(\w+)", path)
+            if method == "PATCH" and match:
+                server.store.update(match.group(1), match.group(2), body)
+                return self._send(204)
+            if method == "DELETE" and match:
+                server.store.delete(match.group(1), match.group(2))
+                return self._send(204)
+        except KeyError as e:
+            return self._error(404, str(e))
+        except ValueError as e:
+            return self._error(400, str(e))
+        return self._error(404, f"No route for {method} {path}")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_PATCH(self):
+        self._dispatch("PATCH")
+
+    def do_DELETE(self):
+        self._dispatch("DELETE")
+
+
+class MockShopwareServer:
+    """
+    Local HTTP stand-in for the Shopware Admin API endpoints used by ApiShopUploader.
+    Usage:
+        with MockShopwareServer(product_numbers=["VC23472"]) as server:
+            config = {"SHOPWARE_API": {"url": server.url}}
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, product_numbers=(), latency_s=0.0):
+        self.httpd = ThreadingHTTPServer((host, port), MockShopwareHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.store = ShopwareStore()
+        self.httpd.store.seed_defaults(product_numbers)
+        self.httpd.token = new_id()
+        self.httpd.request_count = 0
+        self.httpd.latency_s = latency_s
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def store(self):
+        return self.httpd.store
+
+    @property
+    def request_count(self):
+        return self.httpd.request_count
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        logging.info("Mock Shopware listening on %s", self.url)
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+if __name__ == "__main__":
+    from shopware_api import ApiShopUploader
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    sample = {
+        "artikelnummer": "VC23472",
+        "verpackungseinheit": "6",
+        "beschreibung": "<p>Beschreibung</p>",
+        "beschreibung_en": "<p>Description</p>",
+        "beschreibung_fr": "<p>Description FR</p>",
+        "titel_GBR": "Title",
+        "titel_FRA": "Titre",
+        "handler_preis": "4.20",
+        "endkunde_preis": "8.40",
+    }
+    with MockShopwareServer(product_numbers=[sample["artikelnummer"]]) as server:
+        uploader = ApiShopUploader({"SHOPWARE_API": {"url": server.url}})
+        for _ in range(2):
+            start = time.perf_counter()
+            uploader.go_to_shop(sample)
+            uploader.run_sequence(sample)
+            print(f"Upload took {time.perf_counter() - start:.3f} s, "
+                  f"{server.request_count} requests so far")
@@ -0,0 +1,645 @@
+import html
+import json
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+from tricoma_pages import render_pages, sample_product
+
+# Browser-facing replicas of the Tricoma back office and the Shopware admin product
+# detail page, with the ids, names, classes and texts CRMDownloader / ShopUploader use.
+# They only behave as far as the Selenium flow needs; state changes are posted back so
+# a benchmark can check what was "uploaded".
+
+CRM_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>tricoma</title>
+<style>
+#maneta_search_window {{ display: none; border: 1px solid #999; }}
+#window_Sprache {{ display: none; position: absolute; top: 40px; left: 40px; background: #fff; border: 1px solid #333; }}
+iframe#contentframeprodukte {{ width: 1200px; height: 800px; }}
+</style></head>
+<body>
+<input type="text" id="tricoma_maneta_search" autocomplete="off">
+<div id="maneta_search_window"></div>
+<iframe id="contentframeprodukte" name="contentframeprodukte" src="about:blank"></iframe>
+<div id="window_Sprache">
+  <img class="window_close" alt="schliessen" src="data:image/gif;base64,R0lGODlhAQABAAAAACw=" width="16" height="16">
+  <iframe id="contentframeSprache" name="contentframeSprache" src="about:blank"></iframe>
+</div>
+<script>
+var PRODUCTS = {products};
+var input = document.getElementById('tricoma_maneta_search');
+var results = document.getElementById('maneta_search_window');
+input.addEventListener('input', function () {{
+    var term = input.value.toLowerCase();
+    results.innerHTML = '';
+    if (!term) {{ results.style.display = 'none'; return; }}
+    PRODUCTS.filter(function (p) {{ return p.name.toLowerCase().indexOf(term) !== -1; }})
+        .slice(0, 20).forEach(function (p) {{
+            var a = document.createElement('a');
+            a.className = 'tricoma_list_element_link';
+            a.href = '#';
+            a.textContent = p.name;
+            a.onclick = function (e) {{
+                e.preventDefault();
+                results.style.display = 'none';
+                document.getElementById('contentframeprodukte').src = '/crm/produkt?id=' + p.id;
+            }};
+            results.appendChild(a);
+        }});
+    results.style.display = 'block';
+}});
+function openSprache(id) {{
+    document.getElementById('contentframeSprache').src = '/crm/sprache?id=' + id;
+    document.getElementById('window_Sprache').style.display = 'block';
+}}
+document.querySelector('#window_Sprache img.window_close').onclick = function () {{
+    document.getElementById('window_Sprache').style.display = 'none';
+    document.getElementById('contentframeSprache').src = 'about:blank';
+}};
+</script>
+</body></html>"""
+
+PRODUCT_FRAME = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Produkt</title></head>
+<body>
+<table><tr>
+<td class="menu_bg" style="vertical-align: top; height: 300px; overflow: auto; display: block;">
+<ul>
+<li onclick="showSection('produktdaten')"><span>Produktdaten</span></li>
+<li onclick="showSection('preise')"><span>Sonstige Preise</span></li>
+<li onclick="showSection('shopware')"><span>Shopware 6</span></li>
+</ul>
+</td>
+<td>
+<div id="produktdaten">
+<form name="produkt" method="post" action="/crm/produkt?id={product_id}" target="speicherframe">
+<table class="tri_form">
+<tr><td>Artikelnummer</td><td><input type="text" id="feld44" name="feld44" value="{artikelnummer}"></td></tr>
+<tr><td>Verpackungseinheit</td><td><input type="text" id="feld82_vorne" name="feld82_vorne" value="{verpackungseinheit}"></td></tr>
+<tr><td>Einheit</td><td><input type="text" id="feld93" name="feld93" value=""></td></tr>
+<tr><td>Menge</td><td><input type="text" id="feld94_vorne" name="feld94_vorne" value=""></td></tr>
+<tr><td>Kategorie</td><td><select name="feld99"><option value="0">-</option><option value="124">124</option></select></td></tr>
+<tr><td>Beschreibung</td><td>
+<textarea id="tri_editor_feld42" name="feld42" style="display:none">{beschreibung_escaped}</textarea>
+<iframe id="tri_editor_feld42_ifr" src="/crm/editor?id={product_id}"></iframe></td></tr>
+</table>
+<img alt="Sprachwahl" src="data:image/gif;base64,R0lGODlhAQABAAAAACw=" width="16" height="16"
+     onclick="parent.openSprache({product_id})">
+<input type="submit" class="Buttonspeichern" name="feldspeichern" value="Speichern">
+</form>
+<iframe name="speicherframe" style="display:none"></iframe>
+</div>
+<iframe id="frameunten" name="frameunten" src="about:blank" style="width: 900px; height: 400px;"></iframe>
+</td>
+</tr></table>
+<script>
+function showSection(section) {{
+    var frame = document.getElementById('frameunten');
+    if (section === 'preise') {{
+        frame.src = '/crm/sonstige_preise?id={product_id}';
+    }} else if (section === 'shopware') {{
+        frame.src = '/crm/shopwaresechs?id={product_id}';
+    }} else {{
+        frame.src = 'about:blank';
+    }}
+}}
+</script>
+</body></html>"""
+
+OTHER_PRICES_FRAME = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"></head><body>
+<p>Sonstige Preise</p>
+<a href="/crm/produkt?id={product_id}&amp;auswahl=preise">Erweiterte Preiseinstellungen</a>
+</body></html>"""
+
+SHOPWARE6_FRAME = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"></head><body>
+<div id="status">{status}</div>
+<input type="button" name="produktabgleich_vormerken" value="Vormerken"
+       onclick="this.dataset.vorgemerkt = '1'">
+<input type="button" name="produktabgleich_durchfuehren" value="Durchführen" onclick="
+    fetch('/crm/import?id={product_id}', {{method: 'POST'}}).then(function () {{
+        document.getElementById('status').innerHTML = '<span style=&quot;color: green&quot;>importiert</span>';
+    }});">
+</body></html>"""
+
+ADMIN_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Shopware Administration</title>
+<style>
+.sw-label__dismiss {{ visibility: hidden; }}
+.sw-select-selection-list__item-holder:hover .sw-label__dismiss {{ visibility: visible; }}
+.sw-select-result-list__content {{ border: 1px solid #999; background: #fff; }}
+.sw-code-editor__editor {{ min-height: 40px; border: 1px solid #ccc; }}
+#sw-language-switch-modal {{ border: 2px solid #333; padding: 10px; }}
+</style></head>
+<body>
+<div class="sw-language-switch"><div class="sw-select__selection"><span id="current-language">Deutsch</span></div></div>
+<input class="sw-search-bar__input" type="text" placeholder="Suchen">
+<div class="sw-search-bar__results"></div>
+<div id="sw-product-detail"></div>
+<script>
+var DEBOUNCE_MS = {debounce_ms};
+var LANGUAGES = ['Deutsch', 'English', 'Français'];
+var RULES = ['Händler', 'Händler Ausland', 'Endkunden'];
+var state = null;
+var product = null;
+var language = 'Deutsch';
+
+// Stand-in for the ace editor the admin uses in code mode.
+window.ace = {{
+    edit: function (el) {{
+        return {{
+            setValue: function (value) {{ el.dataset.value = value; el.textContent = value; }},
+            getValue: function () {{ return el.dataset.value || ''; }}
+        }};
+    }}
+}};
+
+function el(tag, cls, text) {{
+    var node = document.createElement(tag);
+    if (cls) node.className = cls;
+    if (text !== undefined) node.textContent = text;
+    return node;
+}}
+
+function later(fn) {{ setTimeout(fn, 30); }}
+
+function closeResultList() {{
+    document.querySelectorAll('.sw-select-result-list__content').forEach(function (n) {{ n.remove(); }});
+}}
+
+// Opens a result list under anchor; onPick(index, label) runs when an option is clicked.
+function openResultList(anchor, labels, onPick, keepOpen) {{
+    closeResultList();
+    var content = el('div', 'sw-select-result-list__content');
+    var list = el('ul', 'sw-select-result-list__item-list');
+    labels.forEach(function (label, i) {{
+        var li = el('li', 'sw-select-result sw-select-option--' + i);
+        var text = el('div', 'sw-highlight-text', label);
+        li.appendChild(text);
+        li.onclick = function () {{
+            if (!keepOpen) closeResultList();
+            onPick(i, label);
+        }};
+        list.appendChild(li);
+    }});
+    content.appendChild(list);
+    anchor.appendChild(content);
+}}
+
+// Like the real admin, edits stay in the page until the language switch modal saves them.
+function save() {{
+    var body = {{
+        artikelnummer: product, language: language, manufacturer: state.manufacturer,
+        gross: state.gross, rules: state.rules, channels: state.channels
+    }};
+    var nameField = document.getElementById('sw-field--product-name');
+    var editor = document.querySelector('.sw-code-editor__editor');
+    if (nameField) body.name = nameField.value;
+    if (editor && editor.dataset.value !== undefined) {{
+        body.description = editor.dataset.value;
+        state.descriptions = state.descriptions || {{}};
+        state.descriptions[language] = editor.dataset.value;
+    }}
+    return fetch('/admin/api/save', {{ method: 'POST', body: JSON.stringify(body) }});
+}}
+
+var searchTimer = null;
+var searchInput = document.querySelector('input.sw-search-bar__input');
+searchInput.addEventListener('input', function () {{
+    clearTimeout(searchTimer);
+    searchTimer = setTimeout(function () {{
+        var term = searchInput.value;
+        fetch('/admin/api/search?term=' + encodeURIComponent(term)).then(function (r) {{ return r.json(); }})
+            .then(function (hits) {{
+                var box = document.querySelector('.sw-search-bar__results');
+                box.innerHTML = '';
+                hits.forEach(function (hit) {{
+                    var a = el('a', 'sw-search-bar-item__link');
+                    a.href = '#/sw/product/detail/' + hit + '/base';
+                    a.appendChild(el('span', '', hit));
+                    a.onclick = function () {{ box.innerHTML = ''; }};
+                    box.appendChild(a);
+                }});
+            }});
+    }}, DEBOUNCE_MS);
+}});
+
+// Product detail routes, as in the admin: #/sw/product/detail/<id>/base (ids are the product numbers here).
+function route() {{
+    var match = /\/sw\/product\/detail\/([^/]+)/.exec(window.location.hash);
+    if (match && decodeURIComponent(match[1]) !== product) openProduct(decodeURIComponent(match[1]));
+}}
+window.addEventListener('hashchange', route);
+
+function openProduct(number) {{
+    fetch('/admin/api/product?number=' + encodeURIComponent(number)).then(function (r) {{ return r.json(); }})
+        .then(function (data) {{
+            product = number;
+            state = data;
+            renderDetail('base');
+        }});
+}}
+
+function renderDetail(tab) {{
+    var root = document.getElementById('sw-product-detail');
+    root.innerHTML = '';
+    var tabs = el('div', 'sw-tabs');
+    var general = el('a', 'sw-product-detail__tab-general', 'General');
+    general.href = '#/sw/product/detail/' + product + '/base';
+    general.onclick = function (e) {{ e.preventDefault(); renderDetail('base'); }};
+    var prices = el('a', 'sw-product-detail__tab-advanced-prices', 'Advanced pricing');
+    prices.href = '#/sw/product/detail/' + product + '/prices';
+    prices.onclick = function (e) {{ e.preventDefault(); renderDetail('prices'); }};
+    tabs.appendChild(general);
+    tabs.appendChild(prices);
+    root.appendChild(tabs);
+    root.appendChild(tab === 'prices' ? renderPrices() : renderGeneral());
+}}
+
+function renderPrices() {{
+    var view = el('div', 'sw-product-detail-context-prices');
+    if (!state.rules.length) {{
+        var empty = el('div', 'sw-product-detail-context-prices__empty-state-select-rule');
+        var selection = el('div', 'sw-select__selection', 'Select a conditional rule...');
+        selection.onclick = function () {{
+            openResultList(empty, RULES, function (i, label) {{
+                later(function () {{
+                    state.rules.push({{ rule: label, net: state.net }});
+                    renderDetail('prices');
+                }});
+            }});
+        }};
+        empty.appendChild(selection);
+        view.appendChild(empty);
+        return view;
+    }}
+    state.rules.forEach(function (rule, index) {{
+        var card = el('div', 'context-price context-price-group-' + index);
+        var ruleInput = el('input');
+        ruleInput.placeholder = 'Select a conditional rule...';
+        ruleInput.value = rule.rule || '';
+        ruleInput.onclick = function () {{
+            openResultList(card, RULES, function (i, label) {{
+                later(function () {{ rule.rule = label; renderDetail('prices'); }});
+            }});
+        }};
+        card.appendChild(ruleInput);
+        var net = el('input');
+        net.name = 'sw-price-field-net';
+        net.setAttribute('aria-label', 'Euro');
+        net.value = rule.net;
+        net.oninput = function () {{ rule.net = net.value; }};
+        card.appendChild(net);
+        var remove = el('button');
+        remove.appendChild(el('span', '', 'Delete pricing rule'));
+        remove.onclick = function () {{
+            later(function () {{
+                state.rules.splice(state.rules.indexOf(rule), 1);
+                renderDetail('prices');
+            }});
+        }};
+        card.appendChild(remove);
+        view.appendChild(card);
+    }});
+    var add = el('button', 'sw-product-detail-context-prices__add-new-rule', 'Add pricing rule');
+    add.onclick = function () {{
+        later(function () {{
+            state.rules.push({{ rule: '', net: state.net }});
+            renderDetail('prices');
+        }});
+    }};
+    view.appendChild(add);
+    return view;
+}}
+
+function renderGeneral() {{
+    var view = el('div', 'sw-product-detail-base');
+
+    var manufacturer = el('div');
+    manufacturer.id = 'manufacturerId';
+    var mSelection = el('div', 'sw-entity-single-select__selection');
+    mSelection.appendChild(el('div', 'sw-entity-single-select__selection-text', state.manufacturer));
+    mSelection.onclick = function () {{
+        openResultList(manufacturer, ['Scherer Voigt GbR', 'Andere GmbH'], function (i, label) {{
+            state.manufacturer = label;
+            mSelection.firstChild.textContent = label;
+        }});
+    }};
+    manufacturer.appendChild(mSelection);
+    view.appendChild(manufacturer);
+
+    var productNumber = el('input');
+    productNumber.id = 'sw-field--product-productNumber';
+    productNumber.value = product;
+    view.appendChild(productNumber);
+
+    var name = el('input');
+    name.id = 'sw-field--product-name';
+    name.value = state.names[language] || '';
+    name.oninput = function () {{ state.names[language] = name.value; }};
+    view.appendChild(name);
+
+    var gross = el('input');
+    gross.id = 'sw-price-field-gross';
+    gross.value = state.gross;
+    gross.oninput = function () {{ state.gross = gross.value; }};
+    view.appendChild(gross);
+
+    var grid = el('table', 'sw-data-grid');
+    state.rules.forEach(function (rule) {{
+        var tr = el('tr', 'sw-data-grid__row');
+        var label = el('td');
+        label.appendChild(el('span', '', rule.rule));
+        tr.appendChild(label);
+        [['minimumPurchase', 'Minimum purchase'], ['scaling', 'Scaling']].forEach(function (field) {{
+            var td = el('td', 'sw-data-grid__cell--' + field[0], rule[field[0]] || '1');
+            td.ondblclick = function () {{
+                if (td.querySelector('input')) return;
+                var input = el('input');
+                input.setAttribute('aria-label', field[1]);
+                input.value = rule[field[0]] || '1';
+                input.oninput = function () {{ rule[field[0]] = input.value; }};
+                td.textContent = '';
+                td.appendChild(input);
+            }};
+            tr.appendChild(td);
+        }});
+        grid.appendChild(tr);
+    }});
+    view.appendChild(grid);
+
+    var visibility = el('div', 'sw-product-category-form__visibility_field');
+    var chips = el('ul', 'sw-select-selection-list');
+    function renderChips() {{
+        chips.innerHTML = '';
+        state.channels.forEach(function (channel) {{
+            var holder = el('li', 'sw-select-selection-list__item-holder');
+            holder.appendChild(el('span', 'sw-label', channel));
+            var dismiss = el('button', 'sw-label__dismiss', 'x');
+            dismiss.onclick = function () {{
+                later(function () {{
+                    state.channels.splice(state.channels.indexOf(channel), 1);
+                    renderChips();
+                }});
+            }};
+            holder.appendChild(dismiss);
+            chips.appendChild(holder);
+        }});
+    }}
+    renderChips();
+    visibility.appendChild(chips);
+    var indicators = el('div', 'sw-select__selection-indicators');
+    var expand = el('span', 'sw-select__select-indicator-expand', 'v');
+    expand.onclick = function () {{
+        openResultList(visibility, ['Storefront', 'Headless', 'Händlershop', 'Ausland'], function (i, label) {{
+            later(function () {{
+                if (state.channels.indexOf(label) === -1) state.channels.push(label);
+                renderChips();
+            }});
+        }}, true);
+    }};
+    indicators.appendChild(expand);
+    visibility.appendChild(indicators);
+    view.appendChild(visibility);
+
+    var toolbar = el('div', 'sw-text-editor-toolbar');
+    var codeButton = el('div', 'sw-text-editor-toolbar-button__icon');
+    codeButton.appendChild(el('span', 'icon--regular-code-xs'));
+    var editor = el('div', 'sw-code-editor__editor ace_editor');
+    var description = (state.descriptions || {{}})[language];
+    if (description !== undefined) ace.edit(editor).setValue(description);
+    editor.style.display = 'none';
+    codeButton.onclick = function () {{
+        codeButton.classList.toggle('is--active');
+        editor.style.display = codeButton.classList.contains('is--active') ? 'block' : 'none';
+    }};
+    toolbar.appendChild(codeButton);
+    view.appendChild(toolbar);
+    view.appendChild(editor);
+    return view;
+}}
+
+var languageSwitch = document.querySelector('.sw-language-switch');
+languageSwitch.querySelector('.sw-select__selection').onclick = function () {{
+    openResultList(languageSwitch, LANGUAGES, function (i, label) {{
+        var modal = el('div');
+        modal.id = 'sw-language-switch-modal';
+        var button = el('button', '', 'Save changes');
+        button.id = 'sw-language-switch-save-changes-button';
+        button.onclick = function () {{
+            (product ? save() : Promise.resolve()).then(function () {{
+                modal.remove();
+                language = label;
+                document.getElementById('current-language').textContent = label;
+                if (product) renderDetail('base');
+            }});
+        }};
+        modal.appendChild(button);
+        document.body.appendChild(modal);
+    }});
+}};
+</script>
+</body></html>"""
+
+
+def initial_admin_state(product):
+    """Shopware state before the copy: one stale rule, a wrong manufacturer and two old channels."""
+    return {
+        "manufacturer": "Andere GmbH",
+        "net": "0",
+        "gross": "0",
+        "rules": [{"rule": "Endkunden", "net": "1"}],
+        "channels": ["Storefront", "Alt"],
+        "names": {"Deutsch": product["artikelnummer"]},
+    }
+
+
+class MockSitesHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        logging.debug("mock sites: " + format, *args)
+
+    def _send(self, status, body="", content_type="text/html; charset=utf-8"):
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _json(self, body, status=200):
+        self._send(status, json.dumps(body, ensure_ascii=False), "application/json")
+
+    def _body(self):
+        return self.rfile.read(int(self.headers.get("Content-Length") or 0)).decode("utf-8")
+
+    def _dispatch(self, method):
+        server = self.server
+        with server.lock:
+            server.request_count += 1
+        if server.latency_s:
+            time.sleep(server.latency_s)
+
+        url = urlsplit(self.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        if url.path == "/crm":
+            products = [{"id": pid, "name": p["artikelnummer"]} for pid, p in server.products.items()]
+            return self._send(200, CRM_PAGE.format(products=json.dumps(products)))
+        if url.path == "/admin":
+            return self._send(200, ADMIN_PAGE.format(debounce_ms=server.debounce_ms))
+        if url.path == "/admin/api/search":
+            term = query.get("term", "").lower()
+            hits = [p["artikelnummer"] for p in server.products.values()
+                    if term and term in p["artikelnummer"].lower()]
+            return self._json(hits[:10])
+        if url.path == "/admin/api/product":
+            with server.lock:
+                state = server.admin_state.get(query.get("number"))
+            return self._json(state) if state is not None else self._json({}, 404)
+        if url.path == "/admin/api/save" and method == "POST":
+            update = json.loads(self._body() or "{}")
+            with server.lock:
+                server.saves.append(update)
+                state = server.admin_state.get(update.get("artikelnummer"))
+                if state is not None:
+                    for key in ("manufacturer", "gross", "rules", "channels"):
+                        if key in update:
+                            state[key] = update[key]
+                    if "name" in update:
+                        state["names"][update["language"]] = update["name"]
+                    if "description" in update:
+                        state.setdefault("descriptions", {})[update["language"]] = update["description"]
+            return self._json({"ok": True})
+
+        product_id = query.get("id")
+        product = server.products.get(product_id)
+        if product is None:
+            return self._send(404, "<html><body>Unbekannte Seite</body></html>")
+        if url.path == "/crm/produkt" and query.get("auswahl") == "preise":
+            return self._send(200, server.pages[product_id]["prices"])
+        if url.path == "/crm/produkt" and method == "POST":
+            with server.lock:
+                server.saved_forms[product_id] = parse_qs(self._body())
+            return self._send(200, "<html><body>gespeichert</body></html>")
+        if url.path == "/crm/produkt":
+            return self._send(200, PRODUCT_FRAME.format(
+                product_id=product_id,
+                artikelnummer=html.escape(product["artikelnummer"], quote=True),
+                verpackungseinheit=html.escape(product["verpackungseinheit"], quote=True),
+                beschreibung_escaped=html.escape(product["beschreibung"]),
+            ))
+        if url.path == "/crm/editor":
+            return self._send(200, server.pages[product_id]["editor"])
+        if url.path == "/crm/sprache":
+            return self._send(200, server.pages[product_id]["language"])
+        if url.path == "/crm/sonstige_preise":
+            return self._send(200, OTHER_PRICES_FRAME.format(product_id=product_id))
+        if url.path == "/crm/shopwaresechs":
+            status = ('<span style="color: green">importiert</span>'
+                      if product_id in server.imported else "Nicht abgeglichen")
+            return self._send(200, SHOPWARE6_FRAME.format(product_id=product_id, status=status))
+        if url.path == "/crm/import" and method == "POST":
+            if server.import_delay_s:
+                time.sleep(server.import_delay_s)
+            with server.lock:
+                server.imported.add(product_id)
+            return self._json({"ok": True})
+        return self._send(404, "<html><body>Unbekannte Seite</body></html>")
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+
+class MockSitesServer:
+    """
+    Serves the Tricoma replica under /crm and the Shopware admin replica under /admin,
+    both for sample_product(0..product_count-1). Point CRM_URL / SHOP_URL at
+    crm_url / shop_url; no login is needed.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, product_count=10, latency_s=0.0,
+                 import_delay_s=0.2, debounce_ms=150):
+        self.httpd = ThreadingHTTPServer((host, port), MockSitesHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.lock = threading.Lock()
+        self.httpd.latency_s = latency_s
+        self.httpd.import_delay_s = import_delay_s
+        self.httpd.debounce_ms = debounce_ms
+        self.httpd.request_count = 0
+        self.httpd.products = {}
+        self.httpd.pages = {}
+        self.httpd.admin_state = {}
+        for index in range(product_count):
+            product = sample_product(index)
+            product_id = str(index + 1)
+            self.httpd.products[product_id] = product
+            self.httpd.pages[product_id] = render_pages(product)
+            self.httpd.admin_state[product["artikelnummer"]] = initial_admin_state(product)
+        self.httpd.saved_forms = {}
+        self.httpd.imported = set()
+        self.httpd.saves = []
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def crm_url(self):
+        return self.url + "/crm"
+
+    @property
+    def shop_url(self):
+        return self.url + "/admin"
+
+    @property
+    def product_names(self):
+        return [product["artikelnummer"] for product in self.httpd.products.values()]
+
+    @property
+    def request_count(self):
+        return self.httpd.request_count
+
+    def admin_state(self, artikelnummer):
+        with self.httpd.lock:
+            return json.loads(json.dumps(self.httpd.admin_state[artikelnummer]))
+
+    def verify(self, artikelnummer):
+        """Returns the list of fields that do not match what the copy flow should have written."""
+        state = self.admin_state(artikelnummer)
+        problems = []
+        if state["manufacturer"] != "Scherer Voigt GbR":
+            problems.append("manufacturer")
+        if sorted(rule["rule"] for rule in state["rules"]) != ["Händler", "Händler Ausland"]:
+            problems.append("rules")
+        if len(state["channels"]) != 4:
+            problems.append("channels")
+        if not all(state.get("descriptions", {}).get(lang) for lang in ("English", "Français")):
+            problems.append("descriptions")
+        return problems
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        logging.info("Mock Tricoma/Shopware sites listening on %s", self.url)
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
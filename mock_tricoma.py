@@ -0,0 +1,184 @@
+import logging
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+from tricoma_pages import render_pages, sample_product
+
+SESSION_COOKIE = ("PHPSESSID", "mock-tricoma-session")
+
+SEARCH_PAGE = """<html><body><div id="maneta_search_window">{links}</div></body></html>"""
+SEARCH_LINK = """<a class="tricoma_list_element_link" href="/produkt?id={product_id}">{name}</a>"""
+SHOPWARE6_PAGE = """<html><body><form method="post">
+<div class="status">{status}</div>
+<input type="submit" name="produktabgleich_vormerken" value="Vormerken">
+<input type="submit" name="produktabgleich_durchfuehren" value="Durchführen">
+</form></body></html>"""
+
+
+class MockTricomaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        logging.debug("mock tricoma: " + format, *args)
+
+    def _send(self, status, body=""):
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _authorized(self):
+        name, value = SESSION_COOKIE
+        return f"{name}={value}" in (self.headers.get("Cookie") or "")
+
+    def _form(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return parse_qs(self.rfile.read(length).decode("utf-8"))
+
+    def _dispatch(self, method):
+        server = self.server
+        with server.lock:
+            server.request_count += 1
+        if server.latency_s:
+            time.sleep(server.latency_s)
+        if not self._authorized():
+            return self._send(403, "<html><body>Login erforderlich</body></html>")
+
+        url = urlsplit(self.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        if url.path == "/search" and method == "GET":
+            term = query.get("suche", "").lower()
+            links = "".join(
+                SEARCH_LINK.format(product_id=pid, name=pages["name"])
+                for pid, pages in server.products.items() if term and term in pages["name"].lower()
+            )
+            return self._send(200, SEARCH_PAGE.format(links=links))
+
+        pages = server.products.get(query.get("id"))
+        if pages is None:
+            return self._send(404, "<html><body>Produkt nicht gefunden</body></html>")
+        if url.path == "/produkt" and query.get("auswahl") == "preise":
+            return self._send(200, pages["prices"])
+        if url.path == "/produkt" and method == "GET":
+            return self._send(200, pages["product"])
+        if url.path == "/produkt" and method == "POST":
+            with server.lock:
+                server.saved_forms[query["id"]] = self._form()
+            return self._send(200, pages["product"])
+        if url.path == "/sprache":
+            return self._send(200, pages["language"])
+        if url.path == "/shopwaresechs":
+            if method == "POST" and "produktabgleich_durchfuehren" in self._form():
+                with server.lock:
+                    server.imported.add(query["id"])
+            status = ('<span style="color: green">importiert</span>'
+                      if query["id"] in server.imported else "Nicht abgeglichen")
+            return self._send(200, SHOPWARE6_PAGE.format(status=status))
+        return self._send(404, "<html><body>Unbekannte Seite</body></html>")
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+
+def load_recorded_products(corpus_dir):
+    """Loads <corpus_dir>/<name>/{product,language,prices}.html as captured by PageSourceExtractor."""
+    products = {}
+    for index, name in enumerate(sorted(os.listdir(corpus_dir)), start=1):
+        product_dir = os.path.join(corpus_dir, name)
+        pages = {"name": name}
+        for frame in ("product", "language", "prices"):
+            path = os.path.join(product_dir, f"{frame}.html")
+            if not os.path.exists(path):
+                break
+            with open(path, "r", encoding="utf-8") as f:
+                pages[frame] = f.read()
+        else:
+            products[str(index)] = pages
+    return products
+
+
+class MockTricomaServer:
+    """
+    Local stand-in for Tricoma serving recorded (or generated sample) product pages
+    behind a session cookie, for TricomaHttpScraper.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, corpus_dir=None, product_count=10, latency_s=0.0):
+        self.httpd = ThreadingHTTPServer((host, port), MockTricomaHandler)
+        self.httpd.daemon_threads = True
+        if corpus_dir:
+            self.httpd.products = load_recorded_products(corpus_dir)
+        else:
+            self.httpd.products = {}
+            for index in range(product_count):
+                product = sample_product(index)
+                pages = render_pages(product)
+                pages["name"] = product["artikelnummer"]
+                pages["expected"] = product
+                self.httpd.products[str(index + 1)] = pages
+        self.httpd.lock = threading.Lock()
+        self.httpd.request_count = 0
+        self.httpd.latency_s = latency_s
+        self.httpd.saved_forms = {}
+        self.httpd.imported = set()
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def products(self):
+        return self.httpd.products
+
+    @property
+    def request_count(self):
+        return self.httpd.request_count
+
+    @property
+    def cookies(self):
+        """Cookies in the shape returned by driver.get_cookies()."""
+        name, value = SESSION_COOKIE
+        return [{"name": name, "value": value, "domain": "127.0.0.1", "path": "/"}]
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        logging.info("Mock Tricoma listening on %s", self.url)
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+if __name__ == "__main__":
+    from http_scraper import TricomaHttpScraper
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    with MockTricomaServer(product_count=40, latency_s=0.02) as server:
+        names = [pages["name"] for pages in server.products.values()]
+        for concurrency in (1, 8):
+            scraper = TricomaHttpScraper(
+                {"TRICOMA_HTTP": {"base_url": server.url, "concurrency": concurrency}}, server.cookies
+            )
+            start = time.perf_counter()
+            scraped = [data for _, data in scraper.scrape_many(names) if data]
+            elapsed = time.perf_counter() - start
+            print(f"concurrency {concurrency}: {len(scraped)} products in {elapsed:.2f} s "
+                  f"({len(scraped) / elapsed:.1f} products/s, {scraper.request_count} requests)")
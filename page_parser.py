@@ -0,0 +1,122 @@
+import logging
+from lxml import html as lxml_html
+from pricing import join_amount
+
+# Same selectors as the live WebDriver lookups in CRMDownloader.
+PRODUCT_NUMBER_XPATH = "//*[@id='feld44']"
+PACKAGING_UNIT_XPATH = "//*[@id='feld82_vorne']"
+TITLE_FR_XPATH = "//*[@name='titel_FRA']"
+TITLE_GB_XPATH = "//*[@name='titel_GBR']"
+PRICE_TABLE_XPATH = (
+    "//div[@class='tri_box'][p[contains(., 'Weitere Verkaufspreise (€)')]]"
+    "//div[@class='content']//table[contains(@class, 'table_listing')]"
+)
+HANDLER_ROW_XPATH = ".//tr[td[contains(., 'Händler (H)')]]"
+ENDKUNDE_ROW_XPATH = ".//tr[td[contains(., 'Endkunden (EK)')]]"
+VORKOMMA_XPATH = ".//input[contains(@class, 'zahlenfeld_vorkomma')]"
+NACHKOMMA_XPATH = ".//input[contains(@class, 'zahlenfeld_nachkomma')]"
+DESCRIPTION_TEXTAREA_XPATH = "//textarea[@id='tri_editor_feld42']"
+SEARCH_RESULT_XPATH = "//a[contains(@class, 'tricoma_list_element_link')]"
+IMPORTED_XPATH = "//*[contains(text(), 'importiert')]"
+
+
+class PageParseError(Exception):
+    pass
+
+
+def _document(page_source):
+    return lxml_html.fromstring(page_source)
+
+
+def _first(root, xpath, what):
+    found = root.xpath(xpath)
+    if not found:
+        raise PageParseError(f"{what} not found ({xpath})")
+    return found[0]
+
+
+def _value(root, xpath, what):
+    return _first(root, xpath, what).get("value", "")
+
+
+def _inner_html(element):
+    parts = [element.text or ""]
+    parts.extend(lxml_html.tostring(child, encoding="unicode") for child in element)
+    return "".join(parts)
+
+
+def parse_product_page(product_source, editor_source=None):
+    """
+    Product iframe + tri_editor_feld42 iframe -> artikelnummer, verpackungseinheit, raw description.
+    Without the editor iframe (plain HTTP fetch) the description is read from the
+    server-rendered tri_editor_feld42 textarea instead.
+    """
+    product = _document(product_source)
+    if editor_source is None:
+        description = _first(product, DESCRIPTION_TEXTAREA_XPATH, "Description textarea").text or ""
+    else:
+        editor = _document(editor_source)
+        body = editor.find("body")
+        if body is None:
+            body = _first(editor, "//body", "Editor body")
+        description = _inner_html(body)
+    return {
+        "artikelnummer": _value(product, PRODUCT_NUMBER_XPATH, "Product number"),
+        "verpackungseinheit": _value(product, PACKAGING_UNIT_XPATH, "Packaging unit"),
+        "beschreibung": description,
+    }
+
+
+def parse_product_form(product_source):
+    """Returns (action, [(name, value), ...]) of the form holding feld44, as a browser would submit it."""
+    field = _first(_document(product_source), PRODUCT_NUMBER_XPATH, "Product number")
+    form = next((a for a in field.iterancestors() if a.tag == "form"), None)
+    if form is None:
+        raise PageParseError("Product form not found")
+    return form.get("action") or "", list(form.form_values())
+
+
+def parse_search_results(search_source):
+    """Search window -> hrefs of the result links, best hit first."""
+    return [a.get("href") for a in _document(search_source).xpath(SEARCH_RESULT_XPATH) if a.get("href")]
+
+
+def is_imported(shopware6_source):
+    return bool(_document(shopware6_source).xpath(IMPORTED_XPATH))
+
+
+def parse_language_page(language_source):
+    """contentframeSprache -> titel_FRA, titel_GBR."""
+    root = _document(language_source)
+    return {
+        "titel_FRA": _value(root, TITLE_FR_XPATH, "titel_FRA"),
+        "titel_GBR": _value(root, TITLE_GB_XPATH, "titel_GBR"),
+    }
+
+
+def _price(table, row_xpath, what):
+    row = _first(table, row_xpath, what)
+    integer = _value(row, VORKOMMA_XPATH, f"{what} vorkomma")
+    decimal = _value(row, NACHKOMMA_XPATH, f"{what} nachkomma")
+    return join_amount(integer, decimal)
+
+
+def parse_prices_page(prices_source):
+    """frameunten (auswahl=preise) -> handler_preis, endkunde_preis."""
+    table = _first(_document(prices_source), PRICE_TABLE_XPATH, "Price table")
+    return {
+        "handler_preis": _price(table, HANDLER_ROW_XPATH, "Händler row"),
+        "endkunde_preis": _price(table, ENDKUNDE_ROW_XPATH, "Endkunden row"),
+    }
+
+
+def parse_captured_product(pages):
+    """
+    Parses a dict of captured frame sources keyed by
+    'product', 'editor', 'language' and 'prices' into product_data.
+    """
+    product_data = parse_product_page(pages["product"], pages["editor"])
+    product_data.update(parse_language_page(pages["language"]))
+    product_data.update(parse_prices_page(pages["prices"]))
+    logging.debug("Parsed captured pages for %s", product_data.get("artikelnummer"))
+    return product_data
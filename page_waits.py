@@ -0,0 +1,225 @@
+import logging
+import time
+
+# Every wait is one execute_async_script call: the browser resolves it from its own
+# events (DOM mutations, request completion, frame load) and the timeout is only a fallback.
+_WAIT_TEMPLATE = """
+var done = arguments[arguments.length - 1];
+var timeoutMs = arguments[0];
+var args = Array.prototype.slice.call(arguments, 1, arguments.length - 1);
+var started = Date.now();
+var finished = false;
+var cleanups = [];
+function finish(ok) {
+    if (finished) return;
+    finished = true;
+    cleanups.forEach(function (fn) { try { fn(); } catch (e) {} });
+    done({ok: ok, elapsed_ms: Date.now() - started});
+}
+var fallback = setTimeout(function () { finish(false); }, timeoutMs);
+cleanups.push(function () { clearTimeout(fallback); });
+try {
+%s
+} catch (e) {
+    finish(false);
+}
+"""
+
+# Resolves when the named condition becomes true, re-checked on every DOM mutation.
+# Conditions are fixed here (no eval) so the pages' content security policy does not matter.
+UNTIL_JS = _WAIT_TEMPLATE % """
+    var conditions = {
+        count_changed: function (a) {
+            return (a[2] || document).querySelectorAll(a[0]).length !== a[1];
+        },
+        detached: function (a) {
+            return !a[0].isConnected;
+        }
+    };
+    var predicate = conditions[args[0]];
+    var check = function () {
+        try {
+            if (predicate(args.slice(1))) finish(true);
+        } catch (e) {}
+    };
+    var observer = new MutationObserver(check);
+    observer.observe(document.documentElement,
+        {childList: true, subtree: true, attributes: true, characterData: true});
+    cleanups.push(function () { observer.disconnect(); });
+    check();
+"""
+
+# Resolves once the DOM has been quiet for quietMs.
+DOM_SETTLED_JS = _WAIT_TEMPLATE % """
+    var quietMs = args[0];
+    var target = args[1] ? document.querySelector(args[1]) : document.documentElement;
+    var timer = null;
+    var arm = function () {
+        clearTimeout(timer);
+        timer = setTimeout(function () { finish(true); }, quietMs);
+    };
+    var observer = new MutationObserver(arm);
+    observer.observe(target || document.documentElement,
+        {childList: true, subtree: true, attributes: true, characterData: true});
+    cleanups.push(function () { observer.disconnect(); clearTimeout(timer); });
+    arm();
+"""
+
+# Counts XHR/fetch requests of the page; installed once per document.
+INSTALL_NETWORK_TRACKER_JS = """
+if (!window.__waitNetwork) {
+    var state = window.__waitNetwork = {pending: 0, started: 0, listeners: []};
+    var changed = function () { state.listeners.slice().forEach(function (fn) { fn(); }); };
+    var begin = function () { state.pending++; state.started++; changed(); };
+    var end = function () { state.pending = Math.max(0, state.pending - 1); changed(); };
+    var send = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function () {
+        begin();
+        this.addEventListener('loadend', end);
+        return send.apply(this, arguments);
+    };
+    if (window.fetch) {
+        var fetch = window.fetch;
+        window.fetch = function () {
+            begin();
+            return fetch.apply(this, arguments).finally(end);
+        };
+    }
+}
+return window.__waitNetwork.started;
+"""
+
+# Resolves when no XHR/fetch is in flight for quietMs. With sinceCount set it first
+# waits (up to startMs) for a request newer than that count, so a debounced search is not missed.
+NETWORK_IDLE_JS = _WAIT_TEMPLATE % """
+    var quietMs = args[0], sinceCount = args[1], startMs = args[2];
+    var state = window.__waitNetwork;
+    if (!state) { finish(true); return; }
+    var timer = null;
+    var check = function () {
+        clearTimeout(timer);
+        var waitingForStart = sinceCount !== null && state.started <= sinceCount
+            && Date.now() - started < startMs;
+        if (waitingForStart) {
+            timer = setTimeout(check, startMs - (Date.now() - started));
+        } else if (state.pending === 0) {
+            timer = setTimeout(function () {
+                if (state.pending === 0) finish(true);
+            }, quietMs);
+        }
+    };
+    state.listeners.push(check);
+    cleanups.push(function () {
+        clearTimeout(timer);
+        state.listeners.splice(state.listeners.indexOf(check), 1);
+    });
+    check();
+"""
+
+# Marks the document currently loaded in an iframe so a later wait can tell it was replaced.
+# The mark goes on the document: the initial about:blank window is reused by the first navigation.
+MARK_FRAME_JS = """
+var frame = document.getElementById(arguments[0]);
+try {
+    if (frame && frame.contentDocument) frame.contentDocument.__waitMarked = true;
+} catch (e) {}
+"""
+
+# Resolves when the iframe holds a new (unmarked) document that finished loading.
+FRAME_LOADED_JS = _WAIT_TEMPLATE % """
+    var frameId = args[0];
+    var ready = function () {
+        var frame = document.getElementById(frameId);
+        if (!frame) return false;
+        try {
+            var doc = frame.contentDocument;
+            return !doc.__waitMarked && doc.readyState === 'complete' && doc.URL !== 'about:blank';
+        } catch (e) {
+            return false;
+        }
+    };
+    var check = function () { if (ready()) finish(true); };
+    var attached = null;
+    var attach = function () {
+        var frame = document.getElementById(frameId);
+        if (frame && frame !== attached) {
+            frame.addEventListener('load', check);
+            attached = frame;
+        }
+        check();
+    };
+    var observer = new MutationObserver(attach);
+    observer.observe(document.documentElement, {childList: true, subtree: true, attributes: true});
+    // load events of a same-document navigation inside the frame do not always bubble up
+    var poll = setInterval(check, 100);
+    cleanups.push(function () {
+        observer.disconnect();
+        clearInterval(poll);
+        if (attached) attached.removeEventListener('load', check);
+    });
+    attach();
+"""
+
+
+class PageWaits:
+    """
+    Event-driven waits for the Tricoma and Shopware pages, used in place of fixed sleeps.
+    Each wait logs how long it actually took; a wait that hits its timeout logs a warning
+    and returns False instead of raising, so the following explicit WebDriverWait decides.
+    """
+
+    def __init__(self, driver, timeout_s=10):
+        self.driver = driver
+        self.timeout_s = timeout_s
+        self.driver.set_script_timeout(timeout_s + 5)
+
+    def run(self, label, script, *args, timeout_s=None):
+        timeout_s = timeout_s or self.timeout_s
+        if timeout_s > self.timeout_s:
+            self.driver.set_script_timeout(timeout_s + 5)
+        start = time.perf_counter()
+        try:
+            result = self.driver.execute_async_script(script, int(timeout_s * 1000), *args) or {}
+        except Exception as e:
+            logging.warning("Wait '%s' failed after %.2f s: %s", label, time.perf_counter() - start, e)
+            return False
+        finally:
+            if timeout_s > self.timeout_s:
+                self.driver.set_script_timeout(self.timeout_s + 5)
+        elapsed = time.perf_counter() - start
+        if result.get("ok"):
+            logging.info("Wait '%s' resolved in %.2f s.", label, elapsed)
+            return True
+        logging.warning("Wait '%s' timed out after %.2f s.", label, elapsed)
+        return False
+
+    def until(self, label, condition, *args, timeout_s=None):
+        """condition names one of the checks in UNTIL_JS; args are passed to it."""
+        return self.run(label, UNTIL_JS, condition, *args, timeout_s=timeout_s)
+
+    def dom_settled(self, label, quiet_ms=150, selector=None, timeout_s=None):
+        return self.run(label, DOM_SETTLED_JS, quiet_ms, selector, timeout_s=timeout_s)
+
+    def count(self, css_selector, root=None):
+        return self.driver.execute_script(
+            "return (arguments[1] || document).querySelectorAll(arguments[0]).length;", css_selector, root
+        )
+
+    def count_changed(self, label, css_selector, before, root=None, timeout_s=None):
+        return self.until(label, "count_changed", css_selector, before, root, timeout_s=timeout_s)
+
+    def detached(self, label, element, timeout_s=None):
+        return self.until(label, "detached", element, timeout_s=timeout_s)
+
+    def track_network(self):
+        """Installs the XHR/fetch counter in the current document; returns the number of requests started so far."""
+        return self.driver.execute_script(INSTALL_NETWORK_TRACKER_JS)
+
+    def network_idle(self, label, quiet_ms=250, since=None, start_ms=1500, timeout_s=None):
+        return self.run(label, NETWORK_IDLE_JS, quiet_ms, since, start_ms, timeout_s=timeout_s)
+
+    def mark_frame(self, frame_id):
+        self.driver.execute_script(MARK_FRAME_JS, frame_id)
+
+    def frame_loaded(self, label, frame_id, timeout_s=None):
+        return self.run(label, FRAME_LOADED_JS, frame_id, timeout_s=timeout_s)
@@ -0,0 +1,204 @@
+import logging
+import queue
+import threading
+import time
+from contextlib import nullcontext
+from metrics import metrics
+from retry_policy import classify
+from shop_uploader import ShopUploader
+
+_DONE = object()
+
+
+class StageError(Exception):
+    pass
+
+
+class BatchPipeline:
+    """
+    Runs download -> translate -> upload as three stages connected by bounded queues,
+    so product N+1 is scraped while N is translated and N-1 is uploaded.
+    Uploads finish in input order, which keeps products.txt / product_counter.txt
+    resume semantics unchanged. When the download and upload stages both drive the
+    same browser, they take turns on it through a lock; the translate stage never
+    needs the browser. The translate stage takes up to translate_batch waiting products
+    at once and sends their descriptions to DeepL together.
+    """
+
+    def __init__(self, facade, queue_size=2, download_uses_driver=None, translate_batch=1):
+        self.facade = facade
+        self.queue_size = queue_size
+        self.translate_batch = max(int(translate_batch), 1)
+        self.stop_event = threading.Event()
+        self.errors = []
+        self.on_failed = None
+        self.on_unchanged = None
+        self.busy = {"download": 0.0, "translate": 0.0, "upload": 0.0}
+        if download_uses_driver is None:
+            download_uses_driver = facade.config.get("CRM_SOURCE", "selenium") != "http"
+        upload_uses_driver = isinstance(facade.shop_uploader, ShopUploader)
+        self.driver_lock = threading.Lock() if download_uses_driver and upload_uses_driver else None
+
+    def driver_turn(self):
+        return self.driver_lock if self.driver_lock is not None else nullcontext()
+
+    def put(self, q, item):
+        while not self.stop_event.is_set():
+            try:
+                q.put(item, timeout=0.2)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def get(self, q):
+        while True:
+            try:
+                return q.get(timeout=0.2)
+            except queue.Empty:
+                if self.stop_event.is_set():
+                    return _DONE
+
+    def fail(self, stage, error):
+        logging.error("Pipeline stage '%s' failed: %s", stage, error)
+        self.errors.append((stage, error))
+        self.stop_event.set()
+
+    def download_stage(self, names, out_q):
+        try:
+            products = self.facade.download_products(names, on_unchanged=self.on_unchanged)
+            while not self.stop_event.is_set():
+                start = time.perf_counter()
+                with self.driver_turn():
+                    item = next(products, _DONE)
+                self.busy["download"] += time.perf_counter() - start
+                if item is _DONE:
+                    break
+                name, product_data = item
+                if product_data is None:
+                    logging.error("Download of '%s' failed — left in the product list.", name)
+                    if self.on_failed is not None:
+                        self.on_failed(name, "download failed")
+                    continue
+                if not self.put(out_q, item):
+                    break
+            products.close()
+        except Exception as e:
+            self.fail("download", e)
+        finally:
+            self.put(out_q, _DONE)
+
+    def take_batch(self, in_q):
+        """The next product plus whatever else is already waiting, up to translate_batch; (items, last)."""
+        item = self.get(in_q)
+        if item is _DONE:
+            return [], True
+        items = [item]
+        while len(items) < self.translate_batch:
+            try:
+                item = in_q.get_nowait()
+            except queue.Empty:
+                break
+            if item is _DONE:
+                return items, True
+            items.append(item)
+        return items, False
+
+    def translate_stage(self, in_q, out_q):
+        try:
+            last = False
+            while not last:
+                items, last = self.take_batch(in_q)
+                if not items:
+                    break
+                start = time.perf_counter()
+                try:
+                    results = self.facade.translate_products(items)
+                except Exception as e:
+                    results = [(name, product_data, e) for name, product_data in items]
+                finally:
+                    self.busy["translate"] += time.perf_counter() - start
+                for name, product_data, error in results:
+                    if error is not None:
+                        logging.error("Translation of '%s' failed: %s — left in the product list.", name, error)
+                        if self.on_failed is not None:
+                            self.on_failed(name, error)
+                        continue
+                    if not self.put(out_q, (name, product_data)):
+                        last = True
+                        break
+        except Exception as e:
+            self.fail("translate", e)
+        finally:
+            self.put(out_q, _DONE)
+
+    def upload_product(self, name, product_data):
+        with self.driver_turn():
+            self.facade.upload_product(name, product_data)
+
+    def run(self, names, on_uploaded, on_failed=None, on_unchanged=None):
+        """
+        Processes names through all stages. on_uploaded(name, product_data) is called in
+        input order after each upload; returning False stops the pipeline (pause.txt).
+        on_failed(name, error) is called for products whose download, translation or upload failed,
+        on_unchanged(name, product_data) (from the download thread) for products skipped as unchanged.
+        Returns True when every product went through, False when stopped early.
+        Re-raises the first stage error.
+        """
+        self.on_failed = on_failed
+        self.on_unchanged = on_unchanged
+        # Room for a full translate batch to gather while the previous one is at DeepL.
+        translate_q = queue.Queue(max(self.queue_size, self.translate_batch))
+        upload_q = queue.Queue(self.queue_size)
+        threads = [
+            threading.Thread(target=self.download_stage, args=(names, translate_q),
+                             name="pipeline-download", daemon=True),
+            threading.Thread(target=self.translate_stage, args=(translate_q, upload_q),
+                             name="pipeline-translate", daemon=True),
+        ]
+        for thread in threads:
+            thread.start()
+
+        started = time.perf_counter()
+        completed = True
+        uploaded = 0
+        try:
+            while True:
+                item = self.get(upload_q)
+                if item is _DONE:
+                    break
+                name, product_data = item
+                logging.info("=== Uploading product: %s ===", name)
+                start = time.perf_counter()
+                try:
+                    with metrics.product(name):
+                        self.upload_product(name, product_data)
+                except Exception as e:
+                    if classify(e) == "session_lost":
+                        raise
+                    logging.error("Upload of '%s' failed: %s — left in the product list.", name, e)
+                    if self.on_failed is not None:
+                        self.on_failed(name, e)
+                    continue
+                finally:
+                    self.busy["upload"] += time.perf_counter() - start
+                uploaded += 1
+                if not on_uploaded(name, product_data):
+                    completed = False
+                    break
+        except Exception as e:
+            self.fail("upload", e)
+        finally:
+            self.stop_event.set()
+            for thread in threads:
+                thread.join()
+
+        wall = time.perf_counter() - started
+        logging.info(
+            "Pipeline: %d products in %.1f s; busy download %.1f s, translate %.1f s, upload %.1f s.",
+            uploaded, wall, self.busy["download"], self.busy["translate"], self.busy["upload"]
+        )
+        if self.errors:
+            stage, error = self.errors[0]
+            raise StageError(f"{stage} stage failed: {error}") from error
+        return completed
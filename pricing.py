@@ -0,0 +1,212 @@
+import argparse
+import csv
+import decimal
+import json
+import logging
+import os
+import re
+from decimal import Decimal, InvalidOperation
+
+DEFAULTS = {
+    "tax_rate":         "1.19",
+    "rounding_step":    "0.05",
+    "rounding":         "ROUND_HALF_UP",    # any decimal rounding mode
+    # Advanced-pricing rule name -> its own tax_rate (e.g. 1.00 for foreign dealers).
+    "rules":            {},
+    "preview_file":     "price_preview.csv",
+}
+
+# Advanced-pricing rules the upload flow fills with the Händler price.
+DEFAULT_RULES = ("Händler", "Händler Ausland")
+
+CENT = Decimal("0.01")
+
+
+class PriceError(Exception):
+    pass
+
+
+def parse_amount(value, decimal_separator=None):
+    """
+    '1.234,5' / '1234.50' / '12,50 €' / 12.5 -> Decimal('1234.50'). decimal_separator ("," or ".")
+    fixes the number format of a source; without it '1.234' could be either and is rejected.
+    """
+    if isinstance(value, (int, float, Decimal)):
+        text, decimal_separator = str(value), "."
+    else:
+        text = str(value if value is not None else "").replace("€", "").replace(" ", "").strip()
+    if not text:
+        raise PriceError("empty amount")
+    if decimal_separator is None:
+        if "," in text:
+            decimal_separator = ","
+        elif re.fullmatch(r"-?[1-9]\d{0,2}\.\d{3}", text):
+            raise PriceError(f"ambiguous amount '{value}' (thousands or decimal separator?)")
+        else:
+            decimal_separator = "."
+    thousands_separator = "." if decimal_separator == "," else ","
+    text = text.replace(thousands_separator, "").replace(decimal_separator, ".")
+    try:
+        return Decimal(text).quantize(CENT, decimal.ROUND_HALF_UP)
+    except InvalidOperation:
+        raise PriceError(f"invalid amount '{value}'")
+
+
+def join_amount(vorkomma, nachkomma):
+    """Tricoma's split price inputs (vorkomma / nachkomma) -> '1234.50'."""
+    return str(parse_amount(f"{vorkomma or 0},{nachkomma or 0}"))
+
+
+class PricingEngine:
+    """
+    Shop prices from the scraped Tricoma prices in exact decimal arithmetic:
+      gross = endkunde_preis × tax_rate, to the cent, then to the nearest rounding_step
+      net   = gross ÷ tax_rate, to the cent
+      rule prices: net = handler_preis, gross = net × the rule's tax_rate, to the cent
+    price() adds these as the product's 'pricing' column; price_many() and preview()
+    handle a whole export or store in one pass.
+    """
+
+    def __init__(self, cfg=None):
+        self.cfg = {**DEFAULTS, **(cfg or {})}
+        self.rounding = getattr(decimal, self.cfg["rounding"])
+        self.tax_rate = Decimal(str(self.cfg["tax_rate"]))
+        self.step = Decimal(str(self.cfg["rounding_step"]))
+        self.rule_tax_rates = {
+            rule: Decimal(str(settings.get("tax_rate", self.cfg["tax_rate"])))
+            for rule, settings in self.cfg["rules"].items()
+        }
+
+    @classmethod
+    def from_config(cls, config):
+        """PRICING section; tax_rate / rounding_step set in SHOPWARE_API are a deprecated fallback beneath it."""
+        api = config.get("SHOPWARE_API", {})
+        legacy = {key: api[key] for key in ("tax_rate", "rounding_step") if key in api}
+        if legacy:
+            logging.warning(
+                "SHOPWARE_API %s is deprecated — move it to the PRICING section.", " / ".join(sorted(legacy))
+            )
+        return cls({**legacy, **config.get("PRICING", {})})
+
+    def to_cent(self, amount):
+        return amount.quantize(CENT, self.rounding)
+
+    def to_step(self, amount):
+        if not self.step:
+            return self.to_cent(amount)
+        return ((amount / self.step).quantize(Decimal(1), self.rounding) * self.step).quantize(CENT)
+
+    def price(self, product_data, rules=DEFAULT_RULES):
+        """The 'pricing' column of one product: amounts as strings with two decimals."""
+        endkunde = parse_amount(product_data.get("endkunde_preis"))
+        handler = parse_amount(product_data.get("handler_preis"))
+        gross = self.to_step(self.to_cent(endkunde * self.tax_rate))
+        return {
+            "gross": str(gross),
+            "net": str(self.to_cent(gross / self.tax_rate)),
+            "rules": {
+                rule: {
+                    "net": str(handler),
+                    "gross": str(self.to_cent(handler * self.rule_tax_rates.get(rule, self.tax_rate))),
+                }
+                for rule in rules
+            },
+        }
+
+    def apply(self, product_data, rules=DEFAULT_RULES):
+        product_data["pricing"] = self.price(product_data, rules)
+        return product_data
+
+    def pricing_of(self, product_data, rules=DEFAULT_RULES):
+        """The precomputed column, or the prices computed now for records that do not have it."""
+        pricing = product_data.get("pricing")
+        if pricing and all(rule in pricing.get("rules", {}) for rule in rules):
+            return pricing
+        return self.price(product_data, rules)
+
+    def price_many(self, products, rules=DEFAULT_RULES):
+        """Yields (product_data, pricing or None, error) for every product, in one streaming pass."""
+        for product_data in products:
+            try:
+                yield product_data, self.price(product_data, rules), None
+            except PriceError as e:
+                yield product_data, None, str(e)
+
+    def preview(self, products, filename=None, previous=None, rules=DEFAULT_RULES):
+        """
+        Writes one CSV line per product (scraped prices, computed prices and, with previous set,
+        the gross of previous(artikelnummer) and whether any price changed) and returns a summary.
+        Nothing is uploaded.
+        """
+        filename = filename or self.cfg["preview_file"]
+        summary = {"file": filename, "products": 0, "changed": 0, "new": 0, "errors": 0,
+                   "min_gross": None, "max_gross": None}
+        tmp_file = filename + ".tmp"
+        with open(tmp_file, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f, delimiter=";")
+            writer.writerow(
+                ["artikelnummer", "handler_preis", "endkunde_preis", "net", "gross"]
+                + [f"gross {rule}" for rule in rules] + ["previous gross", "status"]
+            )
+            for product_data, pricing, error in self.price_many(products, rules):
+                artikelnummer = product_data.get("artikelnummer", "")
+                summary["products"] += 1
+                if pricing is None:
+                    summary["errors"] += 1
+                    writer.writerow([artikelnummer, product_data.get("handler_preis"),
+                                     product_data.get("endkunde_preis"), "", ""]
+                                    + [""] * len(rules) + ["", f"error: {error}"])
+                    continue
+                gross = Decimal(pricing["gross"])
+                if summary["min_gross"] is None or gross < summary["min_gross"]:
+                    summary["min_gross"] = gross
+                if summary["max_gross"] is None or gross > summary["max_gross"]:
+                    summary["max_gross"] = gross
+                before = previous(artikelnummer) if previous is not None else None
+                previous_gross = ""
+                status = "new" if previous is not None else ""
+                if before is not None:
+                    try:
+                        previous_pricing = self.price(before, rules)
+                        previous_gross = previous_pricing["gross"]
+                        status = "unchanged" if previous_pricing == pricing else "changed"
+                    except PriceError:
+                        status = "changed"
+                if status in ("changed", "new"):
+                    summary[status] += 1
+                writer.writerow(
+                    [artikelnummer, product_data.get("handler_preis"), product_data.get("endkunde_preis"),
+                     pricing["net"], pricing["gross"]]
+                    + [pricing["rules"][rule]["gross"] for rule in rules] + [previous_gross, status]
+                )
+        os.replace(tmp_file, filename)
+        logging.info(
+            "Price preview: %d products (%d changed, %d new, %d errors), gross %s – %s, written to %s.",
+            summary["products"], summary["changed"], summary["new"], summary["errors"],
+            summary["min_gross"], summary["max_gross"], filename,
+        )
+        return summary
+
+
+if __name__ == "__main__":
+    from product_store import ProductStore
+    from tricoma_export import TricomaExport
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Price preview: shop prices of an export or of the stored products, without uploading.")
+    parser.add_argument("--config", default="config.json")
+    parser.add_argument("--export", metavar="FILE", help="Tricoma CSV/XML export (default: the product store).")
+    parser.add_argument("--out", help="Preview CSV (default: PRICING preview_file).")
+    args = parser.parse_args()
+
+    config = {}
+    if os.path.exists(args.config):
+        with open(args.config, "r", encoding="utf-8") as f:
+            config = json.load(f)
+    engine = PricingEngine.from_config(config)
+    store = ProductStore(config.get("PRODUCT_STORE", {}))
+    if args.export:
+        products = (data for _, data in TricomaExport(args.export, config.get("TRICOMA_EXPORT", {})))
+        engine.preview(products, args.out, previous=lambda number: store.latest(number, "translated"))
+    else:
+        engine.preview(store.iter_latest("translated"), args.out)
@@ -0,0 +1,216 @@
+import argparse
+import csv
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULTS = {
+    "enabled":          True,
+    "path":             "shopware_index.sqlite3",
+    "page_size":        500,
+    "refresh_on_batch": True,
+}
+
+TRICOMA_DEFAULTS = {
+    "enabled":          True,
+    "path":             "tricoma_index.sqlite3",
+    # Searches every open name over HTTP before the batch; opt-in, it costs a request per uncached name.
+    "preresolve":       False,
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS {table} (
+    {key} TEXT PRIMARY KEY,
+    {value} TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+class ProductIndex:
+    """
+    Persistent key -> id mapping in SQLite (WAL, one connection per thread),
+    so products can be opened directly instead of through a search.
+    """
+
+    TABLE = "product_ids"
+    KEY = "artikelnummer"
+    VALUE = "product_id"
+    DEFAULTS = DEFAULTS
+
+    def __init__(self, cfg=None):
+        self.cfg = {**self.DEFAULTS, **(cfg or {})}
+        self.enabled = self.cfg["enabled"]
+        self.path = self.cfg["path"]
+        self.local = threading.local()
+        self.hits = 0
+        self.misses = 0
+        if not self.enabled:
+            return
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        with self.connection() as conn:
+            conn.executescript(SCHEMA.format(table=self.TABLE, key=self.KEY, value=self.VALUE))
+
+    def connection(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.local.conn = conn
+        return conn
+
+    def get(self, key):
+        if not self.enabled or not key:
+            return None
+        row = self.connection().execute(
+            f"SELECT {self.VALUE} FROM {self.TABLE} WHERE {self.KEY} = ?", (key,)
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return row[0]
+
+    def put_many(self, pairs):
+        """Stores (key, id) pairs; returns how many were written."""
+        if not self.enabled:
+            return 0
+        now = time.time()
+        rows = [(key, value, now) for key, value in pairs if key and value]
+        conn = self.connection()
+        with conn:
+            conn.executemany(
+                f"INSERT OR REPLACE INTO {self.TABLE} ({self.KEY}, {self.VALUE}, updated_at) VALUES (?, ?, ?)", rows
+            )
+        return len(rows)
+
+    def put(self, key, value):
+        self.put_many([(key, value)])
+
+    def forget(self, key):
+        if not self.enabled:
+            return
+        conn = self.connection()
+        with conn:
+            conn.execute(f"DELETE FROM {self.TABLE} WHERE {self.KEY} = ?", (key,))
+
+    def count(self):
+        if not self.enabled:
+            return 0
+        return self.connection().execute(f"SELECT COUNT(*) FROM {self.TABLE}").fetchone()[0]
+
+    def meta(self, key, value=None):
+        conn = self.connection()
+        if value is None:
+            row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+            return row[0] if row is not None else None
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+        return value
+
+
+class ShopwareProductIndex(ProductIndex):
+    """
+    artikelnummer -> Shopware product id, so uploads open a product directly instead of
+    going through the admin search. Filled in bulk from the Admin API or a product export,
+    refreshed incrementally by updatedAt/createdAt, and corrected whenever a lookup had to
+    fall back to search.
+    """
+
+    def refresh(self, client, full=False):
+        """
+        Pages through the Admin API product search and stores every id. After the first
+        full pass only products created or updated since the previous refresh are fetched.
+        Pages are sorted by id, so rows updated while paging do not shift between pages, and
+        the next cutoff is the newest timestamp the server returned, not the local clock.
+        """
+        if not self.enabled:
+            return 0
+        since = None if full else self.meta("refreshed_at")
+        filters = []
+        if since:
+            filters = [{
+                "type": "multi", "operator": "or", "queries": [
+                    {"type": "range", "field": "updatedAt", "parameters": {"gte": since}},
+                    {"type": "range", "field": "createdAt", "parameters": {"gte": since}},
+                ],
+            }]
+        page_size = int(self.cfg["page_size"])
+        stored = 0
+        page = 1
+        latest = since
+        start = time.perf_counter()
+        while True:
+            rows = client.search(
+                "product", filters, limit=page_size, page=page,
+                includes={"product": ["id", "productNumber", "createdAt", "updatedAt"]},
+                sort=[{"field": "id", "order": "ASC"}],
+            )
+            stored += self.put_many((row.get("productNumber"), row.get("id")) for row in rows)
+            for row in rows:
+                changed = max(filter(None, (row.get("createdAt"), row.get("updatedAt"))), default=None)
+                if changed and (latest is None or changed > latest):
+                    latest = changed
+            if len(rows) < page_size:
+                break
+            page += 1
+        if latest:
+            # gte on the next refresh re-reads the products of this last second, which is harmless.
+            self.meta("refreshed_at", latest)
+        logging.info(
+            "Shopware product index: %d ids %s in %.1f s (%d in total).",
+            stored, f"changed since {since}" if since else "loaded", time.perf_counter() - start, self.count(),
+        )
+        return stored
+
+    def import_export(self, filename, number_column="productNumber", id_column="id"):
+        """Loads ids from a Shopware product export (CSV with ; or , as separator)."""
+        with open(filename, "r", encoding="utf-8-sig", newline="") as f:
+            sample = f.read(4096)
+            f.seek(0)
+            dialect = csv.Sniffer().sniff(sample, delimiters=";,")
+            stored = self.put_many(
+                (row.get(number_column), row.get(id_column)) for row in csv.DictReader(f, dialect=dialect)
+            )
+        logging.info("Shopware product index: %d ids imported from %s.", stored, filename)
+        return stored
+
+
+class TricomaProductIndex(ProductIndex):
+    """
+    Tricoma product name -> product page URL, remembered from every successful search so
+    repeat runs load the product frame directly.
+    """
+
+    TABLE = "tricoma_products"
+    KEY = "name"
+    VALUE = "url"
+    DEFAULTS = TRICOMA_DEFAULTS
+
+
+if __name__ == "__main__":
+    from shopware_api import DEFAULTS as API_DEFAULTS, ShopwareApiClient
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Build or refresh the artikelnummer -> Shopware product id index.")
+    parser.add_argument("--config", default="config.json")
+    parser.add_argument("--import-export", metavar="CSV", help="Shopware product export with id and productNumber columns.")
+    parser.add_argument("--full", action="store_true", help="Reload every id from the Admin API, not only changes.")
+    args = parser.parse_args()
+
+    with open(args.config, "r", encoding="utf-8") as f:
+        config = json.load(f)
+    index = ShopwareProductIndex(config.get("PRODUCT_INDEX", {}))
+    if args.import_export:
+        index.import_export(args.import_export)
+    else:
+        index.refresh(ShopwareApiClient({**API_DEFAULTS, **config.get("SHOPWARE_API", {})}), full=args.full)
@@ -0,0 +1,187 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULTS = {
+    "enabled":          True,
+    "path":             "product_store.sqlite3",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    id            INTEGER PRIMARY KEY AUTOINCREMENT,
+    artikelnummer TEXT NOT NULL,
+    name          TEXT,
+    stage         TEXT NOT NULL,
+    data          TEXT NOT NULL,
+    created_at    REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS records_artikelnummer ON records (artikelnummer, stage, id);
+CREATE TABLE IF NOT EXISTS fingerprints (
+    artikelnummer TEXT PRIMARY KEY,
+    fingerprint   TEXT NOT NULL,
+    fields        TEXT NOT NULL,
+    uploaded_at   REAL NOT NULL
+);
+"""
+
+# scraped: as downloaded from Tricoma; translated: with titles and descriptions from DeepL.
+STAGES = ("scraped", "translated")
+
+# Scraped Tricoma fields whose values decide whether a product has to be uploaded again;
+# "pricing" is the computed column, so a changed tax rate or rounding step counts as a change too.
+FINGERPRINT_FIELDS = (
+    "handler_preis", "endkunde_preis", "verpackungseinheit", "titel_GBR", "titel_FRA", "beschreibung", "pricing",
+)
+
+
+def field_hashes(product_data):
+    hashes = {}
+    for field in FINGERPRINT_FIELDS:
+        value = product_data.get(field)
+        if isinstance(value, dict):
+            text = json.dumps(value, sort_keys=True)
+        else:
+            text = "" if value is None else str(value).strip()
+        hashes[field] = hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+    return hashes
+
+
+def fingerprint(hashes):
+    return hashlib.sha256("|".join(hashes[field] for field in FINGERPRINT_FIELDS).encode("ascii")).hexdigest()
+
+
+class ProductStore:
+    """
+    Append-only history of product records keyed by artikelnummer, in SQLite (WAL, one
+    connection per thread). Every scrape and translation adds a row, so any earlier
+    version stays available; re-uploads iterate the newest record per product.
+    """
+
+    def __init__(self, cfg=None):
+        self.cfg = {**DEFAULTS, **(cfg or {})}
+        self.enabled = self.cfg["enabled"]
+        self.path = self.cfg["path"]
+        self.local = threading.local()
+        if not self.enabled:
+            return
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        with self.connection() as conn:
+            conn.executescript(SCHEMA)
+
+    def connection(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.local.conn = conn
+        return conn
+
+    def append(self, stage, product_data, name=None):
+        """Adds a record; returns its id, or None when the store is disabled or the data has no artikelnummer."""
+        if not self.enabled:
+            return None
+        artikelnummer = (product_data or {}).get("artikelnummer")
+        if not artikelnummer:
+            logging.warning("Product record without artikelnummer not stored (%s).", name)
+            return None
+        try:
+            conn = self.connection()
+            with conn:
+                cursor = conn.execute(
+                    "INSERT INTO records (artikelnummer, name, stage, data, created_at) VALUES (?, ?, ?, ?, ?)",
+                    (artikelnummer, name, stage, json.dumps(product_data, ensure_ascii=False), time.time()),
+                )
+            return cursor.lastrowid
+        except Exception as e:
+            logging.error("Error storing %s record for %s: %s", stage, artikelnummer, e)
+            return None
+
+    def latest(self, artikelnummer, stage=None):
+        """Newest record of the product (of the given stage), or None."""
+        if not self.enabled:
+            return None
+        query = "SELECT data FROM records WHERE artikelnummer = ?"
+        params = [artikelnummer]
+        if stage is not None:
+            query += " AND stage = ?"
+            params.append(stage)
+        row = self.connection().execute(query + " ORDER BY id DESC LIMIT 1", params).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def history(self, artikelnummer):
+        """All records of the product, oldest first, as dicts with id, stage, name, created_at and data."""
+        if not self.enabled:
+            return []
+        rows = self.connection().execute(
+            "SELECT id, stage, name, created_at, data FROM records WHERE artikelnummer = ? ORDER BY id",
+            (artikelnummer,),
+        ).fetchall()
+        return [
+            {"id": row[0], "stage": row[1], "name": row[2], "created_at": row[3], "data": json.loads(row[4])}
+            for row in rows
+        ]
+
+    def iter_latest(self, stage="translated", artikelnummern=None):
+        """Yields the newest record of each product (of the given stage), ordered by artikelnummer."""
+        if not self.enabled:
+            return
+        query = (
+            "SELECT r.data FROM records r JOIN ("
+            "  SELECT MAX(id) AS id FROM records WHERE stage = ? GROUP BY artikelnummer"
+            ") newest ON newest.id = r.id"
+        )
+        params = [stage]
+        if artikelnummern:
+            wanted = list(artikelnummern)
+            query += f" WHERE r.artikelnummer IN ({', '.join('?' * len(wanted))})"
+            params += wanted
+        for (data,) in self.connection().execute(query + " ORDER BY r.artikelnummer", params):
+            yield json.loads(data)
+
+    def record_upload(self, product_data):
+        """Stores the fingerprint of product_data's scraped fields after a successful upload."""
+        artikelnummer = (product_data or {}).get("artikelnummer")
+        if not self.enabled or not artikelnummer:
+            return
+        hashes = field_hashes(product_data)
+        try:
+            conn = self.connection()
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO fingerprints (artikelnummer, fingerprint, fields, uploaded_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    (artikelnummer, fingerprint(hashes), json.dumps(hashes), time.time()),
+                )
+        except Exception as e:
+            logging.error("Error storing fingerprint of %s: %s", artikelnummer, e)
+
+    def changed_fields(self, product_data):
+        """
+        Fields that differ from the last uploaded version, in FINGERPRINT_FIELDS order;
+        [] when nothing changed, None when the product was never uploaded.
+        """
+        artikelnummer = (product_data or {}).get("artikelnummer")
+        if not self.enabled or not artikelnummer:
+            return None
+        row = self.connection().execute(
+            "SELECT fingerprint, fields FROM fingerprints WHERE artikelnummer = ?", (artikelnummer,)
+        ).fetchone()
+        if row is None:
+            return None
+        hashes = field_hashes(product_data)
+        if fingerprint(hashes) == row[0]:
+            return []
+        previous = json.loads(row[1])
+        return [field for field in FINGERPRINT_FIELDS if previous.get(field) != hashes[field]]
+
+    def count(self):
+        if not self.enabled:
+            return 0
+        return self.connection().execute("SELECT COUNT(DISTINCT artikelnummer) FROM records").fetchone()[0]
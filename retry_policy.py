@@ -0,0 +1,181 @@
+import logging
+import random
+import threading
+import time
+import deepl
+import requests
+from selenium.common.exceptions import (
+    InvalidSessionIdException, NoSuchWindowException, StaleElementReferenceException,
+    TimeoutException as SeleniumTimeoutException,
+)
+from shop_uploader import UploadStepError
+from shopware_api import ShopwareApiError
+
+DEFAULTS = {
+    "default": {
+        "attempts":         2,
+        "backoff_s":        2.0,
+        "max_backoff_s":    60.0,
+        "jitter":           0.5,        # each delay is scaled by a random factor in [1 - jitter, 1 + jitter]
+        "retry_on":         ["stale_element", "element_timeout", "timeout", "network", "server_error"],
+    },
+    # Step name -> overrides of the default policy.
+    "steps": {
+        "download":         {"attempts": 3},
+        # Translator.call_deepl already retries 429/5xx/connection errors with its shared backoff;
+        # the policy only feeds the DeepL breaker, so the two layers do not multiply.
+        "translate":        {"retry_on": []},
+        "upload":           {"attempts": 3, "retry_on": [
+            "stale_element", "element_timeout", "timeout", "network", "server_error", "step_failed",
+        ]},
+    },
+    # Target system -> consecutive failures that open its circuit, and how long it stays open.
+    "breakers": {
+        "tricoma":          {"failures": 5, "cooldown_s": 120},
+        "shopware":         {"failures": 5, "cooldown_s": 120},
+        "deepl":            {"failures": 3, "cooldown_s": 300},
+    },
+    # Error kinds that say the system is in trouble rather than the product; only these count for a breaker.
+    # element_timeout (a Selenium wait for a missing element) says more about the page than the system.
+    "system_errors":        ["timeout", "network", "server_error", "rate_limited", "quota"],
+}
+
+
+def classify(error):
+    """
+    Error kind used by the policies: stale_element, session_lost, element_timeout, timeout,
+    network, server_error, rate_limited, quota, step_failed or other.
+    """
+    if isinstance(error, StaleElementReferenceException):
+        return "stale_element"
+    if isinstance(error, (InvalidSessionIdException, NoSuchWindowException)):
+        return "session_lost"
+    if isinstance(error, deepl.QuotaExceededException):
+        return "quota"
+    if isinstance(error, deepl.TooManyRequestsException):
+        return "rate_limited"
+    if isinstance(error, deepl.ConnectionException):
+        return "network"
+    if isinstance(error, SeleniumTimeoutException):
+        return "element_timeout"
+    if isinstance(error, (TimeoutError, requests.Timeout)):
+        return "timeout"
+    if isinstance(error, (requests.ConnectionError, ConnectionError)):
+        return "network"
+    if isinstance(error, UploadStepError):
+        return "step_failed"
+    status = None
+    if isinstance(error, ShopwareApiError):
+        status = error.status
+    elif isinstance(error, requests.HTTPError) and error.response is not None:
+        status = error.response.status_code
+    elif isinstance(error, deepl.DeepLException):
+        status = error.http_status_code
+    if status == 429:
+        return "rate_limited"
+    if status is not None and status >= 500:
+        return "server_error"
+    return "other"
+
+
+class CircuitBreaker:
+    """
+    Counts consecutive system errors of one target system. After `failures` of them the
+    circuit opens: every caller waits for the cooldown instead of failing product after
+    product. Calls then resume; the first further system error opens it again, a success closes it.
+    """
+
+    def __init__(self, name, failures=5, cooldown_s=120):
+        self.name = name
+        self.threshold = int(failures)
+        self.cooldown_s = float(cooldown_s)
+        self.lock = threading.Lock()
+        self.failures = 0
+        self.open_until = 0.0
+        self.trips = 0
+
+    def wait(self):
+        """Blocks while the circuit is open; returns the seconds waited."""
+        with self.lock:
+            delay = self.open_until - time.monotonic()
+        if delay <= 0:
+            return 0.0
+        logging.warning("Circuit '%s' open — pausing %.1f s before the next call.", self.name, delay)
+        time.sleep(delay)
+        return delay
+
+    def success(self):
+        with self.lock:
+            if self.failures >= self.threshold:
+                logging.info("Circuit '%s' closed — %s responds again.", self.name, self.name)
+            self.failures = 0
+
+    def failure(self, error):
+        with self.lock:
+            self.failures += 1
+            if self.failures < self.threshold:
+                return
+            # Open (again, when the probe after a cooldown failed too).
+            self.open_until = time.monotonic() + self.cooldown_s
+            self.trips += 1
+        logging.error(
+            "Circuit '%s' opened after %d consecutive failures (last: %s) — calls pause for %.1f s.",
+            self.name, self.failures, error, self.cooldown_s,
+        )
+
+
+class RetryPolicies:
+    """
+    Per-step retry with exponential backoff and jitter, plus one circuit breaker per target
+    system, configured by RETRY_POLICIES in config.json. Share one instance between workers
+    so that they all pause when a system is down.
+    """
+
+    def __init__(self, cfg=None):
+        cfg = cfg or {}
+        self.cfg = {**DEFAULTS, **cfg}
+        self.default = {**DEFAULTS["default"], **cfg.get("default", {})}
+        self.steps = {
+            step: {**DEFAULTS["steps"].get(step, {}), **settings}
+            for step, settings in {**DEFAULTS["steps"], **cfg.get("steps", {})}.items()
+        }
+        breakers = {
+            name: {**DEFAULTS["breakers"].get(name, {}), **settings}
+            for name, settings in {**DEFAULTS["breakers"], **cfg.get("breakers", {})}.items()
+        }
+        self.breakers = {name: CircuitBreaker(name, **settings) for name, settings in breakers.items()}
+        self.system_errors = set(self.cfg["system_errors"])
+
+    def policy(self, step):
+        return {**self.default, **self.steps.get(step, {})}
+
+    def delay(self, policy, attempt):
+        delay = min(policy["backoff_s"] * 2 ** attempt, policy["max_backoff_s"])
+        return delay * random.uniform(1 - policy["jitter"], 1 + policy["jitter"])
+
+    def call(self, step, system, fn, *args, **kwargs):
+        """Runs fn(*args, **kwargs) under the policy of step against system; re-raises the last error."""
+        policy = self.policy(step)
+        breaker = self.breakers.get(system)
+        attempts = max(int(policy["attempts"]), 1)
+        for attempt in range(attempts):
+            if breaker is not None:
+                breaker.wait()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                kind = classify(e)
+                if breaker is not None and kind in self.system_errors:
+                    breaker.failure(e)
+                if attempt + 1 >= attempts or kind not in policy["retry_on"]:
+                    raise
+                delay = self.delay(policy, attempt)
+                logging.warning(
+                    "%s failed (%s: %s), attempt %d of %d — retrying in %.1f s.",
+                    step, kind, e, attempt + 1, attempts, delay,
+                )
+                time.sleep(delay)
+                continue
+            if breaker is not None:
+                breaker.success()
+            return result
@@ -1,14 +1,100 @@
 import logging
-import time
+import re
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.action_chains import ActionChains
+from selenium.common.exceptions import TimeoutException
+from page_waits import PageWaits
+from metrics import timed
+from pricing import PricingEngine
+
+
+# One round trip that reads what the open product tab currently shows, so run_sequence
+# only touches fields whose value differs from product_data.
+STATE_SNAPSHOT_JS = """
+var value = function (node) {
+    if (!node) return null;
+    var input = node.matches('input') ? node : node.querySelector('input');
+    return input ? input.value.trim() : node.textContent.trim();
+};
+var state = {rules: [], scaled: {}, channels: [], manufacturer: null, gross: null, name: null, description: null};
+document.querySelectorAll('div.context-price').forEach(function (card) {
+    var nets = Array.prototype.map.call(
+        card.querySelectorAll("input[name='sw-price-field-net'][aria-label='Euro']"),
+        function (input) { return input.value.trim(); }).filter(function (v) { return v !== ''; });
+    state.rules.push({rule: value(card.querySelector("input[placeholder='Select a conditional rule...']")), nets: nets});
+});
+document.querySelectorAll('tr.sw-data-grid__row').forEach(function (row) {
+    var label = row.querySelector('span');
+    if (!label) return;
+    state.scaled[label.textContent.trim()] = {
+        minimumPurchase: value(row.querySelector('td.sw-data-grid__cell--minimumPurchase')),
+        scaling: value(row.querySelector('td.sw-data-grid__cell--scaling'))
+    };
+});
+document.querySelectorAll('div.sw-product-category-form__visibility_field li.sw-select-selection-list__item-holder')
+    .forEach(function (item) {
+        var label = item.querySelector('.sw-label__caption') || item.querySelector('.sw-label') || item;
+        var dismiss = label.querySelector('.sw-label__dismiss');
+        var text = label.textContent;
+        if (dismiss) text = text.replace(dismiss.textContent, '');
+        state.channels.push(text.trim());
+    });
+state.manufacturer = value(document.querySelector('#manufacturerId div.sw-entity-single-select__selection-text'));
+state.gross = value(document.getElementById('sw-price-field-gross'));
+state.name = value(document.getElementById('sw-field--product-name'));
+var editor = document.querySelector('div.sw-code-editor__editor.ace_editor');
+if (editor && window.ace) {
+    try { state.description = ace.edit(editor).getValue(); } catch (e) {}
+}
+return state;
+"""
+
+
+PRODUCT_NUMBER_JS = """
+var field = document.getElementById('sw-field--product-productNumber');
+return field ? field.value.trim() : null;
+"""
+
+PRODUCT_ROUTE = re.compile(r"/sw/product/detail/([^/?#]+)")
+
+
+class UploadStepError(Exception):
+    pass
+
+
+def same_amount(a, b):
+    try:
+        return abs(float(str(a).replace(",", ".")) - float(str(b).replace(",", "."))) < 0.005
+    except (TypeError, ValueError):
+        return False
+
+
+def xpath_literal(text):
+    if "'" not in text:
+        return f"'{text}'"
+    if '"' not in text:
+        return f'"{text}"'
+    return "concat('" + text.replace("'", "', \"'\", '") + "')"
+
 
 class ShopUploader:
-    def __init__(self, driver):
+    def __init__(self, driver, index=None, pricing=None, channels=None, channel_count=4):
         self.driver = driver
+        self.waits = PageWaits(driver)
+        self.index = index
+        # The facade passes its configured engine; prices are normally precomputed by it.
+        self.pricing = pricing or PricingEngine()
+        # Sales channel names to select; without them the first channel_count of the list,
+        # whose names are remembered once selected.
+        self.channels = list(channels or [])
+        self.channel_count = channel_count
+
+    def gross_price(self, product_data):
+        return self.pricing.pricing_of(product_data)["gross"]
 
+    @timed()
     def switch_to_shop(self):
         tabs = self.driver.window_handles
         if len(tabs) >= 2:
@@ -17,6 +103,7 @@ class ShopUploader:
         else:
             logging.error("No second tab open (Shop).")
 
+    @timed()
     def go_to_tab(self, tab="general"):
         try:
             if tab.lower() == "general":
@@ -52,6 +139,7 @@ class ShopUploader:
         except Exception as e:
             print(f"Error saving page source: {e}")
 
+    @timed()
     def update_manufacturer_selection(self):
         try:
             logging.info("Updating manufacturer selection.")
@@ -93,6 +181,7 @@ class ShopUploader:
             logging.error("Error updating manufacturer: %s", e)
             return False
 
+    @timed()
     def remove_rules_added(self):
         try:
             buttons = WebDriverWait(self.driver, 3).until(
@@ -110,15 +199,19 @@ class ShopUploader:
                     self.driver.execute_script("arguments[0].scrollIntoView(true);", button_to_remove)
                     self.driver.execute_script("arguments[0].click();", button_to_remove)
                     logging.info("Clicked delete pricing rule button (%s/%s).", i + 1, count)
-                    time.sleep(0.5)
+                    self.waits.detached("pricing rule deleted", button_to_remove, timeout_s=3)
                 else:
                     break
             return True
 
+        except TimeoutException:
+            logging.info("No pricing rules found.")
+            return True
         except Exception as e:
-            logging.info("No pricing rules found: %s", e)
+            logging.error("Error removing pricing rules: %s", e)
             return False
 
+    @timed()
     def select_conditional_rule(self, rule_text="Händler"):
         try:
             logging.info("Clicking conditional rule selector.")
@@ -141,6 +234,7 @@ class ShopUploader:
             logging.error("Error selecting conditional rule: %s", e)
             return False
 
+    @timed()
     def click_add_pricing_rule(self):
         try:
             logging.info("Clicking 'Add pricing rule' button.")
@@ -157,6 +251,7 @@ class ShopUploader:
             logging.error("Error clicking 'Add pricing rule': %s", e)
             return False
 
+    @timed()
     def update_handler_preis(self, product_data):
         try:
             handler_preis = product_data.get("handler_preis")
@@ -184,6 +279,7 @@ class ShopUploader:
             logging.error("Error updating 'handler_preis': %s", e)
             return False
 
+    @timed()
     def select_pricing_rule_in_new_card(self, rule_text="Händler Ausland"):
         try:
             logging.info("Selecting rule in new pricing card.")
@@ -207,13 +303,11 @@ class ShopUploader:
             logging.error("Error selecting rule in new card: %s", e)
             return False
 
+    @timed()
     def update_price_fields(self, product_data):
         try:
-            endkunde_price = float(product_data.get("endkunde_preis", 0))
-            gross_price = round(endkunde_price * 1.19, 2)
-            adjusted_price = round(gross_price / 0.05) * 0.05
-            adjusted_price = round(adjusted_price, 2)
-            logging.info("Calculated gross price: %s, rounded to nearest 0.05: %s", gross_price, adjusted_price)
+            adjusted_price = self.gross_price(product_data)
+            logging.info("Calculated gross price rounded to nearest 0.05: %s", adjusted_price)
 
             gross_field = WebDriverWait(self.driver, 20).until(
                 EC.visibility_of_element_located((By.ID, "sw-price-field-gross"))
@@ -226,6 +320,7 @@ class ShopUploader:
             logging.error("Error updating gross price field: %s", e)
             return False
 
+    @timed()
     def update_scaled_values(self, product_data):
         try:
             value_to_set = str(product_data.get("verpackungseinheit", "1"))
@@ -263,6 +358,7 @@ class ShopUploader:
             logging.error("Error updating scaled values: %s", e)
             return False
 
+    @timed()
     def update_sales_channels_selection(self):
         try:
             logging.info("Updating Sales Channels selection.")
@@ -279,12 +375,13 @@ class ShopUploader:
                 for item in selected_items:
                     try:
                         actions.move_to_element(item).perform()
-                        time.sleep(0.2)
-                        remove_button = item.find_element(By.CSS_SELECTOR, "button.sw-label__dismiss")
+                        remove_button = WebDriverWait(item, 2).until(
+                            EC.visibility_of_element_located((By.CSS_SELECTOR, "button.sw-label__dismiss"))
+                        )
                         self.driver.execute_script("arguments[0].scrollIntoView(true);", remove_button)
                         remove_button.click()
                         logging.info("Removed selected channel.")
-                        time.sleep(0.2)
+                        self.waits.detached("channel removed", item, timeout_s=2)
                     except Exception as e:
                         logging.error("Error removing channel: %s", e)
             logging.info("Cleared all selected channels.")
@@ -299,25 +396,35 @@ class ShopUploader:
                 EC.visibility_of_element_located((By.CSS_SELECTOR, "div.sw-select-result-list__content"))
             )
             options_list = result_list.find_element(By.CSS_SELECTOR, "ul.sw-select-result-list__item-list")
-            option_selectors = [
-                "li.sw-select-result.sw-select-option--0",
-                "li.sw-select-result.sw-select-option--1",
-                "li.sw-select-result.sw-select-option--2",
-                "li.sw-select-result.sw-select-option--3"
-            ]
-            for sel in option_selectors:
-                option = WebDriverWait(options_list, 10).until(
-                    EC.element_to_be_clickable((By.CSS_SELECTOR, sel))
-                )
+            selected_css = "ul.sw-select-selection-list li.sw-select-selection-list__item-holder"
+            names = []
+            for position in range(len(self.channels) or self.channel_count):
+                if self.channels:
+                    name = self.channels[position]
+                    option = WebDriverWait(options_list, 10).until(
+                        EC.element_to_be_clickable((
+                            By.XPATH, ".//li[contains(@class, 'sw-select-result')][normalize-space()=%s]" % xpath_literal(name)
+                        ))
+                    )
+                else:
+                    option = WebDriverWait(options_list, 10).until(
+                        EC.element_to_be_clickable((By.CSS_SELECTOR, f"li.sw-select-result.sw-select-option--{position}"))
+                    )
+                    name = option.text.strip()
+                selected = self.waits.count(selected_css, container)
                 self.driver.execute_script("arguments[0].scrollIntoView(true);", option)
                 self.driver.execute_script("arguments[0].click();", option)
-                logging.info("Clicked option %s", sel)
-                time.sleep(0.2)
+                logging.info("Clicked sales channel %s", name)
+                self.waits.count_changed("channel selected", selected_css, selected, container, timeout_s=2)
+                names.append(name)
+            if not self.channels:
+                self.channels = names
             return True
         except Exception as e:
             logging.error("Error updating Sales Channels: %s", e)
             return False
 
+    @timed()
     def save_and_change_language(self, lang):
         try:
             logging.info("Opening language switch menu.")
@@ -362,6 +469,7 @@ class ShopUploader:
             logging.error("Error in save_and_change_language: %s", e)
             return False
 
+    @timed()
     def update_translated_text(self, product_data, lang):
         try:
             name_field = WebDriverWait(self.driver, 20).until(
@@ -399,6 +507,7 @@ class ShopUploader:
             logging.error("Error updating translated text: %s", e)
             return False
 
+    @timed()
     def search_product(self, product_data):
         try:
             search_input = WebDriverWait(self.driver, 20).until(
@@ -409,9 +518,10 @@ class ShopUploader:
             if not artikelnummer:
                 logging.error("No article number in product_data.")
                 return False
+            requests_before = self.waits.track_network()
             search_input.send_keys(artikelnummer)
             logging.info("Entered article number: %s", artikelnummer)
-            time.sleep(1)
+            self.waits.network_idle("search results", since=requests_before)
             result_link = WebDriverWait(self.driver, 20).until(
                 EC.element_to_be_clickable((
                     By.XPATH, f"//a[contains(@class, 'sw-search-bar-item__link') and .//span[contains(text(), '{artikelnummer}')]]"
@@ -425,25 +535,157 @@ class ShopUploader:
             logging.error("Error searching for product: %s", e)
             return False
 
+    @timed()
+    def open_product_by_id(self, product_data):
+        """Opens the product's detail route straight from the id index; False on a miss or a stale id."""
+        artikelnummer = product_data.get("artikelnummer", "")
+        product_id = self.index.get(artikelnummer) if self.index is not None else None
+        if product_id is None:
+            return False
+        try:
+            self.driver.execute_script(
+                "window.location.hash = arguments[0];", f"#/sw/product/detail/{product_id}/base"
+            )
+            WebDriverWait(self.driver, 10).until(
+                lambda d: d.execute_script(PRODUCT_NUMBER_JS) == artikelnummer
+            )
+            logging.info("Opened product %s directly (id %s).", artikelnummer, product_id)
+            return True
+        except Exception as e:
+            logging.info("Indexed id of %s did not open the product (%s) — using search.", artikelnummer, e)
+            self.index.forget(artikelnummer)
+            return False
+
+    def remember_product_id(self, product_data, previous_url):
+        """Indexes the id of the detail page the search opened, once it shows the searched product."""
+        if self.index is None:
+            return
+        artikelnummer = product_data.get("artikelnummer", "")
+
+        def opened(d):
+            url = d.current_url
+            if url == previous_url or not PRODUCT_ROUTE.search(url):
+                return False
+            return d.execute_script(PRODUCT_NUMBER_JS) == artikelnummer and url
+
+        try:
+            url = WebDriverWait(self.driver, 10).until(opened)
+            self.index.put(artikelnummer, PRODUCT_ROUTE.search(url).group(1))
+        except Exception as e:
+            logging.warning("Could not read the product id of %s from the admin URL: %s", artikelnummer, e)
+
+    @timed()
     def go_to_shop(self, product_data):
         self.switch_to_shop()
-        self.search_product(product_data)
+        if self.open_product_by_id(product_data):
+            return True
+        previous_url = self.driver.current_url
+        found = self.search_product(product_data)
+        if found:
+            self.remember_product_id(product_data, previous_url)
+        return found
 
-    def run_sequence(self, product_data):
+    def read_state(self):
+        try:
+            return self.driver.execute_script(STATE_SNAPSHOT_JS) or {}
+        except Exception as e:
+            logging.warning("Could not read the current product state: %s", e)
+            return {}
+
+    def pricing_matches(self, product_data, state, rules=("Händler", "Händler Ausland")):
+        current = state.get("rules")
+        if not current or sorted(rule["rule"] for rule in current) != sorted(rules):
+            return False
+        handler_preis = product_data.get("handler_preis")
+        return all(rule["nets"] and all(same_amount(net, handler_preis) for net in rule["nets"]) for rule in current)
+
+    def scaled_values_match(self, product_data, state, groups=("Händler", "Händler Ausland")):
+        value = str(product_data.get("verpackungseinheit", "1"))
+        scaled = state.get("scaled") or {}
+        return all(
+            group in scaled and all(same_amount(scaled[group][field], value) for field in ("minimumPurchase", "scaling"))
+            for group in groups
+        )
+
+    def channels_match(self, state):
+        # Unknown until configured or selected once in this session: select them to learn the names.
+        if not self.channels:
+            return False
+        return sorted(state.get("channels") or []) == sorted(self.channels)
+
+    def text_matches(self, product_data, lang, state):
+        name_key, description_key = ("titel_GBR", "beschreibung_en") if lang == "EN" else ("titel_FRA", "beschreibung_fr")
+        return (
+            state.get("name") is not None and state.get("description") is not None
+            and state["name"] == (product_data.get(name_key) or "").strip()
+            and state["description"] == (product_data.get(description_key) or "")
+        )
+
+    def update_base(self, product_data):
+        """Advanced pricing and general data; each part is only rewritten when the shop's value differs."""
+        self.require(self.go_to_tab("advanced pricing"), "opening advanced pricing")
+        if self.pricing_matches(product_data, self.read_state()):
+            logging.info("Pricing rules already match — left unchanged.")
+        else:
+            self.require(self.remove_rules_added(), "removing pricing rules")
+            self.require(self.select_conditional_rule(), "selecting the conditional rule")
+            self.require(self.click_add_pricing_rule(), "adding a pricing rule")
+            self.require(self.select_pricing_rule_in_new_card(), "selecting the pricing rule")
+            self.require(self.update_handler_preis(product_data), "setting the dealer price")
+        self.require(self.go_to_tab("general"), "opening general tab")
+        state = self.read_state()
+        self.require(self.update_manufacturer_selection(), "selecting the manufacturer")
+        if same_amount(state.get("gross"), self.gross_price(product_data)):
+            logging.info("Gross price already set — left unchanged.")
+        else:
+            self.require(self.update_price_fields(product_data), "setting the gross price")
+        if self.scaled_values_match(product_data, state):
+            logging.info("Minimum purchase and scaling already set — left unchanged.")
+        else:
+            self.require(self.update_scaled_values(product_data), "setting minimum purchase and scaling")
+        if self.channels_match(state):
+            logging.info("Sales channels already complete — left unchanged.")
+        else:
+            self.require(self.update_sales_channels_selection(), "selecting sales channels")
+
+    def require(self, ok, what):
+        if ok is False:
+            raise UploadStepError(f"{what} failed")
+
+    @timed()
+    def run_sequence(self, product_data, completed=(), on_step=None):
+        """
+        Shopware keeps edits only when the language switch saves them, so every sub-step
+        ends with the switch that persists it. Sub-steps listed in completed are skipped;
+        on_step(step) is called after each one is saved. Raises UploadStepError when a save fails.
+        """
         self.switch_to_shop()
-        self.go_to_tab("advanced pricing")
-        self.remove_rules_added()
-        self.select_conditional_rule()
-        self.click_add_pricing_rule()
-        self.select_pricing_rule_in_new_card()
-        self.update_handler_preis(product_data)
-        self.go_to_tab("general")
-        self.update_manufacturer_selection()
-        self.update_price_fields(product_data)
-        self.update_scaled_values(product_data)
-        self.update_sales_channels_selection()
-        self.save_and_change_language("EN")
-        self.update_translated_text(product_data, "EN")
-        self.save_and_change_language("FR")
-        self.update_translated_text(product_data, "FR")
-        self.save_and_change_language("DE")
+        language = "DE"
+
+        def switch(lang, what):
+            nonlocal language
+            self.require(self.save_and_change_language(lang), what)
+            language = lang
+
+        if "upload.base" not in completed:
+            self.update_base(product_data)
+            switch("EN", "saving prices and general data")
+            self.step_done("upload.base", on_step)
+        for step, lang, next_lang in (("upload.text_en", "EN", "FR"), ("upload.text_fr", "FR", "DE")):
+            if step in completed:
+                continue
+            if language != lang:
+                switch(lang, f"switching to {lang}")
+            if self.text_matches(product_data, lang, self.read_state()):
+                logging.info("%s name and description already match — left unchanged.", lang)
+            else:
+                self.require(self.update_translated_text(product_data, lang), f"{lang} text")
+            switch(next_lang, f"saving {lang} text")
+            self.step_done(step, on_step)
+        if language != "DE":
+            switch("DE", "switching back to DE")
+
+    def step_done(self, step, on_step):
+        logging.info("Upload step %s saved.", step)
+        if on_step is not None:
+            on_step(step)
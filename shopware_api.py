@@ -0,0 +1,534 @@
+import logging
+import time
+import requests
+from metrics import timed
+from pricing import PricingEngine
+
+DEFAULTS = {
+    "url":                  "http://localhost:8000",
+    "client_id":            "",
+    "client_secret":        "",
+    "username":             "",
+    "password":             "",
+    "timeout_s":            30,
+    "manufacturer":         "Scherer Voigt GbR",
+    "rules":                ["Händler", "Händler Ausland"],
+    "sales_channels":       [],
+    "sales_channel_count":  4,
+    "currency":             "EUR",
+    "min_purchase_field":   "minimumPurchase",
+    "scaling_field":        "scaling",
+    "languages":            {"EN": "en-GB", "FR": "fr-FR"},
+    "bulk_batch_size":      100,
+    "bulk_flush_interval_s": 60,
+}
+
+# What build_operations compares against: without translations every product looks changed.
+PRODUCT_ASSOCIATIONS = {"prices": {}, "visibilities": {}, "translations": {}}
+
+
+class ShopwareApiError(Exception):
+    def __init__(self, status, message, errors=None):
+        super().__init__(f"HTTP {status}: {message}")
+        self.status = status
+        self.errors = errors or []
+
+
+def _amount(value):
+    try:
+        return round(float(value), 2)
+    except (TypeError, ValueError):
+        return None
+
+
+def _price_key(price):
+    amounts = price.get("price") or [{}]
+    custom = price.get("customFields") or {}
+    return (
+        price.get("ruleId"), price.get("quantityStart"),
+        _amount(amounts[0].get("net")), _amount(amounts[0].get("gross")),
+        tuple(sorted((k, str(v)) for k, v in custom.items())),
+    )
+
+
+class ShopwareApiClient:
+    """
+    Minimal Shopware 6 Admin API client (OAuth token, search, write, delete).
+    """
+
+    def __init__(self, cfg):
+        self.base_url = cfg["url"].rstrip("/")
+        self.cfg = cfg
+        self.session = requests.Session()
+        self.session.headers.update({
+            "Accept": "application/json",
+            "Content-Type": "application/json",
+        })
+        self.token = None
+        self.token_expires = 0.0
+        self.request_count = 0
+
+    def authenticate(self):
+        if self.cfg.get("client_id") and self.cfg.get("client_secret"):
+            body = {
+                "grant_type": "client_credentials",
+                "client_id": self.cfg["client_id"],
+                "client_secret": self.cfg["client_secret"],
+            }
+        else:
+            body = {
+                "grant_type": "password",
+                "client_id": "administration",
+                "scopes": "write",
+                "username": self.cfg.get("username", ""),
+                "password": self.cfg.get("password", ""),
+            }
+        response = self.session.post(
+            f"{self.base_url}/api/oauth/token", json=body, timeout=self.cfg["timeout_s"]
+        )
+        self.request_count += 1
+        if response.status_code >= 400:
+            raise ShopwareApiError(response.status_code, "Authentication failed")
+        data = response.json()
+        self.token = data["access_token"]
+        # Refresh a little before the token actually expires.
+        self.token_expires = time.time() + int(data.get("expires_in", 600)) - 30
+        self.session.headers["Authorization"] = f"Bearer {self.token}"
+        logging.info("Shopware API token obtained.")
+
+    def request(self, method, path, json=None, headers=None):
+        if self.token is None or time.time() >= self.token_expires:
+            self.authenticate()
+        url = f"{self.base_url}/api/{path.lstrip('/')}"
+        response = self.session.request(
+            method, url, json=json, headers=headers, timeout=self.cfg["timeout_s"]
+        )
+        self.request_count += 1
+        if response.status_code == 401:
+            self.authenticate()
+            response = self.session.request(
+                method, url, json=json, headers=headers, timeout=self.cfg["timeout_s"]
+            )
+            self.request_count += 1
+        if response.status_code >= 400:
+            try:
+                errors = response.json().get("errors", [])
+            except ValueError:
+                errors = []
+            message = errors[0].get("detail", response.reason) if errors else response.reason
+            raise ShopwareApiError(response.status_code, message, errors)
+        if response.status_code == 204 or not response.content:
+            return None
+        return response.json()
+
+    def search(self, entity, filters=None, associations=None, limit=None, page=None, includes=None, sort=None):
+        body = {"filter": filters or []}
+        if associations:
+            body["associations"] = associations
+        if sort:
+            body["sort"] = sort
+        if limit:
+            body["limit"] = limit
+        if page:
+            body["page"] = page
+        if includes:
+            body["includes"] = includes
+        result = self.request("POST", f"search/{entity}", json=body)
+        return result.get("data", []) if result else []
+
+    def search_one(self, entity, field, value):
+        rows = self.search(entity, [{"type": "equals", "field": field, "value": value}], limit=1)
+        return rows[0] if rows else None
+
+    def update(self, entity, entity_id, payload):
+        return self.request("PATCH", f"{entity}/{entity_id}", json=payload)
+
+    def delete(self, entity, entity_id):
+        return self.request("DELETE", f"{entity}/{entity_id}")
+
+    def sync(self, operations):
+        return self.request("POST", "_action/sync", json=operations)
+
+
+class ApiShopUploader:
+    """
+    Writes the fields handled by ShopUploader through the Shopware 6 Admin API
+    instead of clicking through the administration UI.
+    Exposes the same go_to_shop / run_sequence interface as ShopUploader.
+    """
+
+    def __init__(self, config, index=None):
+        self.cfg = {**DEFAULTS, **config.get("SHOPWARE_API", {})}
+        self.client = ShopwareApiClient(self.cfg)
+        self.pricing = PricingEngine.from_config(config)
+        self.index = index
+        self.lookups = None
+        self.current_product = None
+        # Error behind the last False of go_to_shop / run_sequence, for the retry policies.
+        self.last_error = None
+
+    def load_lookups(self):
+        if self.lookups is not None:
+            return self.lookups
+        logging.info("Loading Shopware lookup ids (manufacturer, rules, currency, sales channels).")
+        manufacturer = self.client.search_one("product-manufacturer", "name", self.cfg["manufacturer"])
+        if manufacturer is None:
+            raise ShopwareApiError(404, f"Manufacturer '{self.cfg['manufacturer']}' not found")
+        currency = self.client.search_one("currency", "isoCode", self.cfg["currency"])
+        if currency is None:
+            raise ShopwareApiError(404, f"Currency '{self.cfg['currency']}' not found")
+        rule_ids = []
+        for rule_name in self.cfg["rules"]:
+            rule = self.client.search_one("rule", "name", rule_name)
+            if rule is None:
+                raise ShopwareApiError(404, f"Rule '{rule_name}' not found")
+            rule_ids.append(rule["id"])
+        if self.cfg["sales_channels"]:
+            channels = self.client.search(
+                "sales-channel",
+                [{"type": "equalsAny", "field": "name", "value": self.cfg["sales_channels"]}],
+            )
+        else:
+            channels = self.client.search("sales-channel", limit=self.cfg["sales_channel_count"])
+        try:
+            languages = self.client.search("language", associations={"locale": {}})
+            language_ids = {
+                (row.get("locale") or {}).get("code"): row["id"] for row in languages if row.get("locale")
+            }
+        except Exception as e:
+            # Without the ids the current translations cannot be compared; they are always written.
+            logging.warning("Could not load Shopware languages: %s", e)
+            language_ids = {}
+        self.lookups = {
+            "manufacturer_id": manufacturer["id"],
+            "currency_id": currency["id"],
+            "rule_ids": rule_ids,
+            "sales_channel_ids": [channel["id"] for channel in channels],
+            "language_ids": language_ids,
+        }
+        return self.lookups
+
+    def find_product(self, artikelnummer):
+        """Loads the product by its indexed id, falling back to a productNumber search that updates the index."""
+        associations = PRODUCT_ASSOCIATIONS
+        product_id = self.index.get(artikelnummer) if self.index is not None else None
+        if product_id is not None:
+            rows = self.client.search(
+                "product", [{"type": "equals", "field": "id", "value": product_id}],
+                associations=associations, limit=1,
+            )
+            if rows and rows[0].get("productNumber") == artikelnummer:
+                return rows[0]
+            logging.info("Indexed id of %s is outdated — searching by product number.", artikelnummer)
+            self.index.forget(artikelnummer)
+        rows = self.client.search(
+            "product",
+            [{"type": "equals", "field": "productNumber", "value": artikelnummer}],
+            associations=associations,
+            limit=1,
+        )
+        if rows and self.index is not None:
+            self.index.put(artikelnummer, rows[0]["id"])
+        return rows[0] if rows else None
+
+    def build_payload(self, product_data, current):
+        lookups = self.load_lookups()
+        currency_id = lookups["currency_id"]
+        pricing = self.pricing.pricing_of(product_data, self.cfg["rules"])
+        scaled_value = int(float(product_data.get("verpackungseinheit") or 1))
+
+        prices = []
+        for rule_name, rule_id in zip(self.cfg["rules"], lookups["rule_ids"]):
+            rule_price = pricing["rules"][rule_name]
+            prices.append({
+                "ruleId": rule_id,
+                "quantityStart": 1,
+                "price": [{
+                    "currencyId": currency_id,
+                    "net": float(rule_price["net"]),
+                    "gross": float(rule_price["gross"]),
+                    "linked": True,
+                }],
+                "customFields": {
+                    self.cfg["min_purchase_field"]: scaled_value,
+                    self.cfg["scaling_field"]: scaled_value,
+                },
+            })
+
+        existing_visibilities = {
+            v["salesChannelId"]: v["id"] for v in current.get("visibilities") or []
+        }
+        visibilities = []
+        for channel_id in lookups["sales_channel_ids"]:
+            entry = {"salesChannelId": channel_id, "visibility": 30}
+            if channel_id in existing_visibilities:
+                entry["id"] = existing_visibilities[channel_id]
+            visibilities.append(entry)
+
+        languages = self.cfg["languages"]
+        translations = {
+            languages["EN"]: {
+                "name": product_data.get("titel_GBR", ""),
+                "description": product_data.get("beschreibung_en", ""),
+            },
+            languages["FR"]: {
+                "name": product_data.get("titel_FRA", ""),
+                "description": product_data.get("beschreibung_fr", ""),
+            },
+        }
+
+        return {
+            "id": current["id"],
+            "manufacturerId": lookups["manufacturer_id"],
+            "price": [{
+                "currencyId": currency_id,
+                "gross": float(pricing["gross"]),
+                "net": float(pricing["net"]),
+                "linked": True,
+            }],
+            "prices": prices,
+            "visibilities": visibilities,
+            "translations": translations,
+        }
+
+    def changed_payload(self, payload, current):
+        """
+        Drops the parts of payload that already match the product as read by find_product,
+        so unchanged products are not rewritten (and not re-indexed) by Shopware.
+        """
+        lookups = self.load_lookups()
+        changed = {"id": payload["id"]}
+        if current.get("manufacturerId") != payload["manufacturerId"]:
+            changed["manufacturerId"] = payload["manufacturerId"]
+        current_price = {p.get("currencyId"): p for p in current.get("price") or []}
+        for price in payload["price"]:
+            existing = current_price.get(price["currencyId"], {})
+            if (_amount(existing.get("gross")), _amount(existing.get("net"))) != (price["gross"], price["net"]):
+                changed["price"] = payload["price"]
+        if sorted(map(_price_key, current.get("prices") or [])) != sorted(map(_price_key, payload["prices"])):
+            changed["prices"] = payload["prices"]
+        current_visibilities = sorted(
+            (v["salesChannelId"], v.get("visibility")) for v in current.get("visibilities") or []
+        )
+        if current_visibilities != sorted((v["salesChannelId"], v["visibility"]) for v in payload["visibilities"]):
+            changed["visibilities"] = payload["visibilities"]
+        current_translations = {
+            t.get("languageId"): t for t in current.get("translations") or [] if isinstance(t, dict)
+        }
+        translations = {}
+        for locale, fields in payload["translations"].items():
+            existing = current_translations.get(lookups["language_ids"].get(locale), {})
+            if any((existing.get(key) or "") != (value or "") for key, value in fields.items()):
+                translations[locale] = fields
+        if translations:
+            changed["translations"] = translations
+        return changed
+
+    def stale_entries(self, current, payload=None):
+        """
+        Returns (entity, id) pairs that must be deleted before writing the payload:
+        all existing advanced prices and visibilities outside the target channels.
+        With payload given, only for the parts it rewrites.
+        """
+        lookups = self.load_lookups()
+        stale = []
+        if payload is None or "prices" in payload:
+            stale += [("product-price", p["id"]) for p in current.get("prices") or []]
+        if payload is None or "visibilities" in payload:
+            for visibility in current.get("visibilities") or []:
+                if visibility["salesChannelId"] not in lookups["sales_channel_ids"]:
+                    stale.append(("product-visibility", visibility["id"]))
+        return stale
+
+    @timed()
+    def go_to_shop(self, product_data):
+        artikelnummer = product_data.get("artikelnummer", "")
+        self.last_error = None
+        if not artikelnummer:
+            logging.error("No article number in product_data.")
+            return False
+        try:
+            self.current_product = self.find_product(artikelnummer)
+        except Exception as e:
+            logging.error("Error searching for product via API: %s", e)
+            self.current_product = None
+            self.last_error = e
+            return False
+        if self.current_product is None:
+            logging.error("Product %s not found in Shopware.", artikelnummer)
+            return False
+        logging.info("Found product %s (id %s).", artikelnummer, self.current_product["id"])
+        return True
+
+    def build_operations(self, product_data, current):
+        payload = self.changed_payload(self.build_payload(product_data, current), current)
+        deletes = {"product-price": [], "product-visibility": []}
+        for entity, entity_id in self.stale_entries(current, payload):
+            deletes[entity].append({"id": entity_id})
+        prices = payload.pop("prices", [])
+        visibilities = payload.pop("visibilities", [])
+        for row in prices + visibilities:
+            row["productId"] = current["id"]
+        return {
+            "product": [payload] if len(payload) > 1 else [],
+            "product_price": prices,
+            "product_visibility": visibilities,
+            "delete_product_price": deletes["product-price"],
+            "delete_product_visibility": deletes["product-visibility"],
+        }
+
+    def sync_records(self, records):
+        merged = {}
+        for _, operations in records:
+            for key, rows in operations.items():
+                merged.setdefault(key, []).extend(rows)
+        body = []
+        # Deletes go first so that re-created price rules do not collide with old ones.
+        for key in ("delete_product_price", "delete_product_visibility"):
+            if merged.get(key):
+                body.append({
+                    "key": key, "action": "delete",
+                    "entity": key[len("delete_"):], "payload": merged[key],
+                })
+        for key in ("product", "product_price", "product_visibility"):
+            if merged.get(key):
+                body.append({"key": key, "action": "upsert", "entity": key, "payload": merged[key]})
+        if body:
+            self.client.sync(body)
+
+    @timed()
+    def run_sequence(self, product_data):
+        start = time.perf_counter()
+        artikelnummer = product_data.get("artikelnummer", "")
+        current = self.current_product
+        if current is None or current.get("productNumber") != artikelnummer:
+            if not self.go_to_shop(product_data):
+                return False
+            current = self.current_product
+        try:
+            operations = self.build_operations(product_data, current)
+            if not any(operations.values()):
+                logging.info("Product %s already matches Shopware — nothing written.", artikelnummer)
+                return True
+            # Stale rows are deleted in the same request as the write, so a failure leaves the product as it was.
+            self.sync_records([(artikelnummer, operations)])
+        except Exception as e:
+            logging.error("Error uploading product %s via API: %s", artikelnummer, e)
+            self.last_error = e
+            return False
+        finally:
+            self.current_product = None
+        logging.info(
+            "Product %s uploaded via API in %.3f s (%s).", artikelnummer, time.perf_counter() - start,
+            ", ".join(key for key, rows in operations.items() if rows),
+        )
+        return True
+
+
+class BulkShopUploader(ApiShopUploader):
+    """
+    Collects prepared product_data dicts and writes them in batched
+    _action/sync requests. A failing batch is split in halves until the
+    bad records are isolated; every record is settled as uploaded or failed.
+    Only counters are kept across flushes: the (number, error) settlements
+    wait in `settled` until the caller drains them with take_settled().
+    """
+
+    def __init__(self, config, index=None):
+        super().__init__(config, index)
+        self.batch_size = int(self.cfg["bulk_batch_size"])
+        self.flush_interval_s = float(self.cfg["bulk_flush_interval_s"])
+        self.pending = []
+        self.last_flush = time.monotonic()
+        self.settled = []
+        self.uploaded_count = 0
+        self.failed_count = 0
+
+    def go_to_shop(self, product_data):
+        # Products are resolved in bulk during flush().
+        return True
+
+    def run_sequence(self, product_data):
+        self.add(product_data)
+        return True
+
+    def add(self, product_data):
+        self.pending.append(product_data)
+        due = time.monotonic() - self.last_flush >= self.flush_interval_s
+        if len(self.pending) >= self.batch_size or due:
+            self.flush()
+
+    def take_settled(self):
+        """(artikelnummer, error) of every record settled since the last call; error is None when uploaded."""
+        settled, self.settled = self.settled, []
+        return settled
+
+    def settle(self, number, error=None):
+        self.settled.append((number, error))
+        if error is None:
+            self.uploaded_count += 1
+        else:
+            self.failed_count += 1
+
+    def find_products(self, numbers):
+        rows = self.client.search(
+            "product",
+            [{"type": "equalsAny", "field": "productNumber", "value": numbers}],
+            associations=PRODUCT_ASSOCIATIONS,
+            limit=len(numbers),
+        )
+        if self.index is not None:
+            self.index.put_many((row["productNumber"], row["id"]) for row in rows)
+        return {row["productNumber"]: row for row in rows}
+
+    @timed()
+    def send_batch(self, records):
+        try:
+            self.sync_records(records)
+            for number, _ in records:
+                self.settle(number)
+        except Exception as e:
+            if len(records) == 1:
+                number = records[0][0]
+                self.settle(number, str(e))
+                logging.error("Bulk upload of product %s failed: %s", number, e)
+                return
+            logging.warning("Sync of %d records failed (%s) — splitting batch.", len(records), e)
+            middle = len(records) // 2
+            self.send_batch(records[:middle])
+            self.send_batch(records[middle:])
+
+    @timed()
+    def flush(self):
+        batch, self.pending = self.pending, []
+        self.last_flush = time.monotonic()
+        if not batch:
+            return
+        start = time.perf_counter()
+        numbers = [p.get("artikelnummer", "") for p in batch]
+        try:
+            self.load_lookups()
+            current_products = self.find_products([n for n in numbers if n])
+        except Exception as e:
+            logging.error("Error preparing bulk upload: %s", e)
+            for number in numbers:
+                self.settle(number, str(e))
+            return
+        records = []
+        for number, product_data in zip(numbers, batch):
+            current = current_products.get(number)
+            if current is None:
+                self.settle(number, "Product not found in Shopware")
+                logging.error("Product %s not found in Shopware.", number)
+                continue
+            try:
+                records.append((number, self.build_operations(product_data, current)))
+            except Exception as e:
+                self.settle(number, str(e))
+                logging.error("Error preparing product %s: %s", number, e)
+        if records:
+            self.send_batch(records)
+        logging.info(
+            "Bulk flush of %d products finished in %.3f s (%d uploaded, %d failed in total).",
+            len(batch), time.perf_counter() - start, self.uploaded_count, self.failed_count
+        )
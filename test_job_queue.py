@@ -0,0 +1,52 @@
+import os
+import subprocess
+import sys
+
+from job_queue import JobQueue
+
+
+def write_products(path, names):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("".join(name + "\n" for name in names))
+
+
+def test_run_killed_before_export_does_not_requeue_done_jobs(tmp_path):
+    db = str(tmp_path / "jobs.sqlite")
+    products = str(tmp_path / "products.txt")
+    write_products(products, ["A", "B", "C"])
+    # Finish A and B in a separate process that dies before export_file runs.
+    script = (
+        "import os, sys\n"
+        "from job_queue import JobQueue\n"
+        "queue = JobQueue({'path': sys.argv[1]})\n"
+        "queue.sync_file(sys.argv[2])\n"
+        "for _ in range(2):\n"
+        "    job_id, name = queue.claim()\n"
+        "    queue.complete(job_id)\n"
+        "os._exit(9)\n"
+    )
+    result = subprocess.run([sys.executable, "-c", script, db, products],
+                            cwd=os.path.dirname(os.path.abspath(__file__)))
+    assert result.returncode == 9
+
+    queue = JobQueue({"path": db})
+    assert queue.sync_file(products) == 1
+    assert queue.open_names() == ["C"]
+
+    queue.export_file(products)
+    with open(products, encoding="utf-8") as f:
+        assert f.read() == "C\n"
+
+
+def test_name_listed_again_after_export_is_queued(tmp_path):
+    products = str(tmp_path / "products.txt")
+    write_products(products, ["A"])
+    queue = JobQueue({"path": str(tmp_path / "jobs.sqlite")})
+    queue.sync_file(products)
+    job_id, _ = queue.claim()
+    queue.complete(job_id)
+    queue.export_file(products)
+
+    write_products(products, ["A"])
+    assert queue.sync_file(products) == 1
+    assert queue.open_names() == ["A"]
@@ -0,0 +1,125 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULTS = {
+    "enabled":          True,
+    "path":             "translation_cache.sqlite3",
+    "max_entries":      50000,
+    "max_age_days":     365,
+    "evict_every":      500,
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS translations (
+    key         TEXT PRIMARY KEY,
+    target_lang TEXT NOT NULL,
+    result      TEXT NOT NULL,
+    created_at  REAL NOT NULL,
+    last_used   REAL NOT NULL,
+    hits        INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS translations_last_used ON translations (last_used);
+"""
+
+
+def cache_key(text, target_lang, tag_handling=None, glossary=None):
+    digest = hashlib.sha256()
+    for part in (text, target_lang, tag_handling or "", glossary or ""):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class TranslationCache:
+    """
+    On-disk DeepL result cache keyed by hash(source text, target_lang, tag_handling, glossary).
+    SQLite in WAL mode with one connection per thread, so several workers or
+    processes can share one file. Entries are evicted by age and by count (least recently used).
+    """
+
+    def __init__(self, cfg=None):
+        self.cfg = {**DEFAULTS, **(cfg or {})}
+        self.path = self.cfg["path"]
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.characters_saved = 0
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        with self.connection() as conn:
+            conn.executescript(SCHEMA)
+
+    def connection(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.local.conn = conn
+        return conn
+
+    def get(self, text, target_lang, tag_handling=None, glossary=None):
+        key = cache_key(text, target_lang, tag_handling, glossary)
+        conn = self.connection()
+        with conn:
+            row = conn.execute("SELECT result FROM translations WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE translations SET last_used = ?, hits = hits + 1 WHERE key = ?",
+                    (time.time(), key),
+                )
+        with self.lock:
+            if row is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.characters_saved += len(text)
+        return row[0] if row is not None else None
+
+    def put(self, text, target_lang, result, tag_handling=None, glossary=None):
+        key = cache_key(text, target_lang, tag_handling, glossary)
+        now = time.time()
+        conn = self.connection()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO translations (key, target_lang, result, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, target_lang, result, now, now),
+            )
+        with self.lock:
+            self.writes += 1
+            evict_now = self.writes % self.cfg["evict_every"] == 0
+        if evict_now:
+            self.evict()
+
+    def evict(self):
+        cutoff = time.time() - self.cfg["max_age_days"] * 86400
+        conn = self.connection()
+        with conn:
+            expired = conn.execute("DELETE FROM translations WHERE last_used < ?", (cutoff,)).rowcount
+            overflow = conn.execute(
+                "DELETE FROM translations WHERE key IN ("
+                "SELECT key FROM translations ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.cfg["max_entries"],),
+            ).rowcount
+        if expired or overflow:
+            logging.info("Translation cache evicted %d expired and %d overflow entries.", expired, overflow)
+        return expired + overflow
+
+    def stats(self):
+        entries = self.connection().execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "characters_saved": self.characters_saved,
+            }
@@ -0,0 +1,110 @@
+from bs4 import BeautifulSoup, NavigableString
+
+BLOCK_TAGS = {
+    "p", "div", "ul", "ol", "dl", "table", "blockquote", "pre", "section",
+    "h1", "h2", "h3", "h4", "h5", "h6", "hr",
+}
+
+
+def split_segments(html):
+    """
+    Splits cleaned description HTML into top-level block segments.
+    Returns a list of (translatable, html) pairs; consecutive inline content is
+    kept together as one segment and whitespace-only text is passed through untouched.
+    Joining the html parts gives back the document.
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    segments = []
+    inline = []
+
+    def close_inline():
+        if inline:
+            text = "".join(inline)
+            segments.append((bool(text.strip()), text))
+            inline.clear()
+
+    for node in soup.contents:
+        if isinstance(node, NavigableString) and type(node) is not NavigableString:
+            # Comments, doctypes and the like are kept verbatim.
+            close_inline()
+            segments.append((False, node.output_ready()))
+        elif isinstance(node, NavigableString):
+            inline.append(str(node))
+        elif node.name in BLOCK_TAGS:
+            close_inline()
+            segments.append((node.name != "hr" and bool(node.get_text(strip=True)), str(node)))
+        else:
+            inline.append(str(node))
+    close_inline()
+    return segments
+
+
+class SegmentPlan:
+    """Segments of one document with the translations known so far."""
+
+    def __init__(self, segments, translated, unseen, reused_chars, total_chars):
+        self.segments = segments
+        self.translated = translated
+        self.unseen = unseen
+        self.reused_chars = reused_chars
+        self.total_chars = total_chars
+
+    @property
+    def reuse_ratio(self):
+        return self.reused_chars / self.total_chars if self.total_chars else 1.0
+
+    def render(self):
+        return "".join(
+            self.translated[segment] if translatable else segment
+            for translatable, segment in self.segments
+        )
+
+
+class TranslationMemory:
+    """
+    Segment-level lookup on top of TranslationCache: only segments that were never
+    translated before are sent to DeepL; the document is reassembled in order.
+    """
+
+    def __init__(self, cache):
+        self.cache = cache
+
+    def plan(self, html, target_lang, glossary=None):
+        segments = split_segments(html)
+        translated = {}
+        unseen = []
+        reused_chars = total_chars = 0
+        for translatable, segment in segments:
+            if not translatable:
+                continue
+            total_chars += len(segment)
+            if segment in translated:
+                reused_chars += len(segment)
+                continue
+            cached = self.cache.get(segment, target_lang, "html", glossary)
+            if cached is None:
+                translated[segment] = None
+                unseen.append(segment)
+            else:
+                translated[segment] = cached
+                reused_chars += len(segment)
+        return SegmentPlan(segments, translated, unseen, reused_chars, total_chars)
+
+    def fill(self, plan, results, target_lang, glossary=None):
+        """results maps each unseen segment to its translation; new ones are stored in memory."""
+        for segment in plan.unseen:
+            plan.translated[segment] = results[segment]
+            self.cache.put(segment, target_lang, results[segment], "html", glossary)
+        return plan.render()
+
+    def translate(self, html, target_lang, translate_many, glossary=None):
+        """
+        translate_many(texts, target_lang) -> list of translated texts.
+        Returns (translated_html, reuse_ratio) where reuse_ratio is the share of
+        translatable characters served from memory.
+        """
+        plan = self.plan(html, target_lang, glossary)
+        results = {}
+        if plan.unseen:
+            results = dict(zip(plan.unseen, translate_many(plan.unseen, target_lang)))
+        return self.fill(plan, results, target_lang, glossary), plan.reuse_ratio
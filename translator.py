@@ -1,25 +1,220 @@
 import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 import deepl
+from metrics import timed
+from translation_cache import TranslationCache
+from translation_memory import TranslationMemory
+
+# Target language -> product_data key of the translated description.
+TARGET_LANGUAGES = {"EN-GB": "beschreibung_en", "FR": "beschreibung_fr"}
+
+# DeepL /v2/translate limits: 50 texts and 128 KiB per request (kept a margin for the JSON envelope).
+MAX_TEXTS_PER_REQUEST = 50
+MAX_REQUEST_BYTES = 120 * 1024
+
+
+def pack_texts(texts, max_texts=MAX_TEXTS_PER_REQUEST, max_bytes=MAX_REQUEST_BYTES):
+    """Groups texts into as few request-sized batches as the DeepL limits allow, keeping order."""
+    batches = []
+    batch, batch_bytes = [], 0
+    for text in texts:
+        size = len(text.encode("utf-8"))
+        if batch and (len(batch) >= max_texts or batch_bytes + size > max_bytes):
+            batches.append(batch)
+            batch, batch_bytes = [], 0
+        batch.append(text)
+        batch_bytes += size
+    if batch:
+        batches.append(batch)
+    return batches
+
 
 class Translator:
     def __init__(self, config):
         self.auth_key = config["DEEPL_AUTH_KEY"]
-        self.translator = deepl.Translator(self.auth_key)
+        self.translator = deepl.Translator(self.auth_key, server_url=config.get("DEEPL_SERVER_URL"))
+        # Retries are handled here, shared by all worker threads, instead of per request in the client.
+        deepl.http_client.max_network_retries = 0
+        self.max_retries = int(config.get("DEEPL_MAX_RETRIES", 6))
+        self.backoff_s = float(config.get("DEEPL_BACKOFF_S", 1.0))
+        self.concurrency = int(config.get("DEEPL_CONCURRENCY", 4))
+        self.executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="deepl")
+        self.backoff_lock = threading.Lock()
+        self.resume_at = 0.0
+        self.glossaries = config.get("DEEPL_GLOSSARIES", {})
+        cache_config = config.get("TRANSLATION_CACHE", {})
+        self.cache = TranslationCache(cache_config) if cache_config.get("enabled", True) else None
+        self.memory = None
+        if self.cache is not None and config.get("TRANSLATION_MEMORY", True):
+            self.memory = TranslationMemory(self.cache)
+
+    def is_retryable(self, error):
+        if isinstance(error, (deepl.TooManyRequestsException, deepl.ConnectionException)):
+            return True
+        return isinstance(error, deepl.DeepLException) and error.http_status_code in (500, 502, 503, 504)
+
+    def wait_for_backoff(self):
+        with self.backoff_lock:
+            delay = self.resume_at - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
 
-    def translate_text(self, text, target_lang):
+    @timed()
+    def call_deepl(self, texts, target_lang):
+        """
+        Sends one DeepL request for a string or a list of strings.
+        On 429/5xx every thread pauses until the shared backoff window has passed
+        (exponential with jitter), so concurrent workers do not hammer the API.
+        """
+        glossary = self.glossaries.get(target_lang)
+        for attempt in range(self.max_retries + 1):
+            self.wait_for_backoff()
+            try:
+                if glossary:
+                    return self.translator.translate_text(
+                        texts, source_lang="DE", target_lang=target_lang, tag_handling="html",
+                        glossary=glossary
+                    )
+                return self.translator.translate_text(texts, target_lang=target_lang, tag_handling="html")
+            except Exception as e:
+                if attempt == self.max_retries or not self.is_retryable(e):
+                    raise
+                delay = self.backoff_s * 2 ** attempt * random.uniform(0.5, 1.5)
+                with self.backoff_lock:
+                    self.resume_at = max(self.resume_at, time.monotonic() + delay)
+                logging.warning("DeepL %s (attempt %d) — backing off %.1f s.", e, attempt + 1, delay)
+
+    def translate_segments(self, segments, target_lang):
+        return [result.text for result in self.call_deepl(segments, target_lang)]
+
+    def translate_text(self, text, target_lang, strict=False):
+        glossary = self.glossaries.get(target_lang)
+        if self.cache is not None:
+            cached = self.cache.get(text, target_lang, "html", glossary)
+            if cached is not None:
+                logging.info("Translation to %s served from cache.", target_lang)
+                return cached
         try:
-            result = self.translator.translate_text(text, target_lang=target_lang, tag_handling="html")
-            logging.info("Translation to %s completed.", target_lang)
-            return result.text
+            if self.memory is not None:
+                translated, reuse = self.memory.translate(
+                    text, target_lang, self.translate_segments, glossary
+                )
+                logging.info(
+                    "Translation to %s completed (%.0f%% reused from translation memory).",
+                    target_lang, reuse * 100
+                )
+            else:
+                translated = self.call_deepl(text, target_lang).text
+                logging.info("Translation to %s completed.", target_lang)
         except Exception as e:
             logging.error("Error during translation to %s: %s", target_lang, e)
+            if strict:
+                raise
             return ""
+        if self.cache is not None:
+            self.cache.put(text, target_lang, translated, "html", glossary)
+        return translated
 
-    def translate_product(self, product_data):
-        description = product_data.get("beschreibung", "")
-        if description:
-            product_data["beschreibung_en"] = self.translate_text(description, "EN-GB")
-            product_data["beschreibung_fr"] = self.translate_text(description, "FR")
-        else:
-            logging.warning("No product description to translate.")
+    @timed()
+    def translate_product(self, product_data, strict=False):
+        self.translate_many([product_data], strict)
         return product_data
+
+    def translate_many(self, products, strict=False):
+        """
+        Translates every target language of every product concurrently, with at most
+        DEEPL_CONCURRENCY requests in flight. Results are written into the dicts.
+        A failed translation is left empty, or raised with strict set.
+        """
+        futures = []
+        for product_data in products:
+            description = product_data.get("beschreibung", "")
+            if not description:
+                logging.warning("No product description to translate.")
+                continue
+            for target_lang, key in TARGET_LANGUAGES.items():
+                future = self.executor.submit(self.translate_text, description, target_lang, strict)
+                futures.append((product_data, key, future))
+        for product_data, key, future in futures:
+            product_data[key] = future.result()
+        return products
+
+    def translate_packed(self, texts, target_lang):
+        """
+        Translates unique texts in as few requests as possible. Returns (results, errors):
+        texts of a failed batch map to "" in results and to the exception in errors.
+        """
+        results = {}
+        errors = {}
+        for batch in pack_texts(texts):
+            try:
+                translated = self.translate_segments(batch, target_lang)
+            except Exception as e:
+                logging.error("Error during batch translation of %d texts to %s: %s",
+                              len(batch), target_lang, e)
+                translated = [""] * len(batch)
+                errors.update((text, e) for text in batch)
+            results.update(zip(batch, translated))
+        return results, errors
+
+    @timed()
+    def translate_batch(self, products, strict=False):
+        """
+        Translates the descriptions of many product_data dicts at once, per target language,
+        and writes the results back into each dict. Returns {index in products: error} for the
+        products whose translation failed; those are left empty, or untouched with strict set.
+        """
+        failed = {}
+        for target_lang, key in TARGET_LANGUAGES.items():
+            glossary = self.glossaries.get(target_lang)
+            jobs = []
+            pending = {}
+            for index, product_data in enumerate(products):
+                description = product_data.get("beschreibung", "")
+                if not description:
+                    logging.warning("No product description to translate.")
+                    continue
+                if self.cache is not None:
+                    cached = self.cache.get(description, target_lang, "html", glossary)
+                    if cached is not None:
+                        product_data[key] = cached
+                        continue
+                plan = self.memory.plan(description, target_lang, glossary) if self.memory else None
+                for text in (plan.unseen if plan else [description]):
+                    pending[text] = None
+                jobs.append((index, product_data, description, plan))
+
+            results, errors = self.translate_packed(list(pending), target_lang) if pending else ({}, {})
+            for index, product_data, description, plan in jobs:
+                texts = plan.unseen if plan else [description]
+                error = next((errors[text] for text in texts if text in errors), None)
+                if error is not None:
+                    failed.setdefault(index, error)
+                    if not strict:
+                        product_data[key] = ""
+                    continue
+                if plan:
+                    translated = self.memory.fill(plan, results, target_lang, glossary)
+                else:
+                    translated = results[description]
+                product_data[key] = translated
+                if self.cache is not None:
+                    self.cache.put(description, target_lang, translated, "html", glossary)
+            logging.info(
+                "Batch translation to %s: %d products, %d unique texts in %d requests.",
+                target_lang, len(jobs), len(pending), len(pack_texts(list(pending))),
+            )
+        return failed
+
+    def log_cache_stats(self):
+        if self.cache is None:
+            return
+        stats = self.cache.stats()
+        logging.info(
+            "Translation cache: %d entries, %d hits, %d misses (%.0f%% hit rate), %d characters saved.",
+            stats["entries"], stats["hits"], stats["misses"], stats["hit_rate"] * 100,
+            stats["characters_saved"],
+        )
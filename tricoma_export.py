@@ -0,0 +1,166 @@
+import argparse
+import csv
+import json
+import logging
+import os
+import sys
+import time
+import xml.etree.ElementTree as ET
+from crm_downloader import CRMDownloader
+from pricing import PriceError, parse_amount
+
+DEFAULTS = {
+    "path":             "tricoma_export.csv",
+    "format":           None,           # "csv" or "xml"; None: by file extension
+    "encoding":         "utf-8-sig",
+    "delimiter":        None,           # None: sniffed from the first lines
+    "decimal_separator": None,          # "," or "." for the price columns; None: per value, '1.234' rejected
+    "record_tag":       "artikel",      # XML element holding one article
+    # product_data key -> column (CSV header or XML child element / attribute)
+    "columns": {
+        "name":                 "bezeichnung",
+        "artikelnummer":        "artikelnummer",
+        "verpackungseinheit":   "verpackungseinheit",
+        "beschreibung":         "beschreibung",
+        "titel_GBR":            "titel_GBR",
+        "titel_FRA":            "titel_FRA",
+        "handler_preis":        "preis_H",
+        "endkunde_preis":       "preis_EK",
+    },
+    "report_every":     10000,
+}
+
+REQUIRED_FIELDS = ("artikelnummer", "handler_preis", "endkunde_preis")
+PRICE_FIELDS = ("handler_preis", "endkunde_preis")
+
+
+class ExportRowError(Exception):
+    pass
+
+
+def _inner_text(element):
+    """Text of an XML element; HTML markup in descriptions is kept as markup."""
+    if len(element) == 0:
+        return element.text or ""
+    parts = [element.text or ""]
+    parts.extend(ET.tostring(child, encoding="unicode") for child in element)
+    return "".join(parts)
+
+
+def _local_name(tag):
+    return tag.rsplit("}", 1)[-1]
+
+
+class TricomaExport:
+    """
+    Tricoma article export (CSV or XML) as a product source in place of CRMDownloader:
+    iterating yields (name, product_data) with the same keys the browser and HTTP scrapers
+    produce. Rows are read one at a time (csv.DictReader, ElementTree.iterparse with each
+    record cleared after use), so memory does not grow with the file size.
+    """
+
+    def __init__(self, path=None, cfg=None):
+        self.cfg = {**DEFAULTS, **(cfg or {})}
+        self.cfg["columns"] = {**DEFAULTS["columns"], **self.cfg.get("columns", {})}
+        self.path = path or self.cfg["path"]
+        self.format = self.cfg["format"] or ("xml" if self.path.lower().endswith(".xml") else "csv")
+        self.rows = 0
+        self.skipped = 0
+
+    def __iter__(self):
+        start = time.perf_counter()
+        self.rows = self.skipped = 0
+        records = self.xml_records() if self.format == "xml" else self.csv_records()
+        for record in records:
+            self.rows += 1
+            try:
+                name, product_data = self.product_data(record)
+            except ExportRowError as e:
+                self.skipped += 1
+                logging.error("Export row %d skipped: %s", self.rows, e)
+                continue
+            if self.rows % self.cfg["report_every"] == 0:
+                logging.info(
+                    "Export %s: %d rows read in %.1f s (%d skipped).",
+                    self.path, self.rows, time.perf_counter() - start, self.skipped,
+                )
+            yield name, product_data
+        logging.info(
+            "Export %s: %d rows read in %.1f s, %d skipped.",
+            self.path, self.rows, time.perf_counter() - start, self.skipped,
+        )
+
+    def csv_records(self):
+        # Descriptions with embedded HTML easily exceed the default field limit.
+        csv.field_size_limit(min(sys.maxsize, 2 ** 31 - 1))
+        with open(self.path, "r", encoding=self.cfg["encoding"], newline="") as f:
+            delimiter = self.cfg["delimiter"]
+            if delimiter is None:
+                sample = f.read(65536)
+                f.seek(0)
+                delimiter = csv.Sniffer().sniff(sample, delimiters=";,\t|").delimiter
+            yield from csv.DictReader(f, delimiter=delimiter)
+
+    def xml_records(self):
+        record_tag = self.cfg["record_tag"]
+        root = None
+        for event, element in ET.iterparse(self.path, events=("start", "end")):
+            if root is None:
+                root = element
+            if event != "end" or _local_name(element.tag) != record_tag:
+                continue
+            record = dict(element.attrib)
+            for child in element:
+                record[_local_name(child.tag)] = _inner_text(child)
+            yield record
+            element.clear()
+            # Finished records stay attached to the root otherwise.
+            root.clear()
+
+    def product_data(self, record):
+        columns = self.cfg["columns"]
+        values = {key: (record.get(column) or "").strip() for key, column in columns.items()}
+        for field in REQUIRED_FIELDS:
+            if not values.get(field):
+                raise ExportRowError(f"no {field} (column '{columns[field]}')")
+        artikelnummer = values["artikelnummer"]
+        try:
+            # Same '1234.50' format as the scraped prices.
+            prices = {
+                field: str(parse_amount(values[field], self.cfg["decimal_separator"])) for field in PRICE_FIELDS
+            }
+        except PriceError as e:
+            raise ExportRowError(f"{artikelnummer}: {e}")
+        description = values.get("beschreibung", "")
+        # Parsing every description costs more than reading the row; most carry no styles.
+        if "style" in description:
+            description = CRMDownloader.remove_inline_styles(description)
+        product_data = {
+            "artikelnummer": artikelnummer,
+            "verpackungseinheit": values.get("verpackungseinheit") or "1",
+            "beschreibung": description,
+            "titel_FRA": values.get("titel_FRA", ""),
+            "titel_GBR": values.get("titel_GBR", ""),
+            **prices,
+        }
+        return values.get("name") or artikelnummer, product_data
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Check a Tricoma article export: reads every row as the import would.")
+    parser.add_argument("export", nargs="?", help="CSV or XML export (default: TRICOMA_EXPORT path from the config).")
+    parser.add_argument("--config", default="config.json")
+    parser.add_argument("--show", type=int, default=0, metavar="N", help="Print the first N mapped products.")
+    args = parser.parse_args()
+
+    cfg = {}
+    if os.path.exists(args.config):
+        with open(args.config, "r", encoding="utf-8") as f:
+            cfg = json.load(f).get("TRICOMA_EXPORT", {})
+    export = TricomaExport(args.export, cfg)
+    for name, product_data in export:
+        if args.show > 0:
+            print(json.dumps({"name": name, **product_data}, ensure_ascii=False))
+            args.show -= 1
+    print(f"{export.rows} rows, {export.rows - export.skipped} products, {export.skipped} skipped.")
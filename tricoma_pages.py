@@ -0,0 +1,97 @@
+import html
+import os
+
+# Minimal replicas of the Tricoma frames, with the ids, names and classes
+# CRMDownloader relies on. Used to build parsing corpora and by local stand-in servers.
+
+PRODUCT_PAGE = """<html><head><title>Produkt</title></head><body>
+<form name="produkt" method="post">
+<table class="tri_form">
+<tr><td>Artikelnummer</td><td><input type="text" id="feld44" name="feld44" value="{artikelnummer}"></td></tr>
+<tr><td>Verpackungseinheit</td><td><input type="text" id="feld82_vorne" name="feld82_vorne" value="{verpackungseinheit}"></td></tr>
+<tr><td>Einheit</td><td><input type="text" id="feld93" name="feld93" value="Stck"></td></tr>
+<tr><td>Menge</td><td><input type="text" id="feld94_vorne" name="feld94_vorne" value="1"></td></tr>
+<tr><td>Kategorie</td><td><select name="feld99"><option value="0">-</option><option value="124">124</option></select></td></tr>
+<tr><td>Beschreibung</td><td>
+<textarea id="tri_editor_feld42" name="feld42" style="display:none">{beschreibung_escaped}</textarea>
+<iframe id="tri_editor_feld42_ifr" src="{editor_src}"></iframe></td></tr>
+</table>
+<img alt="Sprachwahl" src="sprache.png">
+<input type="submit" class="Buttonspeichern" name="feldspeichern" value="Speichern">
+</form>
+</body></html>"""
+
+EDITOR_PAGE = """<html><head></head><body id="tinymce" class="mce-content-body">{beschreibung}</body></html>"""
+
+LANGUAGE_PAGE = """<html><head></head><body>
+<form name="sprache">
+<table>
+<tr><td>Französisch</td><td><input type="text" name="titel_FRA" value="{titel_FRA}"></td></tr>
+<tr><td>Englisch</td><td><input type="text" name="titel_GBR" value="{titel_GBR}"></td></tr>
+</table>
+</form>
+</body></html>"""
+
+PRICES_PAGE = """<html><head></head><body>
+<div class="tri_box"><p>Einkaufspreise (€)</p><div class="content"><table class="table_listing"></table></div></div>
+<div class="tri_box"><p>Weitere Verkaufspreise (€)</p>
+<div class="content">
+<table class="table_listing">
+<tr><td>Händler (H)</td>
+<td><input class="zahlenfeld_vorkomma" value="{handler_vorkomma}">,<input class="zahlenfeld_nachkomma" value="{handler_nachkomma}"></td></tr>
+<tr><td>Endkunden (EK)</td>
+<td><input class="zahlenfeld_vorkomma" value="{endkunde_vorkomma}">,<input class="zahlenfeld_nachkomma" value="{endkunde_nachkomma}"></td></tr>
+</table>
+</div>
+</div>
+</body></html>"""
+
+
+def sample_product(index):
+    return {
+        "artikelnummer": f"SAMPLE{index:05d}",
+        "verpackungseinheit": str(1 + index % 12),
+        "beschreibung": (
+            f"<p>Produkt {index}: handgefertigte Keramik.</p>"
+            "<ul><li>Spülmaschinenfest</li><li>Mikrowellengeeignet</li></ul>"
+            "<p>Bitte beachten Sie unsere Pflegehinweise.</p>"
+        ),
+        "titel_FRA": f"Produit {index}",
+        "titel_GBR": f"Product {index}",
+        "handler_preis": f"{4 + index % 50}.{index % 100:02d}",
+        "endkunde_preis": f"{9 + index % 50}.{(index * 7) % 100:02d}",
+    }
+
+
+def render_pages(product, editor_src="about:blank"):
+    """Returns the frame sources for one product, keyed like page_parser.parse_captured_product expects."""
+    handler_int, handler_dec = product["handler_preis"].split(".")
+    endkunde_int, endkunde_dec = product["endkunde_preis"].split(".")
+    quote = lambda value: html.escape(value, quote=True)
+    return {
+        "product": PRODUCT_PAGE.format(
+            artikelnummer=quote(product["artikelnummer"]),
+            verpackungseinheit=quote(product["verpackungseinheit"]),
+            beschreibung_escaped=html.escape(product["beschreibung"]),
+            editor_src=quote(editor_src),
+        ),
+        "editor": EDITOR_PAGE.format(beschreibung=product["beschreibung"]),
+        "language": LANGUAGE_PAGE.format(
+            titel_FRA=quote(product["titel_FRA"]), titel_GBR=quote(product["titel_GBR"])
+        ),
+        "prices": PRICES_PAGE.format(
+            handler_vorkomma=handler_int, handler_nachkomma=handler_dec,
+            endkunde_vorkomma=endkunde_int, endkunde_nachkomma=endkunde_dec,
+        ),
+    }
+
+
+def write_corpus(directory, count):
+    """Writes <directory>/<artikelnummer>/<frame>.html for count sample products."""
+    for index in range(count):
+        product = sample_product(index)
+        product_dir = os.path.join(directory, product["artikelnummer"])
+        os.makedirs(product_dir, exist_ok=True)
+        for frame, source in render_pages(product).items():
+            with open(os.path.join(product_dir, f"{frame}.html"), "w", encoding="utf-8") as f:
+                f.write(source)
@@ -0,0 +1,332 @@
+import logging
+import os
+from collections import Counter
+from contextlib import contextmanager
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.remote.command import Command
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+import page_parser
+from pricing import join_amount
+
+# Every script polls inside the browser until its fields are present (or the
+# timeout passes), so waiting and reading cost a single WebDriver round trip.
+# At the timeout the fields found so far are returned; the missing ones are null.
+_POLL_TEMPLATE = """
+var done = arguments[arguments.length - 1];
+var timeoutMs = arguments[0];
+var started = Date.now();
+function byXPath(xpath, context) {
+    return document.evaluate(xpath, context || document, null,
+        XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+}
+function collect(last) {
+%s
+}
+(function poll() {
+    var last = Date.now() - started > timeoutMs;
+    var result;
+    try {
+        result = collect(last);
+    } catch (e) {
+        result = {ready: false, error: String(e)};
+    }
+    if (result.ready || last) {
+        done(result);
+        return;
+    }
+    setTimeout(poll, 100);
+})();
+"""
+
+PRODUCT_FIELDS_JS = _POLL_TEMPLATE % """
+    var number = document.getElementById('feld44');
+    var unit = document.getElementById('feld82_vorne');
+    var editor = document.getElementById('tri_editor_feld42_ifr');
+    var body = editor && editor.contentDocument && editor.contentDocument.body;
+    return {
+        ready: !!(number && unit && body),
+        artikelnummer: number ? number.value : null,
+        verpackungseinheit: unit ? unit.value : null,
+        beschreibung: body ? body.innerHTML : null
+    };
+"""
+
+LANGUAGE_FIELDS_JS = _POLL_TEMPLATE % """
+    var frame = document.getElementById('contentframeSprache');
+    var doc = frame && frame.contentDocument;
+    var fr = doc && doc.getElementsByName('titel_FRA')[0];
+    var gb = doc && doc.getElementsByName('titel_GBR')[0];
+    var result = {
+        ready: !!(fr && gb),
+        frame: !!doc,
+        titel_FRA: fr ? fr.value : null,
+        titel_GBR: gb ? gb.value : null,
+        closed: false
+    };
+    // The popup is closed even when a title never appeared, as the per-field reads did.
+    if (result.ready || last) {
+        var close = document.querySelector('div#window_Sprache img.window_close');
+        if (close) {
+            close.click();
+            result.closed = true;
+        }
+    }
+    return result;
+"""
+
+PRICE_FIELDS_JS = _POLL_TEMPLATE % """
+    var table = byXPath("//div[@class='tri_box'][p[contains(., 'Weitere Verkaufspreise (€)')]]"
+        + "//div[@class='content']//table[contains(@class, 'table_listing')]");
+    function row(label) {
+        var tr = table && byXPath(".//tr[td[contains(., '" + label + "')]]", table);
+        if (!tr) {
+            return null;
+        }
+        var int = byXPath(".//input[contains(@class, 'zahlenfeld_vorkomma')]", tr);
+        var dec = byXPath(".//input[contains(@class, 'zahlenfeld_nachkomma')]", tr);
+        return (int && dec) ? {vorkomma: int.value, nachkomma: dec.value} : null;
+    }
+    var handler = row('Händler (H)');
+    var endkunde = row('Endkunden (EK)');
+    return {ready: !!(handler && endkunde), handler: handler, endkunde: endkunde};
+"""
+
+PRODUCT_FIELDS = ("artikelnummer", "verpackungseinheit", "beschreibung")
+LANGUAGE_FIELDS = ("titel_FRA", "titel_GBR")
+
+
+def script_timeout_s(driver):
+    """The session's script timeout in seconds; None when it is unlimited."""
+    timeout_ms = driver.execute(Command.GET_TIMEOUTS)["value"].get("script")
+    return timeout_ms / 1000 if timeout_ms is not None else None
+
+
+class TricomaSnapshot:
+    """
+    Reads all values needed from one Tricoma frame with a single execute_async_script call.
+    The driver must already be switched to the frame the script expects. Fields that do not
+    appear within timeout_s come back as None, so one missing field does not lose the others.
+    """
+
+    def __init__(self, driver, timeout_s=10):
+        self.driver = driver
+        self.timeout_s = timeout_s
+
+    def run(self, script, what, fields=()):
+        # The session's script timeout is only raised for this call, and only when it is too short.
+        needed = self.timeout_s + 5
+        previous = script_timeout_s(self.driver)
+        raise_timeout = previous is not None and previous < needed
+        if raise_timeout:
+            self.driver.set_script_timeout(needed)
+        try:
+            result = self.driver.execute_async_script(script, self.timeout_s * 1000) or {}
+        finally:
+            if raise_timeout:
+                self.driver.set_script_timeout(previous)
+        missing = [field for field in fields if result.get(field) is None]
+        if missing:
+            logging.warning(
+                "Snapshot of %s incomplete after %d s: no %s%s.", what, self.timeout_s, ", ".join(missing),
+                f" ({result['error']})" if result.get("error") else "",
+            )
+        return result
+
+    def product_fields(self):
+        """Product iframe: feld44, feld82_vorne and the tri_editor_feld42 body."""
+        result = self.run(PRODUCT_FIELDS_JS, "product fields", PRODUCT_FIELDS)
+        return {field: result.get(field) for field in PRODUCT_FIELDS}
+
+    def language_fields(self):
+        """Default content: titel_FRA / titel_GBR from contentframeSprache; closes the popup."""
+        result = self.run(LANGUAGE_FIELDS_JS, "language popup", LANGUAGE_FIELDS)
+        if not result.get("frame"):
+            raise TimeoutException(f"Language popup frame not found: {result.get('error') or 'timed out'}")
+        return {**{field: result.get(field) for field in LANGUAGE_FIELDS}, "closed": bool(result.get("closed"))}
+
+    def price_fields(self):
+        """frameunten: Händler / Endkunden vorkomma and nachkomma inputs."""
+        result = self.run(PRICE_FIELDS_JS, "prices")
+        if not result.get("ready"):
+            raise TimeoutException(f"Snapshot of prices not ready: {result.get('error') or 'timed out'}")
+        return {
+            "handler_preis": join_amount(result["handler"]["vorkomma"], result["handler"]["nachkomma"]),
+            "endkunde_preis": join_amount(result["endkunde"]["vorkomma"], result["endkunde"]["nachkomma"]),
+        }
+
+    def save_captured_pages(self, artikelnummer):
+        # Snapshots return values only; there are no page sources to keep.
+        pass
+
+
+class ElementExtractor:
+    """
+    Per-element reads as the flow did them before snapshots: one WebDriver lookup and one
+    attribute call per field, each field on its own. Kept as the reference the end-to-end
+    benchmark compares the snapshot's command count against.
+    """
+
+    def __init__(self, driver, timeout_s=10):
+        self.driver = driver
+        self.timeout_s = timeout_s
+
+    def wait_for(self, by, selector):
+        return WebDriverWait(self.driver, self.timeout_s).until(
+            EC.presence_of_element_located((by, selector))
+        )
+
+    def read(self, what, read):
+        try:
+            return read()
+        except Exception as e:
+            logging.warning("Reading %s failed: %s", what, e)
+            return None
+
+    def product_fields(self):
+        fields = {
+            "artikelnummer": self.read("feld44", lambda: self.wait_for(By.ID, "feld44").get_attribute("value")),
+            "verpackungseinheit": self.read(
+                "feld82_vorne", lambda: self.driver.find_element(By.ID, "feld82_vorne").get_attribute("value")
+            ),
+        }
+        try:
+            self.driver.switch_to.frame(self.wait_for(By.ID, "tri_editor_feld42_ifr"))
+        except Exception as e:
+            logging.warning("Reading the description editor failed: %s", e)
+            fields["beschreibung"] = None
+            return fields
+        try:
+            fields["beschreibung"] = self.read(
+                "description", lambda: self.wait_for(By.TAG_NAME, "body").get_attribute("innerHTML")
+            )
+        finally:
+            self.driver.switch_to.parent_frame()
+        return fields
+
+    def language_fields(self):
+        self.driver.switch_to.frame(self.wait_for(By.ID, "contentframeSprache"))
+        try:
+            fields = {
+                name: self.read(name, lambda name=name: self.wait_for(By.NAME, name).get_attribute("value"))
+                for name in LANGUAGE_FIELDS
+            }
+        finally:
+            self.driver.switch_to.default_content()
+        fields["closed"] = False
+        try:
+            close_button = self.wait_for(By.CSS_SELECTOR, "div#window_Sprache img.window_close")
+            self.driver.execute_script("arguments[0].click();", close_button)
+            fields["closed"] = True
+        except Exception as e:
+            logging.warning("Closing the language popup failed: %s", e)
+        return fields
+
+    def price_fields(self):
+        table = self.wait_for(By.XPATH, page_parser.PRICE_TABLE_XPATH)
+        prices = {}
+        for field, row_xpath in (("handler_preis", page_parser.HANDLER_ROW_XPATH),
+                                 ("endkunde_preis", page_parser.ENDKUNDE_ROW_XPATH)):
+            row = table.find_element(By.XPATH, row_xpath)
+            prices[field] = join_amount(
+                row.find_element(By.XPATH, page_parser.VORKOMMA_XPATH).get_attribute("value"),
+                row.find_element(By.XPATH, page_parser.NACHKOMMA_XPATH).get_attribute("value"),
+            )
+        return prices
+
+    def save_captured_pages(self, artikelnummer):
+        pass
+
+
+class PageSourceExtractor:
+    """
+    Drop-in alternative to TricomaSnapshot: captures each frame's page_source once
+    and extracts the fields locally with page_parser. With capture_dir set, the
+    captured frames are written to <capture_dir>/<artikelnummer>/<frame>.html.
+    """
+
+    def __init__(self, driver, capture_dir=None, timeout_s=10):
+        self.driver = driver
+        self.capture_dir = capture_dir
+        self.timeout_s = timeout_s
+        self.pages = {}
+
+    def capture(self, frame):
+        self.pages[frame] = self.driver.page_source
+        return self.pages[frame]
+
+    def wait_for(self, by, selector):
+        return WebDriverWait(self.driver, self.timeout_s).until(
+            EC.presence_of_element_located((by, selector))
+        )
+
+    def product_fields(self):
+        self.pages = {}
+        product_source = self.capture("product")
+        self.driver.switch_to.frame(self.wait_for(By.ID, "tri_editor_feld42_ifr"))
+        try:
+            editor_source = self.capture("editor")
+        finally:
+            self.driver.switch_to.parent_frame()
+        return page_parser.parse_product_page(product_source, editor_source)
+
+    def language_fields(self):
+        self.driver.switch_to.frame(self.wait_for(By.ID, "contentframeSprache"))
+        try:
+            self.wait_for(By.NAME, "titel_GBR")
+            fields = page_parser.parse_language_page(self.capture("language"))
+        finally:
+            self.driver.switch_to.default_content()
+        close_button = self.wait_for(By.CSS_SELECTOR, "div#window_Sprache img.window_close")
+        self.driver.execute_script("arguments[0].click();", close_button)
+        fields["closed"] = True
+        return fields
+
+    def price_fields(self):
+        self.wait_for(By.XPATH, page_parser.PRICE_TABLE_XPATH)
+        return page_parser.parse_prices_page(self.capture("prices"))
+
+    def save_captured_pages(self, artikelnummer):
+        if not self.capture_dir or not artikelnummer:
+            return
+        product_dir = os.path.join(self.capture_dir, artikelnummer)
+        os.makedirs(product_dir, exist_ok=True)
+        for frame, source in self.pages.items():
+            with open(os.path.join(product_dir, f"{frame}.html"), "w", encoding="utf-8") as f:
+                f.write(source)
+        logging.info("Captured %d frames to %s", len(self.pages), product_dir)
+
+
+class WebDriverCommandCounter:
+    def __init__(self):
+        self.by_command = Counter()
+
+    @property
+    def total(self):
+        return sum(self.by_command.values())
+
+    def summary(self):
+        return ", ".join(f"{name}={count}" for name, count in self.by_command.most_common())
+
+
+@contextmanager
+def count_webdriver_commands(driver, counter=None, log=True):
+    """
+    Counts every command sent to geckodriver while the block runs, adding to counter when given.
+    WebElement calls are routed through driver.execute as well, so they are included.
+    """
+    counter = counter if counter is not None else WebDriverCommandCounter()
+    original_execute = driver.execute
+
+    def counting_execute(driver_command, params=None):
+        counter.by_command[driver_command] += 1
+        return original_execute(driver_command, params)
+
+    driver.execute = counting_execute
+    try:
+        yield counter
+    finally:
+        driver.execute = original_execute
+        if log:
+            logging.info("WebDriver commands: %d (%s)", counter.total, counter.summary())
@@ -0,0 +1,242 @@
+import logging
+import os
+import threading
+import time
+from collections import Counter, deque
+from driver_initializer import DriverInitializer
+from facade import ProcessFacade
+from job_queue import JobQueue, worker_id as job_worker_id
+from log_in import LogIn
+from metrics import metrics
+from retry_policy import RetryPolicies, classify
+
+DEFAULTS = {
+    "workers":          2,
+    "tricoma_user":     None,
+    "shopware_user":    None,
+    "max_per_system":   {"tricoma": 2, "shopware": 2},
+    "report_every":     10,
+}
+
+
+class ProgressLedger:
+    """
+    Lock-safe progress accounting shared by all workers: product_counter.txt and
+    per-worker throughput. Which products are done is tracked by the job queue.
+    """
+
+    def __init__(self, counter_file):
+        self.counter_file = counter_file
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.processed_before = 0
+        self.elapsed_before = 0
+        self.done = Counter()
+        self.per_worker = Counter()
+        self.skipped = 0
+        self.load_counter()
+
+    def load_counter(self):
+        if not os.path.exists(self.counter_file):
+            return
+        try:
+            with open(self.counter_file, "r", encoding="utf-8") as cf:
+                lines = cf.read().splitlines()
+            self.processed_before = int(lines[0])
+            h, m, s = map(int, lines[1].split(":"))
+            self.elapsed_before = h * 3600 + m * 60 + s
+        except Exception:
+            logging.warning("Failed to load %s — counter reset.", self.counter_file)
+
+    def record(self, worker_id, name):
+        """Counts one uploaded product; returns the number uploaded by all workers in this run."""
+        with self.lock:
+            self.done[name] += 1
+            self.per_worker[worker_id] += 1
+            total = sum(self.done.values())
+            elapsed = int(time.time() - self.started) + self.elapsed_before
+            h, rem = divmod(elapsed, 3600)
+            m, s = divmod(rem, 60)
+            with open(self.counter_file, "w", encoding="utf-8") as cf:
+                cf.write(f"{self.processed_before + total}\n")
+                cf.write(f"{h:02d}:{m:02d}:{s:02d}\n")
+            return total
+
+    def record_skipped(self):
+        with self.lock:
+            self.skipped += 1
+
+    def report(self):
+        with self.lock:
+            wall = max(time.time() - self.started, 1e-9)
+            total = sum(self.done.values())
+            for worker_id in sorted(self.per_worker):
+                count = self.per_worker[worker_id]
+                logging.info("Worker %d: %d products (%.1f/min)", worker_id, count, count * 60 / wall)
+            logging.info("All workers: %d products in %.0f s (%.1f/min)", total, wall, total * 60 / wall)
+            if self.skipped:
+                logging.info("%d unchanged products skipped.", self.skipped)
+
+
+class WorkerPool:
+    """
+    Shards products.txt across N independent Firefox sessions. Each worker logs in
+    non-interactively and claims products from the durable job queue; per-system semaphores cap
+    how many workers talk to Tricoma or Shopware at the same time.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.cfg = {**DEFAULTS, **config.get("WORKER_POOL", {})}
+        limits = {**DEFAULTS["max_per_system"], **self.cfg.get("max_per_system", {})}
+        self.system_slots = {
+            system: threading.BoundedSemaphore(int(limit)) for system, limit in limits.items()
+        }
+        self.stop_event = threading.Event()
+        self.errors = Counter()
+        # One set of circuit breakers for all workers, so they pause together when a system is down.
+        self.policies = RetryPolicies(config.get("RETRY_POLICIES", {}))
+        # Once for all workers; they share the events file.
+        metrics.configure(config.get("METRICS", {}))
+
+    def start_session(self, worker_id):
+        logging.info("Worker %d: starting Firefox.", worker_id)
+        driver = DriverInitializer(self.config).init_driver()
+        facade = ProcessFacade(driver, self.config)
+        facade.policies = self.policies
+        facade.crm_downloader.wait_for_login(
+            self.config.get("CRM_URL", "https://default-crm-url"),
+            self.config.get("SHOP_URL", "https://default-shop-url"),
+        )
+        log_in = LogIn(driver, self.config.get("TRICOMA_LOGINS", {}), self.config.get("SHOPWARE_LOGINS", {}))
+        tricoma_user = self.cfg["tricoma_user"] or next(iter(log_in.tricoma))
+        shopware_user = self.cfg["shopware_user"] or next(iter(log_in.shopware))
+        with self.system_slots["tricoma"], self.system_slots["shopware"]:
+            log_in.log_in_as(tricoma_user, shopware_user)
+        return driver, facade
+
+    def process(self, facade, name):
+        """Copies one product; returns False when it was skipped as unchanged since its last upload."""
+        with self.system_slots["tricoma"]:
+            product_data = facade.resumed_data(name)
+            if product_data is None:
+                product_data = facade.download_product(name)
+                facade.products.append("scraped", product_data, name)
+                facade.checkpoint(name, "download", product_data)
+        if facade.changed_fields(product_data) == []:
+            logging.info("Product %s unchanged since its last upload — skipped.", name)
+            return False
+        product_data = facade.translate_product(name, product_data)
+        with self.system_slots["shopware"]:
+            # The bulk uploader flushes on its own once bulk_batch_size or bulk_flush_interval_s is reached.
+            facade.upload_product(name, product_data)
+        return True
+
+    def unbuffer(self, buffered, name, job_id):
+        """Drops a job registered for a bulk flush whose product never reached the uploader."""
+        if job_id in buffered.get(name, ()):
+            buffered[name].remove(job_id)
+
+    def pause_requested(self, pause_file):
+        try:
+            with open(pause_file, "r", encoding="utf-8") as pf:
+                return pf.read().strip() == "-"
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            logging.warning("Failed to read %s (%s) — batch continues.", pause_file, e)
+            return False
+
+    def worker(self, worker_id, jobs, ledger, pause_file):
+        claimer = job_worker_id()
+        try:
+            driver, facade = self.start_session(worker_id)
+        except Exception as e:
+            logging.error("Worker %d: could not start session: %s", worker_id, e)
+            return
+        facade.jobs = jobs
+        # Bulk mode: name -> job ids whose upload is buffered until the flush confirms or rejects it.
+        buffered = {}
+
+        def settle_upload(name, product_data, error):
+            job_id = buffered[name].popleft()
+            if error is None:
+                jobs.complete(job_id)
+            else:
+                self.errors[name] += 1
+                jobs.fail(job_id, error)
+                logging.error("Worker %d: upload of %s failed: %s", worker_id, name, error)
+
+        facade.on_flushed = settle_upload
+        try:
+            while not self.stop_event.is_set():
+                job = jobs.claim(claimer)
+                if job is None:
+                    break
+                job_id, name = job
+                logging.info("Worker %d: === Processing product: %s ===", worker_id, name)
+                if facade.defers_uploads:
+                    # Registered up front: the flush that settles it may already run inside upload_product.
+                    buffered.setdefault(name, deque()).append(job_id)
+                try:
+                    with metrics.product(name):
+                        uploaded = self.process(facade, name)
+                except Exception as e:
+                    self.unbuffer(buffered, name, job_id)
+                    # The job is retried (up to max_attempts) and stays in products.txt; the worker moves on.
+                    self.errors[name] += 1
+                    jobs.fail(job_id, e)
+                    logging.error("Worker %d: product %s failed: %s", worker_id, name, e)
+                    if classify(e) == "session_lost":
+                        # A dead browser would fail every remaining job; the other workers carry on.
+                        logging.error("Worker %d: browser session lost — worker stops.", worker_id)
+                        break
+                    continue
+                if not uploaded:
+                    self.unbuffer(buffered, name, job_id)
+                if not (uploaded and facade.defers_uploads):
+                    jobs.complete(job_id)
+                if uploaded:
+                    if ledger.record(worker_id, name) % self.cfg["report_every"] == 0:
+                        ledger.report()
+                else:
+                    ledger.record_skipped()
+                if self.pause_requested(pause_file):
+                    logging.info("Found '-' in %s — workers stop after their current product.", pause_file)
+                    self.stop_event.set()
+        finally:
+            try:
+                with self.system_slots["shopware"]:
+                    facade.flush_uploads()
+            except Exception as e:
+                logging.error("Worker %d: flushing buffered uploads failed: %s", worker_id, e)
+            driver.quit()
+
+    def run(self, filename="products.txt", counter_file="product_counter.txt", pause_file="pause.txt"):
+        if not os.path.exists(filename):
+            logging.error("File %s does not exist.", filename)
+            return
+        jobs = JobQueue(self.config.get("JOB_QUEUE", {}))
+        open_jobs = jobs.sync_file(filename)
+        if not open_jobs:
+            logging.info("No open products in %s.", filename)
+            return
+        ledger = ProgressLedger(counter_file)
+        metrics.reset()
+        logging.info("Worker pool: %d products queued for %d workers.", open_jobs, self.cfg["workers"])
+
+        threads = [
+            threading.Thread(target=self.worker, args=(i, jobs, ledger, pause_file),
+                             name=f"worker-{i}", daemon=True)
+            for i in range(int(self.cfg["workers"]))
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # Single rewrite of the product list: everything still open in the queue.
+        remaining = jobs.export_file(filename)
+        ledger.report()
+        metrics.export()
+        logging.info("Worker pool finished: %d products left in %s.", remaining, filename)